@@ -0,0 +1,146 @@
+"""Compares decoding gateway payloads sent as JSON and as ETF (Erlang term format).
+
+The payloads are synthetic but shaped like Discord's: ETF payloads use atoms for map
+keys and integers for IDs, as the gateway sends them. For each decoder, this reports
+the time per payload and the number of memory blocks the decoded payload holds.
+
+Run with ``python benchmarks/gateway_encoding.py`` from the repository root.
+``orjson`` and ``erlpack`` are measured too if they are installed.
+"""
+
+import gc
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from discord import etf
+
+try:
+    import orjson
+except ModuleNotFoundError:
+    orjson = None
+
+try:
+    import erlpack
+except ModuleNotFoundError:
+    erlpack = None
+
+
+def member(i):
+    return {
+        "user": {"id": str(612345678901234567 + i), "username": f"user {i}", "discriminator": "0001", "avatar": None},
+        "roles": ["512345678901234567"],
+        "joined_at": "2020-01-01T00:00:00+00:00",
+        "deaf": False,
+        "mute": False,
+    }
+
+
+MESSAGE_CREATE = {
+    "op": 0,
+    "s": 1,
+    "t": "MESSAGE_CREATE",
+    "d": {
+        "id": "912345678901234567",
+        "channel_id": "812345678901234567",
+        "guild_id": "712345678901234567",
+        "author": {"id": "612345678901234567", "username": "someone", "discriminator": "0001", "avatar": "a" * 32},
+        "member": member(0),
+        "content": "hello there " * 5,
+        "timestamp": "2020-01-01T00:00:00+00:00",
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+    },
+}
+
+GUILD_CREATE = {
+    "op": 0,
+    "s": 2,
+    "t": "GUILD_CREATE",
+    "d": {
+        "id": "712345678901234567",
+        "name": "guild",
+        "owner_id": "612345678901234567",
+        "member_count": 2000,
+        "roles": [{"id": "712345678901234567", "name": "@everyone", "permissions": "0", "position": 0}],
+        "channels": [{"id": "812345678901234567", "type": 0, "name": "general", "position": 0}],
+        "members": [member(i) for i in range(2000)],
+        "presences": [],
+        "voice_states": [],
+    },
+}
+
+
+def encode_etf(obj, buffer):
+    # like etf._encode_term, but with atom keys and integer IDs as Discord sends them
+    if isinstance(obj, dict):
+        buffer.append(etf.MAP_EXT)
+        buffer += len(obj).to_bytes(4, "big")
+        for key, value in obj.items():
+            encoded = key.encode("utf-8")
+            buffer.append(etf.SMALL_ATOM_UTF8_EXT)
+            buffer.append(len(encoded))
+            buffer += encoded
+            if (key == "id" or key.endswith("_id")) and isinstance(value, str) and value.isdigit():
+                value = int(value)
+            encode_etf(value, buffer)
+    elif isinstance(obj, list):
+        if obj:
+            buffer.append(etf.LIST_EXT)
+            buffer += len(obj).to_bytes(4, "big")
+            for item in obj:
+                encode_etf(item, buffer)
+        buffer.append(etf.NIL_EXT)
+    else:
+        etf._encode_term(obj, buffer)
+
+
+def measure(decode, data, number):
+    decode(data)
+    start = time.perf_counter()
+    for _ in range(number):
+        decode(data)
+    elapsed = (time.perf_counter() - start) / number
+
+    gc.collect()
+    tracemalloc.start()
+    kept = decode(data)
+    blocks = sum(stat.count for stat in tracemalloc.take_snapshot().statistics("filename"))
+    tracemalloc.stop()
+    del kept
+    return elapsed, blocks
+
+
+def main():
+    decoders = [("json", json.loads, False)]
+    if orjson is not None:
+        decoders.append(("orjson", orjson.loads, False))
+    decoders.append(("etf (pure Python)", etf._py_from_etf, True))
+    if erlpack is not None:
+        decoders.append(("etf (erlpack)", erlpack.ErlangTermDecoder(encoding="utf-8").loads, True))
+
+    for name, payload, number in (("MESSAGE_CREATE", MESSAGE_CREATE, 20000), ("GUILD_CREATE", GUILD_CREATE, 20)):
+        as_json = json.dumps(payload, separators=(",", ":"))
+        buffer = bytearray((etf.FORMAT_VERSION,))
+        encode_etf(payload, buffer)
+        as_etf = bytes(buffer)
+        print(f"{name}: {len(as_json)} B as JSON, {len(as_etf)} B as ETF")
+        for label, decode, is_etf in decoders:
+            elapsed, blocks = measure(decode, as_etf if is_etf else as_json, number)
+            unit = f"{elapsed * 1e6:9.1f} us" if elapsed < 1e-3 else f"{elapsed * 1e3:9.1f} ms"
+            print(f"  {label:<18} {unit}  {blocks:>6} blocks")
+
+
+if __name__ == "__main__":
+    main()
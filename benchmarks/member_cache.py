@@ -0,0 +1,75 @@
+"""Measures the memory used by the member cache of a large guild, with and without
+:class:`discord.ColumnarMemberBackend`, and the peak memory of scanning it.
+
+Run with ``python benchmarks/member_cache.py [members]`` from the repository root.
+"""
+
+import asyncio
+import gc
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import discord
+from discord.cache import ColumnarMemberBackend, LRUCacheBackend
+from discord.fake_gateway import FakeGateway
+from discord.state import ConnectionState
+
+
+def columnar(name):
+    if name == "members":
+        return ColumnarMemberBackend()
+    if name == "users":
+        return LRUCacheBackend(1024)
+    return {}
+
+
+async def measure(label, cache_backend, payload, members):
+    state = ConnectionState(
+        dispatch=lambda *args, **kwargs: None,
+        handlers={},
+        hooks={},
+        http=None,
+        loop=asyncio.get_running_loop(),
+        intents=discord.Intents.all(),
+        cache_backend=cache_backend,
+    )
+    data = dict(payload, members=list(payload["members"]))
+
+    gc.collect()
+    tracemalloc.start()
+    guild = state._add_guild_from_data(data)
+    del data
+    gc.collect()
+    size = tracemalloc.get_traced_memory()[0]
+
+    # scanning the members, the lookup misses so every member is checked
+    tracemalloc.reset_peak()
+    guild.get_member_named("nobody")
+    peak = tracemalloc.get_traced_memory()[1] - size
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    guild.get_member_named("nobody")
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"{label:<36} {size / members:>7.0f} B/member {size / 2 ** 20:>7.1f} MiB"
+        f"   get_member_named: {elapsed * 1e3:>6.0f}ms, peak +{peak / 2 ** 20:.1f} MiB"
+    )
+
+
+async def main():
+    members = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    gateway = FakeGateway(guilds=1, members_per_guild=members)
+    payload = gateway._guild_create(gateway._guild_ids[0])
+    print(f"one guild with {members} members, measured with tracemalloc")
+    await measure("Guild._members dict (default)", None, payload, members)
+    await measure("ColumnarMemberBackend + LRU users", columnar, payload, members)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
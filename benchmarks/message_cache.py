@@ -0,0 +1,49 @@
+"""Compares looking up a message in the message cache with the deque scan it replaced.
+
+Run with ``python benchmarks/message_cache.py`` from the repository root.
+"""
+
+import os
+import sys
+import timeit
+from collections import deque
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from discord.cache import MessageCache
+
+
+def deque_lookup(messages, message_id):
+    # what ConnectionState._get_message did before the cache was indexed
+    return next((m for m in reversed(messages) if m.id == message_id), None)
+
+
+def fmt(seconds):
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.1f}ms"
+    if seconds >= 1e-6:
+        return f"{seconds * 1e6:.1f}us"
+    return f"{seconds * 1e9:.0f}ns"
+
+
+def main():
+    print(f"{'size':>8} {'MessageCache.get':>18} {'deque scan':>12}")
+    for size in (1000, 10000, 50000):
+        messages = [SimpleNamespace(id=i, guild=None) for i in range(size)]
+        cache = MessageCache(size)
+        old = deque(maxlen=size)
+        for message in messages:
+            cache.append(message)
+            old.append(message)
+
+        target = size // 2
+        number = 100000
+        indexed = min(timeit.repeat(lambda: cache.get(target), number=number, repeat=5)) / number
+        number = max(10, 100000 // size)
+        scanned = min(timeit.repeat(lambda: deque_lookup(old, target), number=number, repeat=5)) / number
+        print(f"{size:>8} {fmt(indexed):>18} {fmt(scanned):>12}")
+
+
+if __name__ == "__main__":
+    main()
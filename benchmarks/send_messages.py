@@ -0,0 +1,50 @@
+"""Measures how many messages a second concurrent ``send_message`` calls to one channel
+reach against the fake gateway's REST server, and how many 429s they run into.
+
+The channel's bucket allows 50 messages a second and every request takes 50ms, so
+requests sent one at a time per bucket top out at about 19 messages a second, while
+requests sent concurrently within the bucket's remaining count approach its limit.
+
+Run with ``python benchmarks/send_messages.py [messages]`` from the repository root.
+"""
+
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from discord.fake_gateway import FakeGateway
+from discord.http import HTTPClient
+
+
+async def main():
+    messages = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    gateway = FakeGateway(
+        rest_latency=0.05,
+        global_rate_limit=1000,
+        rest_buckets={("POST", "/channels/{channel_id}/messages"): ("messages", 50, 1.0)},
+    )
+    await gateway.start()
+    http = HTTPClient(api_url=gateway.api_url)
+    await http.static_login("fake")
+    channel_id = gateway._channel_id(gateway._guild_ids[0], 0)
+    try:
+        # the first request learns the bucket's limits
+        await http.send_message(channel_id, "warm up")
+        start = time.perf_counter()
+        await asyncio.gather(*(http.send_message(channel_id, str(i)) for i in range(messages)))
+        elapsed = time.perf_counter() - start
+    finally:
+        await http.close()
+        await gateway.close()
+
+    print(
+        f"{messages} messages to one channel (50/1s bucket, 50ms RTT): "
+        f"{messages / elapsed:.1f} msg/s, {gateway.rate_limited} 429s"
+    )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -60,6 +60,14 @@ from .stage_instance import *
 from .interactions import *
 from .components import *
 from .threads import *
+from .cache import *
+from .session import *
+from .dispatcher import *
+from .timings import *
+from .recorder import *
+from .cluster import *
+from .scheduler import *
+from .ratelimits import *
 
 
 class VersionInfo(NamedTuple):
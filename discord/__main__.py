@@ -290,6 +290,30 @@ def newcog(parser, args):
         print("successfully made cog at", directory)
 
 
+def replay(parser, args):
+    import asyncio
+
+    try:
+        result = asyncio.run(discord.replay_recording(args.path, speed=args.speed, trace_memory=args.trace_memory))
+    except (OSError, ValueError) as exc:
+        parser.error(str(exc))
+
+    print(f"replayed {result.events} events in {result.duration:.2f}s ({result.events_per_second:.0f} events/s)")
+    if result.peak_memory is not None:
+        print(f"peak memory: {result.peak_memory / 1024 / 1024:.1f} MiB")
+
+
+def add_replay_args(subparser):
+    parser = subparser.add_parser("replay", help="replays a gateway recording to benchmark event parsing")
+    parser.set_defaults(func=replay)
+
+    parser.add_argument("path", help="the recording made with discord.GatewayRecorder")
+    parser.add_argument(
+        "--speed", help="replay speed relative to the recording (default: as fast as possible)", type=float
+    )
+    parser.add_argument("--trace-memory", help="measure the peak memory used", action="store_true", dest="trace_memory")
+
+
 def add_newbot_args(subparser):
     parser = subparser.add_parser("newbot", help="creates a command bot project quickly")
     parser.set_defaults(func=newbot)
@@ -323,6 +347,7 @@ def parse_args():
     subparser = parser.add_subparsers(dest="subcommand", title="subcommands")
     add_newbot_args(subparser)
     add_newcog_args(subparser)
+    add_replay_args(subparser)
     return parser, parser.parse_args()
 
 
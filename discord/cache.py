@@ -0,0 +1,885 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015-present Rapptz
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from __future__ import annotations
+
+from array import array
+from collections import OrderedDict
+import collections.abc
+import datetime
+import itertools
+import math
+import os
+import sqlite3
+import sys
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    MutableMapping,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+    TypeVar,
+)
+
+from . import utils
+
+if TYPE_CHECKING:
+    from .message import Message
+
+V = TypeVar("V")
+
+__all__ = (
+    "MessageCacheStats",
+    "CacheBackend",
+    "LRUCacheBackend",
+    "SQLiteCacheBackend",
+    "ColumnarMemberBackend",
+)
+
+
+class MessageCacheStats(NamedTuple):
+    """Represents the message cache statistics of a single guild.
+
+    These are returned by :attr:`Client.message_cache_stats` when a per-guild
+    or per-channel message cache limit is set.
+
+    .. versionadded:: 2.0
+
+    Attributes
+    -----------
+    cached: :class:`int`
+        The number of messages currently cached for the guild.
+    hits: :class:`int`
+        The number of message lookups that were found in the cache.
+    misses: :class:`int`
+        The number of message lookups that were not found in the cache.
+    evicted: :class:`int`
+        The number of messages evicted from the cache to make room for newer ones.
+    """
+
+    cached: int
+    hits: int
+    misses: int
+    evicted: int
+
+    @property
+    def hit_rate(self) -> float:
+        """:class:`float`: The ratio of lookups that were found in the cache. ``0.0`` if no lookups happened."""
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class MessageCache(collections.abc.Sequence):
+    """An insertion ordered message cache keyed by message ID.
+
+    This replaces the ``deque`` that used to back the message cache, which
+    required a linear scan for every lookup. Messages are evicted in FIFO
+    order once ``maxlen`` is exceeded, same as the ``deque`` did.
+
+    Positional access is supported for :attr:`Client.cached_messages` but is
+    ``O(n)``, lookups by ID through :meth:`get` and :meth:`pop` are ``O(1)``.
+    """
+
+    __slots__ = ("maxlen", "_data")
+
+    def __init__(self, maxlen: int) -> None:
+        self.maxlen: int = maxlen
+        self._data: OrderedDict[int, Message] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def __iter__(self) -> Iterator[Message]:
+        return iter(self._data.values())
+
+    def __reversed__(self) -> Iterator[Message]:
+        return reversed(self._data.values())
+
+    def __contains__(self, message: Any) -> bool:
+        try:
+            return self._data[message.id] is message
+        except (AttributeError, KeyError):
+            return False
+
+    def __getitem__(self, idx: Any) -> Any:
+        return list(self._data.values())[idx]
+
+    def append(self, message: Message) -> None:
+        data = self._data
+        data[message.id] = message
+        if len(data) > self.maxlen:
+            data.popitem(last=False)
+
+    def get(self, message_id: Optional[int], guild_id: Optional[int] = None) -> Optional[Message]:
+        # the keys of self._data are ints
+        return self._data.get(message_id)  # type: ignore
+
+    def pop(self, message_id: int) -> Optional[Message]:
+        return self._data.pop(message_id, None)
+
+    def remove(self, message: Message) -> None:
+        self._data.pop(message.id, None)
+
+    def pop_many(self, message_ids: Iterable[int]) -> List[Message]:
+        data = self._data
+        found = []
+        for message_id in message_ids:
+            message = data.pop(message_id, None)
+            if message is not None:
+                found.append(message)
+        return found
+
+    def get_many(self, message_ids: Iterable[int]) -> List[Message]:
+        data = self._data
+        return [data[message_id] for message_id in message_ids if message_id in data]
+
+    def remove_guild(self, guild_id: int) -> None:
+        data = self._data
+        to_remove = [k for k, m in data.items() if m.guild is not None and m.guild.id == guild_id]
+        for k in to_remove:
+            del data[k]
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class GuildMessageCache(MessageCache):
+    """A :class:`MessageCache` that additionally enforces per-guild and per-channel quotas.
+
+    ``maxlen`` acts as a global ceiling. When it is exceeded, the oldest message
+    of the guild with the most cached messages is evicted, rather than the
+    globally oldest message, so a single busy guild cannot flush the history
+    of every other guild. Direct messages are accounted under the ``None`` key.
+    """
+
+    __slots__ = (
+        "max_per_guild",
+        "max_per_channel",
+        "_guilds",
+        "_channels",
+        "_sizes",
+        "_largest",
+        "_hits",
+        "_misses",
+        "_evicted",
+    )
+
+    def __init__(self, maxlen: int, *, max_per_guild: Optional[int] = None, max_per_channel: Optional[int] = None):
+        super().__init__(maxlen)
+        self.max_per_guild: Optional[int] = max_per_guild
+        self.max_per_channel: Optional[int] = max_per_channel
+        self._guilds: Dict[Optional[int], OrderedDict[int, None]] = {}
+        self._channels: Dict[int, OrderedDict[int, None]] = {}
+        # guild size -> guilds of that size, used to find the largest guild in O(1)
+        self._sizes: Dict[int, Set[Optional[int]]] = {}
+        self._largest: int = 0
+        self._hits: Dict[Optional[int], int] = {}
+        self._misses: Dict[Optional[int], int] = {}
+        self._evicted: Dict[Optional[int], int] = {}
+
+    @staticmethod
+    def _guild_key(message: Message) -> Optional[int]:
+        guild = message.guild
+        return guild.id if guild is not None else None
+
+    def _resize(self, guild_id: Optional[int], old: int, new: int) -> None:
+        sizes = self._sizes
+        if old:
+            bucket = sizes[old]
+            bucket.discard(guild_id)
+            if not bucket:
+                del sizes[old]
+                if old == self._largest and new < old:
+                    # sizes only ever move by one so the next largest is directly below
+                    self._largest = new
+
+        if new:
+            sizes.setdefault(new, set()).add(guild_id)
+            if new > self._largest:
+                self._largest = new
+
+    def _evict(self, message_id: int) -> None:
+        message = self._discard(message_id)
+        if message is not None:
+            guild_id = self._guild_key(message)
+            self._evicted[guild_id] = self._evicted.get(guild_id, 0) + 1
+
+    def _discard(self, message_id: int) -> Optional[Message]:
+        message = self._data.pop(message_id, None)
+        if message is None:
+            return None
+
+        guild_id = self._guild_key(message)
+        guild_ids = self._guilds[guild_id]
+        del guild_ids[message_id]
+        size = len(guild_ids)
+        self._resize(guild_id, size + 1, size)
+        if not size:
+            del self._guilds[guild_id]
+
+        channel_id = message.channel.id
+        channel_ids = self._channels[channel_id]
+        del channel_ids[message_id]
+        if not channel_ids:
+            del self._channels[channel_id]
+
+        return message
+
+    def append(self, message: Message) -> None:
+        message_id = message.id
+        if message_id in self._data:
+            self._discard(message_id)
+
+        self._data[message_id] = message
+        guild_id = self._guild_key(message)
+        guild_ids = self._guilds.setdefault(guild_id, OrderedDict())
+        guild_ids[message_id] = None
+        self._resize(guild_id, len(guild_ids) - 1, len(guild_ids))
+
+        channel_ids = self._channels.setdefault(message.channel.id, OrderedDict())
+        channel_ids[message_id] = None
+
+        if self.max_per_channel is not None and len(channel_ids) > self.max_per_channel:
+            self._evict(next(iter(channel_ids)))
+
+        if self.max_per_guild is not None and len(guild_ids) > self.max_per_guild:
+            self._evict(next(iter(guild_ids)))
+
+        if len(self._data) > self.maxlen:
+            self._evict(self._oldest_of_largest(message_id))
+
+    def _oldest_of_largest(self, message_id: int) -> int:
+        # on a tie, the guild of the message being added would lose that very message
+        # if it holds nothing else, so the oldest message of another guild is picked
+        for guild_id in self._sizes[self._largest]:
+            oldest = next(iter(self._guilds[guild_id]))
+            if oldest != message_id:
+                return oldest
+        return message_id
+
+    def get(self, message_id: Optional[int], guild_id: Optional[int] = None) -> Optional[Message]:
+        # the keys of self._data are ints
+        message = self._data.get(message_id)  # type: ignore
+        if message is not None:
+            self._hits[guild_id] = self._hits.get(guild_id, 0) + 1
+        else:
+            self._misses[guild_id] = self._misses.get(guild_id, 0) + 1
+        return message
+
+    def pop(self, message_id: int) -> Optional[Message]:
+        return self._discard(message_id)
+
+    def remove(self, message: Message) -> None:
+        self._discard(message.id)
+
+    def pop_many(self, message_ids: Iterable[int]) -> List[Message]:
+        found = []
+        for message_id in message_ids:
+            message = self._discard(message_id)
+            if message is not None:
+                found.append(message)
+        return found
+
+    def remove_guild(self, guild_id: int) -> None:
+        guild_ids = self._guilds.get(guild_id)
+        if guild_ids is not None:
+            for message_id in list(guild_ids):
+                self._discard(message_id)
+
+        self._hits.pop(guild_id, None)
+        self._misses.pop(guild_id, None)
+        self._evicted.pop(guild_id, None)
+
+    def clear(self) -> None:
+        super().clear()
+        self._guilds.clear()
+        self._channels.clear()
+        self._sizes.clear()
+        self._largest = 0
+
+    def stats(self) -> Dict[Optional[int], MessageCacheStats]:
+        keys = set(self._guilds).union(self._hits, self._misses, self._evicted)
+        return {
+            guild_id: MessageCacheStats(
+                cached=len(self._guilds.get(guild_id, ())),
+                hits=self._hits.get(guild_id, 0),
+                misses=self._misses.get(guild_id, 0),
+                evicted=self._evicted.get(guild_id, 0),
+            )
+            for guild_id in keys
+        }
+
+
+class CacheBackend(MutableMapping[int, V]):
+    """The base class for the storage backing the library's internal caches.
+
+    The library stores users, members, emojis and stickers in mappings keyed by ID.
+    By default these are plain :class:`dict` instances. Passing ``cache_backend`` to
+    :class:`Client` allows replacing them, trading memory for lookup latency.
+
+    Any :class:`collections.abc.MutableMapping` can be used as a backend. Subclassing
+    this class is only necessary to receive the serialization callbacks through :meth:`bind`.
+
+    The names of the caches passed to the ``cache_backend`` factory are:
+
+    - ``"users"`` for :meth:`Client.get_user`.
+    - ``"members"`` for :meth:`Guild.get_member`, one per guild.
+    - ``"emojis"`` for :meth:`Client.get_emoji`.
+    - ``"stickers"`` for :meth:`Client.get_sticker`.
+
+    .. versionadded:: 2.0
+    """
+
+    def bind(
+        self,
+        name: str,
+        dump: Optional[Callable[[V], Dict[str, Any]]],
+        load: Optional[Callable[[Dict[str, Any]], V]],
+    ) -> None:
+        """Called by the library once the backend is created.
+
+        ``dump`` and ``load`` convert a value to and from a JSON serialisable payload.
+        They are ``None`` for caches whose values cannot be serialised, in which case
+        the values must be kept in memory.
+
+        The default implementation does nothing.
+
+        Parameters
+        -----------
+        name: :class:`str`
+            The name of the cache this backend is used for.
+        dump: Optional[Callable[[Any], Dict[:class:`str`, Any]]]
+            A function converting a value to a payload.
+        load: Optional[Callable[[Dict[:class:`str`, Any]], Any]]
+            A function converting a payload back to a value.
+        """
+        pass
+
+
+class LRUCacheBackend(CacheBackend[V]):
+    """A cache backend bounded to a maximum number of entries.
+
+    Once full, the least recently accessed entry is evicted. Evicted entries are simply
+    dropped, the library falls back to creating a new object the next time it sees the data.
+
+    .. versionadded:: 2.0
+
+    Parameters
+    -----------
+    maxsize: :class:`int`
+        The maximum number of entries to keep.
+    """
+
+    def __init__(self, maxsize: int) -> None:
+        if maxsize <= 0:
+            raise ValueError("maxsize must be greater than 0")
+
+        self.maxsize: int = maxsize
+        self._data: OrderedDict[int, V] = OrderedDict()
+
+    def __getitem__(self, key: int) -> V:
+        value = self._data[key]
+        self._data.move_to_end(key)
+        return value
+
+    def __setitem__(self, key: int, value: V) -> None:
+        data = self._data
+        data[key] = value
+        data.move_to_end(key)
+        if len(data) > self.maxsize:
+            data.popitem(last=False)
+
+    def __delitem__(self, key: int) -> None:
+        del self._data[key]
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._data
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._data)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    # iterating shouldn't count as an access, move_to_end would also break the iteration
+    def values(self) -> Any:
+        return self._data.values()
+
+    def items(self) -> Any:
+        return self._data.items()
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class SQLiteCacheBackend(CacheBackend[V]):
+    """A cache backend that keeps recently used entries in memory and spills the rest to SQLite.
+
+    Entries evicted from the in-memory tier are serialised and written to the database,
+    then loaded back and promoted to the in-memory tier on their next access. Only the
+    IDs of the spilled entries are kept in memory.
+
+    Spilled members lose their presence information (status and activities), since it is
+    not part of the stored payload.
+
+    Caches that cannot be serialised (see :meth:`CacheBackend.bind`) are kept entirely in memory.
+
+    .. warning::
+
+        Database access is synchronous and blocks the event loop, this backend should
+        only be used for data that is rarely accessed.
+
+    .. versionadded:: 2.0
+
+    Parameters
+    -----------
+    path: :class:`str`
+        The path to the database file. Backends using the same path share a connection.
+        Several processes can use the same path, each one only sees its own entries.
+        The database is only used as a cache and is not meant to outlive the process.
+    hot_size: :class:`int`
+        The maximum number of entries to keep in memory. Defaults to ``1000``.
+    """
+
+    _connections: Dict[str, sqlite3.Connection] = {}
+    _namespaces: Iterator[int] = itertools.count()
+
+    def __init__(self, path: str, *, hot_size: int = 1000) -> None:
+        if hot_size <= 0:
+            raise ValueError("hot_size must be greater than 0")
+
+        self.path: str = path
+        self.hot_size: int = hot_size
+        self._hot: OrderedDict[int, V] = OrderedDict()
+        self._cold: Set[int] = set()
+        # the process ID keeps processes sharing the database from clearing each other's entries
+        self._namespace: str = f"{os.getpid()}:{next(self._namespaces)}"
+        self._dump: Optional[Callable[[V], Dict[str, Any]]] = None
+        self._load: Optional[Callable[[Dict[str, Any]], V]] = None
+
+        try:
+            self._db: sqlite3.Connection = self._connections[path]
+        except KeyError:
+            self._db = db = sqlite3.connect(path, isolation_level=None)
+            # this is a cache, durability is not a concern
+            db.execute("PRAGMA journal_mode=MEMORY")
+            db.execute("PRAGMA synchronous=OFF")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS discord_cache "
+                "(namespace TEXT NOT NULL, id INTEGER NOT NULL, data TEXT NOT NULL, PRIMARY KEY (namespace, id))"
+            )
+            # leftovers from processes that are gone, including a previous one with this ID
+            for (namespace,) in db.execute("SELECT DISTINCT namespace FROM discord_cache").fetchall():
+                pid = namespace.partition(":")[2].partition(":")[0]
+                if not pid.isdigit() or int(pid) == os.getpid() or not _process_exists(int(pid)):
+                    db.execute("DELETE FROM discord_cache WHERE namespace = ?", (namespace,))
+            self._connections[path] = db
+
+    def bind(
+        self,
+        name: str,
+        dump: Optional[Callable[[V], Dict[str, Any]]],
+        load: Optional[Callable[[Dict[str, Any]], V]],
+    ) -> None:
+        self._namespace = f"{name}:{self._namespace}"
+        self._dump = dump
+        self._load = load
+
+    def _spill(self) -> None:
+        if self._dump is None:
+            return
+
+        hot = self._hot
+        rows: List[Tuple[str, int, str]] = []
+        while len(hot) > self.hot_size:
+            key, value = hot.popitem(last=False)
+            rows.append((self._namespace, key, utils._to_json(self._dump(value))))
+            self._cold.add(key)
+
+        self._db.executemany("INSERT OR REPLACE INTO discord_cache VALUES (?, ?, ?)", rows)
+
+    def _fetch(self, key: int) -> V:
+        cursor = self._db.execute(
+            "SELECT data FROM discord_cache WHERE namespace = ? AND id = ?", (self._namespace, key)
+        )
+        row = cursor.fetchone()
+        if row is None:
+            # should not happen unless the database was tampered with
+            self._cold.discard(key)
+            raise KeyError(key)
+
+        # the load function is set if there is anything in the cold tier
+        return self._load(utils._from_json(row[0]))  # type: ignore
+
+    def __getitem__(self, key: int) -> V:
+        hot = self._hot
+        try:
+            value = hot[key]
+        except KeyError:
+            if key not in self._cold:
+                raise
+
+            value = self._fetch(key)
+            self._cold.discard(key)
+            self._db.execute("DELETE FROM discord_cache WHERE namespace = ? AND id = ?", (self._namespace, key))
+            hot[key] = value
+            self._spill()
+        else:
+            hot.move_to_end(key)
+        return value
+
+    def __setitem__(self, key: int, value: V) -> None:
+        if key in self._cold:
+            self._cold.discard(key)
+            self._db.execute("DELETE FROM discord_cache WHERE namespace = ? AND id = ?", (self._namespace, key))
+
+        hot = self._hot
+        hot[key] = value
+        hot.move_to_end(key)
+        if len(hot) > self.hot_size:
+            self._spill()
+
+    def __delitem__(self, key: int) -> None:
+        try:
+            del self._hot[key]
+        except KeyError:
+            if key not in self._cold:
+                raise
+
+            self._cold.discard(key)
+            self._db.execute("DELETE FROM discord_cache WHERE namespace = ? AND id = ?", (self._namespace, key))
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._hot or key in self._cold
+
+    def __iter__(self) -> Iterator[int]:
+        yield from list(self._hot)
+        yield from list(self._cold)
+
+    def __len__(self) -> int:
+        return len(self._hot) + len(self._cold)
+
+    def items(self) -> Any:
+        # entries are not promoted when iterating
+        items = list(self._hot.items())
+        if self._cold:
+            load = self._load
+            cursor = self._db.execute("SELECT id, data FROM discord_cache WHERE namespace = ?", (self._namespace,))
+            items.extend((key, load(utils._from_json(data))) for key, data in cursor)  # type: ignore
+        return items
+
+    def values(self) -> Any:
+        return [value for _, value in self.items()]
+
+    def clear(self) -> None:
+        self._hot.clear()
+        if self._cold:
+            self._cold.clear()
+            self._db.execute("DELETE FROM discord_cache WHERE namespace = ?", (self._namespace,))
+
+
+def _process_exists(pid: int) -> bool:
+    if os.name != "posix":
+        # signal 0 only checks for the process on POSIX, keep the entries
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # it exists but belongs to another user
+        pass
+    return True
+
+
+class _ColumnarItemsView(collections.abc.ItemsView):
+    _mapping: ColumnarMemberBackend
+
+    def __iter__(self) -> Iterator[Tuple[int, Any]]:
+        return self._mapping._iter_items()
+
+
+class _ColumnarValuesView(collections.abc.ValuesView):
+    _mapping: ColumnarMemberBackend
+
+    def __iter__(self) -> Iterator[Any]:
+        return (value for _, value in self._mapping._iter_items())
+
+
+def _to_timestamp(value: Optional[str]) -> float:
+    if value is None:
+        return math.nan
+    return datetime.datetime.fromisoformat(value).timestamp()
+
+
+def _from_timestamp(value: float) -> Optional[str]:
+    if math.isnan(value):
+        return None
+    return datetime.datetime.fromtimestamp(value, tz=datetime.timezone.utc).isoformat()
+
+
+class ColumnarMemberBackend(CacheBackend[V]):
+    """A cache backend storing members column by column in compact arrays.
+
+    This is meant for the ``"members"`` cache of very large guilds. Recently accessed
+    members are kept as regular :class:`Member` objects, the rest are stored as rows
+    of packed arrays (IDs, timestamps, flags), shared role ID tuples and interned strings.
+    Rows are turned back into :class:`Member` objects on access.
+
+    Iterating over the values or items of the backend does not build every member up
+    front, each row is turned into a :class:`Member` as it is reached and is not kept.
+
+    Members stored in the arrays lose their presence information (status and activities).
+    Since :class:`Member` objects create their :class:`User` through the user cache,
+    pairing this with a bounded ``"users"`` cache such as :class:`LRUCacheBackend`
+    is recommended.
+
+    For caches other than ``"members"``, this behaves like a regular dictionary.
+
+    .. versionadded:: 2.0
+
+    Parameters
+    -----------
+    hot_size: :class:`int`
+        The maximum number of members to keep as objects. Defaults to ``1024``.
+    """
+
+    # bits of the flags column
+    _PENDING = 1 << 0
+    _BOT = 1 << 1
+    _SYSTEM = 1 << 2
+
+    def __init__(self, *, hot_size: int = 1024) -> None:
+        if hot_size <= 0:
+            raise ValueError("hot_size must be greater than 0")
+
+        self.hot_size: int = hot_size
+        self._hot: OrderedDict[int, V] = OrderedDict()
+        self._dump: Optional[Callable[[V], Dict[str, Any]]] = None
+        self._load: Optional[Callable[[Dict[str, Any]], V]] = None
+
+        # member ID -> row
+        self._rows: Dict[int, int] = {}
+        self._ids: array = array("Q")
+        self._joined_at: array = array("d")
+        self._premium_since: array = array("d")
+        self._timeout_until: array = array("d")
+        self._flags: array = array("B")
+        self._public_flags: array = array("Q")
+        self._roles: List[Tuple[int, ...]] = []
+        self._usernames: List[str] = []
+        self._discriminators: List[str] = []
+        self._nicks: List[Optional[str]] = []
+        self._avatars: List[Optional[str]] = []
+        self._user_avatars: List[Optional[str]] = []
+        self._banners: List[Optional[str]] = []
+        self._accent_colours: List[Optional[int]] = []
+        # role ID tuples are shared between members with the same roles
+        self._role_sets: Dict[Tuple[int, ...], Tuple[int, ...]] = {}
+
+        self._columns: Tuple[Any, ...] = (
+            self._ids,
+            self._joined_at,
+            self._premium_since,
+            self._timeout_until,
+            self._flags,
+            self._public_flags,
+            self._roles,
+            self._usernames,
+            self._discriminators,
+            self._nicks,
+            self._avatars,
+            self._user_avatars,
+            self._banners,
+            self._accent_colours,
+        )
+
+    def bind(
+        self,
+        name: str,
+        dump: Optional[Callable[[V], Dict[str, Any]]],
+        load: Optional[Callable[[Dict[str, Any]], V]],
+    ) -> None:
+        if name == "members":
+            self._dump = dump
+            self._load = load
+
+    def _pack(self, key: int, data: Dict[str, Any]) -> None:
+        user = data["user"]
+        flags = 0
+        if data.get("pending"):
+            flags |= self._PENDING
+        if user.get("bot"):
+            flags |= self._BOT
+        if user.get("system"):
+            flags |= self._SYSTEM
+
+        roles = tuple(map(int, data["roles"]))
+        roles = self._role_sets.setdefault(roles, roles)
+
+        self._rows[key] = len(self._ids)
+        self._ids.append(key)
+        self._joined_at.append(_to_timestamp(data.get("joined_at")))
+        self._premium_since.append(_to_timestamp(data.get("premium_since")))
+        self._timeout_until.append(_to_timestamp(data.get("communication_disabled_until")))
+        self._flags.append(flags)
+        self._public_flags.append(user.get("public_flags", 0))
+        self._roles.append(roles)
+        self._usernames.append(sys.intern(user["username"]))
+        self._discriminators.append(sys.intern(user["discriminator"]))
+        nick = data.get("nick")
+        self._nicks.append(nick and sys.intern(nick))
+        self._avatars.append(data.get("avatar"))
+        self._user_avatars.append(user["avatar"])
+        self._banners.append(user.get("banner"))
+        self._accent_colours.append(user.get("accent_color"))
+
+    def _unpack(self, row: int) -> Dict[str, Any]:
+        flags = self._flags[row]
+        return {
+            "user": {
+                "id": self._ids[row],
+                "username": self._usernames[row],
+                "discriminator": self._discriminators[row],
+                "avatar": self._user_avatars[row],
+                "bot": bool(flags & self._BOT),
+                "system": bool(flags & self._SYSTEM),
+                "public_flags": self._public_flags[row],
+                "banner": self._banners[row],
+                "accent_color": self._accent_colours[row],
+            },
+            "roles": list(self._roles[row]),
+            "joined_at": _from_timestamp(self._joined_at[row]),
+            "premium_since": _from_timestamp(self._premium_since[row]),
+            "communication_disabled_until": _from_timestamp(self._timeout_until[row]),
+            "nick": self._nicks[row],
+            "pending": bool(flags & self._PENDING),
+            "avatar": self._avatars[row],
+        }
+
+    def _delete_row(self, key: int) -> None:
+        row = self._rows.pop(key)
+        last = len(self._ids) - 1
+        if row != last:
+            # move the last row into the hole to keep the arrays dense
+            for column in self._columns:
+                column[row] = column[last]
+            self._rows[self._ids[row]] = row
+
+        for column in self._columns:
+            column.pop()
+
+    def _spill(self) -> None:
+        if self._dump is None:
+            return
+
+        hot = self._hot
+        dump = self._dump
+        while len(hot) > self.hot_size:
+            key, value = hot.popitem(last=False)
+            self._pack(key, dump(value))
+
+    def __getitem__(self, key: int) -> V:
+        hot = self._hot
+        try:
+            value = hot[key]
+        except KeyError:
+            row = self._rows.get(key)
+            if row is None:
+                raise
+
+            # the load function is set if there are any rows
+            value = self._load(self._unpack(row))  # type: ignore
+            self._delete_row(key)
+            hot[key] = value
+            self._spill()
+        else:
+            hot.move_to_end(key)
+        return value
+
+    def __setitem__(self, key: int, value: V) -> None:
+        if key in self._rows:
+            self._delete_row(key)
+
+        hot = self._hot
+        hot[key] = value
+        hot.move_to_end(key)
+        if len(hot) > self.hot_size:
+            self._spill()
+
+    def __delitem__(self, key: int) -> None:
+        try:
+            del self._hot[key]
+        except KeyError:
+            if key not in self._rows:
+                raise
+            self._delete_row(key)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._hot or key in self._rows
+
+    def __iter__(self) -> Iterator[int]:
+        yield from list(self._hot)
+        yield from self._ids.tolist()
+
+    def __len__(self) -> int:
+        return len(self._hot) + len(self._ids)
+
+    def _iter_items(self) -> Iterator[Tuple[int, V]]:
+        # both tiers are copied before the first item is produced, since the caller
+        # may access members and move them between tiers while iterating
+        return self._iter_rows(list(self._hot.items()), array("Q", self._ids))
+
+    def _iter_rows(self, hot: List[Tuple[int, V]], ids: array) -> Iterator[Tuple[int, V]]:
+        yield from hot
+        load: Callable[[Dict[str, Any]], V] = self._load  # type: ignore
+        for key in ids:
+            # rows are not promoted when iterating, rows promoted in the meantime are in the hot tier
+            row = self._rows.get(key)
+            if row is not None:
+                yield key, load(self._unpack(row))
+            else:
+                value = self._hot.get(key)
+                if value is not None:
+                    yield key, value
+
+    def items(self) -> Any:
+        return _ColumnarItemsView(self)
+
+    def values(self) -> Any:
+        return _ColumnarValuesView(self)
+
+    def clear(self) -> None:
+        self._hot.clear()
+        self._rows.clear()
+        self._role_sets.clear()
+        for column in self._columns:
+            del column[:]
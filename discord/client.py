@@ -28,6 +28,7 @@ import asyncio
 import logging
 import signal
 import sys
+import time
 import traceback
 from typing import (
     Any,
@@ -35,6 +36,7 @@ from typing import (
     Coroutine,
     Dict,
     Generator,
+    Iterable,
     List,
     Optional,
     Sequence,
@@ -76,6 +78,13 @@ from .stage_instance import StageInstance
 from .threads import Thread
 from .sticker import GuildSticker, StandardSticker, StickerPack, _sticker_factory
 from .app import Command, CommandState
+from .session import SessionStore
+from .dispatcher import EventWorkerPool
+from .timings import EventTimings
+from .recorder import GatewayRecorder
+from .ratelimits import RateLimitStore
+from .scheduler import RequestScheduler
+from .snapshot import read_snapshot, write_snapshot
 
 if TYPE_CHECKING:
     from .abc import SnowflakeTime, PrivateChannel, GuildChannel, Snowflake
@@ -84,6 +93,9 @@ if TYPE_CHECKING:
     from .member import Member
     from .voice_client import VoiceProtocol
     from .interactions import Interaction
+    from .cache import MessageCacheStats
+    from .session import SessionInfo
+    from .cluster import Cluster
 
 __all__ = ("Client",)
 
@@ -92,6 +104,42 @@ ApplicationCommand = TypeVar("ApplicationCommand", bound=Type[Command])
 
 _log = logging.getLogger(__name__)
 
+_message_keys: Dict[str, Callable[..., Any]] = {
+    "channel_id": lambda m: m.channel.id,
+    "author_id": lambda m: m.author.id,
+    "message_id": lambda m: m.id,
+}
+_reaction_keys: Dict[str, Callable[..., Any]] = {
+    "message_id": lambda r, u: r.message.id,
+    "channel_id": lambda r, u: r.message.channel.id,
+    "user_id": lambda r, u: u.id,
+}
+_raw_reaction_keys: Dict[str, Callable[..., Any]] = {
+    "message_id": lambda p: p.message_id,
+    "channel_id": lambda p: p.channel_id,
+    "user_id": lambda p: p.user_id,
+}
+
+# the keys that Client.wait_for can index listeners by, per event
+_LISTENER_KEYS: Dict[str, Dict[str, Callable[..., Any]]] = {
+    "message": {k: v for k, v in _message_keys.items() if k != "message_id"},
+    "message_edit": {k: (lambda f: lambda b, a: f(a))(v) for k, v in _message_keys.items()},
+    "message_delete": _message_keys,
+    "reaction_add": _reaction_keys,
+    "reaction_remove": _reaction_keys,
+    "raw_reaction_add": _raw_reaction_keys,
+    "raw_reaction_remove": _raw_reaction_keys,
+    "typing": {
+        "channel_id": lambda c, u, w: c.id,
+        "user_id": lambda c, u, w: u.id,
+    },
+    "interaction": {
+        "channel_id": lambda i: i.channel_id,
+        "user_id": lambda i: i.user.id,
+        "message_id": lambda i: i.message.id if i.message is not None else None,
+    },
+}
+
 
 def _cancel_tasks(loop: asyncio.AbstractEventLoop) -> None:
     tasks = {t for t in asyncio.all_tasks(loop=loop) if not t.done()}
@@ -142,6 +190,19 @@ class Client:
 
         .. versionchanged:: 1.3
             Allow disabling the message cache and change the default size to ``1000``.
+    max_messages_per_guild: Optional[:class:`int`]
+        The maximum number of messages to store per guild in the internal message cache.
+        When this or ``max_messages_per_channel`` is set, ``max_messages`` becomes a global
+        ceiling and eviction is done from the guild with the most cached messages, so a
+        single busy guild cannot evict the messages of every other guild. Direct messages
+        are counted as a single guild. Ignored if ``max_messages`` is ``None``.
+
+        .. versionadded:: 2.0
+    max_messages_per_channel: Optional[:class:`int`]
+        The maximum number of messages to store per channel in the internal message cache.
+        Ignored if ``max_messages`` is ``None``.
+
+        .. versionadded:: 2.0
     loop: Optional[:class:`asyncio.AbstractEventLoop`]
         The :class:`asyncio.AbstractEventLoop` to use for asynchronous operations.
         Defaults to ``None``, in which case the default event loop is used via
@@ -169,6 +230,21 @@ class Client:
         currently selected intents.
 
         .. versionadded:: 1.5
+    cache_backend: Optional[Callable[[:class:`str`], MutableMapping[:class:`int`, Any]]]
+        A factory called with the name of a cache (see :class:`CacheBackend`) that returns the
+        mapping used to store it, such as a :class:`LRUCacheBackend` or :class:`SQLiteCacheBackend`.
+        This allows trading memory for lookup latency on large bots. Defaults to ``None``, which
+        stores everything in regular dictionaries.
+
+        .. versionadded:: 2.0
+    member_cache_timeout: Optional[:class:`float`]
+        The number of seconds a cached member can stay inactive before being evicted from
+        the member cache. A member is considered active when they send a message, add a
+        reaction, use an interaction or are in a voice channel. Evicted members are cached
+        again once they become active, and :meth:`Guild.try_member` uses :meth:`Guild.query_members`
+        to bring them back on demand. Defaults to ``None``, which never evicts members.
+
+        .. versionadded:: 2.0
     chunk_guilds_at_startup: :class:`bool`
         Indicates if :func:`.on_ready` should be delayed to chunk all guilds
         at start-up if necessary. This operation is incredibly slow for large
@@ -189,6 +265,79 @@ class Client:
         WebSocket in the case of not receiving a HEARTBEAT_ACK. Useful if
         processing the initial packets take too long to the point of disconnecting
         you. The default timeout is 60 seconds.
+    gateway_offload_threshold: Optional[:class:`int`]
+        The size in bytes of a gateway frame, as received, from which decompressing and
+        decoding it is done in a worker thread instead of on the event loop. Large
+        GUILD_CREATE and GUILD_MEMBERS_CHUNK frames can otherwise block the loop for tens
+        of milliseconds, delaying heartbeats. Frames are still handled in order.
+        ``None`` disables this. The default threshold is 32768.
+
+        .. versionadded:: 2.0
+    gateway_encoding: :class:`str`
+        The encoding of gateway payloads, either ``'json'`` or ``'etf'`` (Erlang term format).
+        ETF payloads carry IDs as integers rather than strings. They are decoded in pure
+        Python, which takes about 5 times as long as decoding JSON with the standard
+        library and 10 times as long as with ``orjson``. The decoder of
+        `erlpack <https://pypi.org/project/erlpack/>`_ is not used, as it is slower still,
+        though erlpack encodes the payloads sent if it is installed. JSON is therefore the
+        faster choice for receiving events, ETF only saves a few percent of bandwidth.
+        ``benchmarks/gateway_encoding.py`` measures the difference. Defaults to ``'json'``.
+
+        .. versionadded:: 2.0
+    gateway_compression: Optional[:class:`str`]
+        The transport compression of the gateway connection, ``'zlib-stream'``,
+        ``'zstd-stream'`` or ``None`` to disable it. zstd decompresses faster than zlib
+        and requires the `zstandard <https://pypi.org/project/zstandard/>`_ library.
+        If it is not installed, or the gateway stream cannot be decompressed, the client
+        falls back to ``'zlib-stream'``. See :attr:`gateway_bytes_received`.
+        Defaults to ``'zlib-stream'``.
+
+        .. versionadded:: 2.0
+    event_pool: Optional[:class:`EventWorkerPool`]
+        Runs event handlers on a bounded pool of workers with per event type queues
+        instead of creating a task for every handler call. Defaults to ``None``.
+
+        .. versionadded:: 2.0
+    event_timings: :class:`bool`
+        Whether to record how long decoding and parsing each gateway event type takes
+        and how long each event handler runs for, see :attr:`event_timings`.
+        Defaults to ``False``.
+
+        .. versionadded:: 2.0
+    slow_handler_threshold: Optional[:class:`float`]
+        The number of seconds after which an event handler that completes is reported
+        through :func:`on_slow_handler`. Defaults to ``None``, which disables it.
+
+        .. versionadded:: 2.0
+    gateway_recorder: Optional[:class:`GatewayRecorder`]
+        Records every payload received from the gateway to a file, to be replayed
+        later with :func:`replay_recording`. Defaults to ``None``.
+
+        .. versionadded:: 2.0
+    lazy_parse: :class:`bool`
+        Whether to skip building the objects of an event that has no event handler,
+        listener or :meth:`wait_for` waiting on it. The cache is still kept up to date, but
+        the copies made for ``before`` arguments, raw event models and other objects
+        that are only used for dispatching are not created. Defaults to ``False``.
+
+        .. versionadded:: 2.0
+    ignored_events: Iterable[:class:`str`]
+        The names of gateway events to drop as soon as they are received, such as
+        ``"TYPING_START"`` or ``"PRESENCE_UPDATE"``. Dropped events are not decoded with
+        the JSON encoding, do not update the cache and are not dispatched, but are still accounted for when
+        resuming. ``READY`` and ``RESUMED`` cannot be dropped. Defaults to none.
+
+        .. warning::
+
+            Dropping events that update the cache, such as ``GUILD_MEMBER_UPDATE``,
+            leaves the cached objects out of date.
+
+        .. versionadded:: 2.0
+    loop_lag_interval: Optional[:class:`float`]
+        How often, in seconds, to measure how late the event loop wakes up, see
+        :attr:`loop_lag`. Defaults to ``None``, which disables the measurement.
+
+        .. versionadded:: 2.0
     guild_ready_timeout: :class:`float`
         The maximum number of seconds to wait for the GUILD_CREATE stream to end before
         preparing the member cache and firing READY. The default timeout is 2 seconds.
@@ -202,6 +351,60 @@ class Client:
         sync your system clock to Google's NTP server.
 
         .. versionadded:: 1.3
+    gateway_url: Optional[:class:`str`]
+        The gateway URL to connect to instead of the one returned by Discord, such as
+        the :attr:`~discord.fake_gateway.FakeGateway.url` of a fake gateway used for load
+        testing. The encoding and compression parameters are still appended.
+        Defaults to ``None``.
+
+        .. versionadded:: 2.0
+    api_url: Optional[:class:`str`]
+        The base URL to send HTTP requests to instead of Discord's, such as the
+        :attr:`~discord.fake_gateway.FakeGateway.api_url` of a fake gateway.
+        Defaults to ``None``.
+
+        .. versionadded:: 2.0
+    request_scheduler: Optional[:class:`RequestScheduler`]
+        Paces HTTP requests to stay under the global rate limit, letting them through by
+        priority and in turn across guilds. Defaults to ``None``, in which case requests are
+        only held back once Discord reports the global rate limit as hit.
+
+        .. versionadded:: 2.0
+    rate_limit_store: Optional[:class:`RateLimitStore`]
+        Where the rate limits of the HTTP client are kept. Pass a :class:`SocketRateLimitStore`
+        to share them with other processes using the same token. Defaults to ``None``, in
+        which case they are kept in memory.
+
+        .. versionadded:: 2.0
+    coalesce_requests: :class:`bool`
+        Whether identical GET requests made while one is already in flight, such as
+        :meth:`fetch_user` called by many handlers for the same user, share its response
+        instead of being sent again. See :attr:`coalesced_requests`. Defaults to ``False``.
+
+        .. versionadded:: 2.0
+    session_store: Optional[:class:`SessionStore`]
+        Where to persist the gateway session when the client is closed, such as a
+        :class:`FileSessionStore`. On the next start, the client attempts to RESUME the
+        stored session instead of IDENTIFYing, falling back to IDENTIFY if Discord rejects it.
+        Defaults to ``None``, which does not persist sessions.
+
+        .. note::
+
+            A resumed session does not receive READY and GUILD_CREATE events, so the
+            internal cache starts empty. :func:`on_ready` is dispatched once every
+            stored session has been resumed.
+
+        .. versionadded:: 2.0
+    cache_snapshot: Optional[:class:`str`]
+        The path of a file to snapshot the guild cache to when the client is closed.
+        Requires ``session_store``. When a stored session is resumed on the next start,
+        the guilds of that session are rebuilt from the snapshot before the RESUME is sent,
+        so that the replayed events are applied to a warm cache. The snapshot is only used
+        if it was written for the exact session and sequence being resumed. Messages and
+        presences are not part of the snapshot. If ``msgpack`` is installed it is used to
+        encode the snapshot, otherwise JSON is used. Defaults to ``None``.
+
+        .. versionadded:: 2.0
     enable_debug_events: :class:`bool`
         Whether to enable events that are useful only for debugging gateway related information.
 
@@ -232,6 +435,9 @@ class Client:
         self.ws: DiscordWebSocket = None  # type: ignore
         self.loop: asyncio.AbstractEventLoop = asyncio.get_event_loop() if loop is None else loop
         self._listeners: Dict[str, List[Tuple[asyncio.Future, Callable[..., bool]]]] = {}
+        self._keyed_listeners: Dict[Tuple[str, str, Any], List[Tuple[asyncio.Future, Callable[..., bool]]]] = {}
+        # event -> key name -> number of listeners waiting on that key
+        self._keyed_events: Dict[str, Dict[str, int]] = {}
         self.shard_id: Optional[int] = options.get("shard_id")
         self.shard_count: Optional[int] = options.get("shard_count")
 
@@ -239,8 +445,26 @@ class Client:
         proxy: Optional[str] = options.pop("proxy", None)
         proxy_auth: Optional[aiohttp.BasicAuth] = options.pop("proxy_auth", None)
         unsync_clock: bool = options.pop("assume_unsync_clock", True)
+        api_url: Optional[str] = options.pop("api_url", None)
+        gateway_url: Optional[str] = options.pop("gateway_url", None)
+        coalesce_requests: bool = options.pop("coalesce_requests", False)
+        request_scheduler: Optional[RequestScheduler] = options.pop("request_scheduler", None)
+        if request_scheduler is not None and not isinstance(request_scheduler, RequestScheduler):
+            raise TypeError(f"request_scheduler parameter must be RequestScheduler not {type(request_scheduler)!r}")
+        rate_limit_store: Optional[RateLimitStore] = options.pop("rate_limit_store", None)
+        if rate_limit_store is not None and not isinstance(rate_limit_store, RateLimitStore):
+            raise TypeError(f"rate_limit_store parameter must be RateLimitStore not {type(rate_limit_store)!r}")
         self.http: HTTPClient = HTTPClient(
-            connector, proxy=proxy, proxy_auth=proxy_auth, unsync_clock=unsync_clock, loop=self.loop
+            connector,
+            proxy=proxy,
+            proxy_auth=proxy_auth,
+            unsync_clock=unsync_clock,
+            loop=self.loop,
+            api_url=api_url,
+            gateway_url=gateway_url,
+            scheduler=request_scheduler,
+            rate_limit_store=rate_limit_store,
+            coalesce_requests=coalesce_requests,
         )
 
         self._handlers: Dict[str, Callable] = {"ready": self._handle_ready}
@@ -248,12 +472,43 @@ class Client:
         self._hooks: Dict[str, Callable] = {"before_identify": self._call_before_identify_hook}
 
         self._enable_debug_events: bool = options.pop("enable_debug_events", False)
+        self._session_store: Optional[SessionStore] = options.pop("session_store", None)
+        if self._session_store is not None and not isinstance(self._session_store, SessionStore):
+            raise TypeError(f"session_store parameter must be SessionStore not {type(self._session_store)!r}")
+        self._loop_lag_interval: Optional[float] = options.pop("loop_lag_interval", None)
+        if self._loop_lag_interval is not None and self._loop_lag_interval <= 0:
+            raise ValueError("loop_lag_interval must be greater than 0")
+        self._loop_lag: float = 0.0
+        self._max_loop_lag: float = 0.0
+        self._loop_lag_task: Optional[asyncio.Task] = None
+        self._event_pool: Optional[EventWorkerPool] = options.pop("event_pool", None)
+        if self._event_pool is not None:
+            if not isinstance(self._event_pool, EventWorkerPool):
+                raise TypeError(f"event_pool parameter must be EventWorkerPool not {type(self._event_pool)!r}")
+            self._event_pool._bind(self._run_event)
+
+        self._event_timings: Optional[EventTimings] = EventTimings() if options.pop("event_timings", False) else None
+        self._slow_handler_threshold: Optional[float] = options.pop("slow_handler_threshold", None)
+
+        self._gateway_recorder: Optional[GatewayRecorder] = options.pop("gateway_recorder", None)
+        if self._gateway_recorder is not None and not isinstance(self._gateway_recorder, GatewayRecorder):
+            raise TypeError(f"gateway_recorder parameter must be GatewayRecorder not {type(self._gateway_recorder)!r}")
+
+        # set by the cluster launcher in its worker processes
+        self._cluster: Optional[Cluster] = None
+
+        self._cache_snapshot: Optional[str] = options.pop("cache_snapshot", None)
+        if self._cache_snapshot is not None and self._session_store is None:
+            raise ValueError("cache_snapshot requires a session_store to be set")
+
         self._connection: ConnectionState = self._get_state(**options)
         self._connection.shard_count = self.shard_count
         self._closed: bool = False
         self._ready: asyncio.Event = asyncio.Event()
         self._connection._get_websocket = self._get_websocket
         self._connection._get_client = lambda: self
+        if self._connection.lazy_parse:
+            self._connection._is_listening = self._is_listening
 
         self._application_command_store: CommandState = CommandState(self._connection, self.http)
 
@@ -279,6 +534,178 @@ class Client:
     def _handle_ready(self) -> None:
         self._ready.set()
 
+    def _is_listening(self, event: str) -> bool:
+        return event in self._listeners or event in self._keyed_events or hasattr(self, "on_" + event)
+
+    def _save_session(self, ws: DiscordWebSocket) -> None:
+        # only called if a session store is set
+        store: SessionStore = self._session_store  # type: ignore
+        session = ws._get_session_info()
+        try:
+            if session is not None:
+                store.save(ws.shard_id, session)
+            else:
+                store.clear(ws.shard_id)
+        except Exception:
+            _log.exception("Failed to save the gateway session for shard ID %s.", ws.shard_id)
+        else:
+            _log.info("Saved the gateway session for shard ID %s.", ws.shard_id)
+
+    async def _save_snapshot(self, websockets: Iterable[DiscordWebSocket]) -> None:
+        # only called if a cache snapshot path is set
+        sessions = {}
+        for ws in websockets:
+            session = ws._get_session_info()
+            if session is not None:
+                sessions[str(ws.shard_id)] = [session.session_id, session.sequence]
+
+        snapshot = self._connection._build_snapshot(sessions)
+        try:
+            await self.loop.run_in_executor(None, write_snapshot, self._cache_snapshot, snapshot)
+        except Exception:
+            _log.exception("Failed to write the cache snapshot to %s.", self._cache_snapshot)
+        else:
+            _log.info("Wrote a cache snapshot of %d guilds to %s.", len(snapshot["guilds"]), self._cache_snapshot)
+
+    async def _load_snapshot(self, sessions: Dict[Optional[int], SessionInfo]) -> None:
+        if self._cache_snapshot is None or not sessions:
+            return
+
+        try:
+            snapshot = await self.loop.run_in_executor(None, read_snapshot, self._cache_snapshot)
+        except Exception:
+            _log.exception("Failed to read the cache snapshot from %s.", self._cache_snapshot)
+            return
+
+        if snapshot is None:
+            return
+
+        # a snapshot taken at a different point of the session would miss or repeat events
+        stored = snapshot["sessions"]
+        shard_ids = {
+            shard_id
+            for shard_id, session in sessions.items()
+            if stored.get(str(shard_id)) == [session.session_id, session.sequence]
+        }
+        if shard_ids:
+            count = self._connection._apply_snapshot(snapshot, shard_ids)
+            _log.info("Restored %d guilds from the cache snapshot for shard IDs %s.", count, shard_ids)
+
+    def _load_session(self, shard_id: Optional[int]) -> Optional[SessionInfo]:
+        if self._session_store is None:
+            return None
+
+        try:
+            session = self._session_store.load(shard_id)
+        except Exception:
+            _log.exception("Failed to load the gateway session for shard ID %s.", shard_id)
+            return None
+
+        if session is None or session.shard_count != self.shard_count:
+            return None
+
+        self._connection._restored_shards.add(shard_id)
+        _log.info("Attempting to RESUME the stored session %s for shard ID %s.", session.session_id, shard_id)
+        return session
+
+    def _start_loop_lag_monitor(self) -> None:
+        if self._loop_lag_interval is not None and self._loop_lag_task is None:
+            self._loop_lag_task = self.loop.create_task(self._monitor_loop_lag(self._loop_lag_interval))
+
+    async def _monitor_loop_lag(self, interval: float) -> None:
+        # only started if loop_lag_interval is set
+        loop = self.loop
+        while not self.is_closed():
+            start = loop.time()
+            await asyncio.sleep(interval)
+            lag = max(loop.time() - start - interval, 0.0)
+            self._loop_lag = lag
+            if lag > self._max_loop_lag:
+                self._max_loop_lag = lag
+            if lag >= 0.5:
+                _log.warning("The event loop was blocked for %.3fs.", lag)
+
+    @property
+    def loop_lag(self) -> float:
+        """:class:`float`: How late, in seconds, the event loop last woke up from a sleep.
+
+        This is a measure of how long callbacks block the event loop, which delays
+        everything else including heartbeats. This is only measured if ``loop_lag_interval``
+        is passed to the client, otherwise it is always ``0.0``.
+
+        .. versionadded:: 2.0
+        """
+        return self._loop_lag
+
+    @property
+    def max_loop_lag(self) -> float:
+        """:class:`float`: The highest :attr:`loop_lag` measured since the client started.
+
+        .. versionadded:: 2.0
+        """
+        return self._max_loop_lag
+
+    @property
+    def gateway_bytes_received(self) -> int:
+        """:class:`int`: The number of bytes received from the gateway, before decompression.
+
+        Compare with :attr:`gateway_bytes_decompressed` to see how well the ``gateway_compression``
+        of the client works. For a sharded client this is the total of every shard, see
+        :attr:`ShardInfo.bytes_received`.
+
+        .. versionadded:: 2.0
+        """
+        return sum(traffic.received for traffic in self._connection._gateway_traffic.values())
+
+    @property
+    def gateway_bytes_decompressed(self) -> int:
+        """:class:`int`: The number of bytes received from the gateway, after decompression.
+
+        .. versionadded:: 2.0
+        """
+        return sum(traffic.decompressed for traffic in self._connection._gateway_traffic.values())
+
+    @property
+    def event_timings(self) -> Optional[EventTimings]:
+        """Optional[:class:`EventTimings`]: The recorded timings of gateway events and event handlers.
+
+        This is ``None`` unless ``event_timings`` is passed to the client.
+
+        .. versionadded:: 2.0
+        """
+        return self._event_timings
+
+    @property
+    def request_scheduler(self) -> Optional[RequestScheduler]:
+        """Optional[:class:`RequestScheduler`]: The scheduler pacing the HTTP requests of the client.
+
+        This is ``None`` unless ``request_scheduler`` is passed to the client.
+
+        .. versionadded:: 2.0
+        """
+        return self.http.scheduler
+
+    @property
+    def coalesced_requests(self) -> Dict[str, int]:
+        """Dict[:class:`str`, :class:`int`]: The number of HTTP requests saved by ``coalesce_requests``,
+        keyed by route, e.g. ``'GET /users/{user_id}'``.
+
+        .. versionadded:: 2.0
+        """
+        return dict(self.http.coalesced)
+
+    @property
+    def cluster(self) -> Optional[Cluster]:
+        """Optional[:class:`Cluster`]: The IPC handle of the cluster this client runs in.
+
+        This is ``None`` unless the client was started by a :class:`ClusterLauncher`.
+        In a cluster, IDENTIFY is paced by the launcher and :meth:`before_identify_hook`
+        is not called.
+
+        .. versionadded:: 2.0
+        """
+        return self._cluster
+
     @property
     def latency(self) -> float:
         """:class:`float`: Measures latency between a HEARTBEAT and a HEARTBEAT_ACK in seconds.
@@ -331,6 +758,18 @@ class Client:
         """
         return utils.SequenceProxy(self._connection._messages or [])
 
+    @property
+    def message_cache_stats(self) -> Dict[Optional[int], MessageCacheStats]:
+        """Dict[Optional[:class:`int`], :class:`.MessageCacheStats`]: A mapping of guild IDs to
+        the message cache statistics of that guild. Direct messages are stored under ``None``.
+
+        This is only populated if ``max_messages_per_guild`` or ``max_messages_per_channel``
+        is set, otherwise it is empty.
+
+        .. versionadded:: 2.0
+        """
+        return self._connection.message_cache_stats
+
     @property
     def private_channels(self) -> List[PrivateChannel]:
         """List[:class:`.abc.PrivateChannel`]: The private channels that the connected client is participating on.
@@ -377,6 +816,7 @@ class Client:
     async def _run_event(
         self, coro: Callable[..., Coroutine[Any, Any, Any]], event_name: str, *args: Any, **kwargs: Any
     ) -> None:
+        start = time.perf_counter()
         try:
             await coro(*args, **kwargs)
         except asyncio.CancelledError:
@@ -386,6 +826,19 @@ class Client:
                 await self.on_error(event_name, *args, **kwargs)
             except asyncio.CancelledError:
                 pass
+        finally:
+            if self._event_timings is not None or self._slow_handler_threshold is not None:
+                self._record_handler_time(coro, event_name, time.perf_counter() - start)
+
+    def _record_handler_time(self, coro: Callable[..., Any], event_name: str, duration: float) -> None:
+        timings = self._event_timings
+        if timings is not None:
+            name = getattr(coro, "__qualname__", None) or type(coro).__name__
+            timings._record(timings.handlers, f"{event_name}:{name}", duration)
+
+        threshold = self._slow_handler_threshold
+        if threshold is not None and duration >= threshold and event_name != "on_slow_handler":
+            self.dispatch("slow_handler", event_name, coro, duration)
 
     def _schedule_event(
         self, coro: Callable[..., Coroutine[Any, Any, Any]], event_name: str, *args: Any, **kwargs: Any
@@ -394,10 +847,73 @@ class Client:
         # Schedules the task
         return asyncio.create_task(wrapped, name=f"discord.py: {event_name}")
 
+    def _dispatch_event(
+        self, coro: Callable[..., Coroutine[Any, Any, Any]], event_name: str, *args: Any, **kwargs: Any
+    ) -> None:
+        # runs a handler through the event pool if there is one
+        if self._event_pool is not None:
+            self._event_pool.submit(coro, event_name, *args, **kwargs)
+        else:
+            self._schedule_event(coro, event_name, *args, **kwargs)
+
+    @staticmethod
+    def _set_listener_result(future: asyncio.Future, args: Tuple[Any, ...]) -> None:
+        if len(args) == 0:
+            future.set_result(None)
+        elif len(args) == 1:
+            future.set_result(args[0])
+        else:
+            future.set_result(args)
+
+    def _remove_keyed_listener(
+        self, event: str, name: str, value: Any, entry: Tuple[asyncio.Future, Callable[..., bool]]
+    ) -> None:
+        index_key = (event, name, value)
+        listeners = self._keyed_listeners[index_key]
+        listeners.remove(entry)
+        if not listeners:
+            del self._keyed_listeners[index_key]
+
+        counts = self._keyed_events[event]
+        counts[name] -= 1
+        if not counts[name]:
+            del counts[name]
+            if not counts:
+                del self._keyed_events[event]
+
+    def _dispatch_keyed(self, event: str, names: Dict[str, int], args: Tuple[Any, ...]) -> None:
+        extractors = _LISTENER_KEYS[event]
+        for name in tuple(names):
+            try:
+                value = extractors[name](*args)
+            except AttributeError:
+                continue
+
+            listeners = self._keyed_listeners.get((event, name, value))
+            if not listeners:
+                continue
+
+            # finished listeners are removed from the index by their done callback
+            for future, condition in tuple(listeners):
+                if future.done():
+                    continue
+
+                try:
+                    result = condition(*args)
+                except Exception as exc:
+                    future.set_exception(exc)
+                else:
+                    if result:
+                        self._set_listener_result(future, args)
+
     def dispatch(self, event: str, *args: Any, **kwargs: Any) -> None:
         _log.debug("Dispatching event %s", event)
         method = "on_" + event
 
+        keyed = self._keyed_events.get(event)
+        if keyed:
+            self._dispatch_keyed(event, keyed, args)
+
         listeners = self._listeners.get(event)
         if listeners:
             removed = []
@@ -413,12 +929,7 @@ class Client:
                     removed.append(i)
                 else:
                     if result:
-                        if len(args) == 0:
-                            future.set_result(None)
-                        elif len(args) == 1:
-                            future.set_result(args[0])
-                        else:
-                            future.set_result(args)
+                        self._set_listener_result(future, args)
                         removed.append(i)
 
             if len(removed) == len(listeners):
@@ -432,7 +943,7 @@ class Client:
         except AttributeError:
             pass
         else:
-            self._schedule_event(coro, method, *args, **kwargs)
+            self._dispatch_event(coro, method, *args, **kwargs)
 
     async def on_error(self, event_method: str, *args: Any, **kwargs: Any) -> None:
         """|coro|
@@ -539,22 +1050,36 @@ class Client:
             The websocket connection has been terminated.
         """
 
+        self._start_loop_lag_monitor()
         backoff = ExponentialBackoff()
         ws_params = {
             "initial": True,
             "shard_id": self.shard_id,
         }
+        session = self._load_session(self.shard_id)
+        if session is not None:
+            ws_params.update(
+                resume=True, session=session.session_id, sequence=session.sequence, gateway=session.resume_url
+            )
+            await self._load_snapshot({self.shard_id: session})
+
         while not self.is_closed():
             try:
                 coro = DiscordWebSocket.from_client(self, **ws_params)
                 self.ws = await asyncio.wait_for(coro, timeout=60.0)
                 ws_params["initial"] = False
+                ws_params.pop("gateway", None)
                 while True:
                     await self.ws.poll_event()
             except ReconnectWebSocket as e:
                 _log.info("Got a request to %s the websocket.", e.op)
                 self.dispatch("disconnect")
-                ws_params.update(sequence=self.ws.sequence, resume=e.resume, session=self.ws.session_id)
+                ws_params.update(
+                    sequence=self.ws.sequence,
+                    resume=e.resume,
+                    session=self.ws.session_id,
+                    gateway=self.ws.resume_url if e.resume else None,
+                )
                 continue
             except (
                 OSError,
@@ -578,7 +1103,13 @@ class Client:
 
                 # If we get connection reset by peer then try to RESUME
                 if isinstance(exc, OSError) and exc.errno in (54, 10054):
-                    ws_params.update(sequence=self.ws.sequence, initial=False, resume=True, session=self.ws.session_id)
+                    ws_params.update(
+                        sequence=self.ws.sequence,
+                        initial=False,
+                        resume=True,
+                        session=self.ws.session_id,
+                        gateway=self.ws.resume_url,
+                    )
                     continue
 
                 # We should only get this when an unhandled close code happens,
@@ -598,7 +1129,9 @@ class Client:
                 # Always try to RESUME the connection
                 # If the connection is not RESUME-able then the gateway will invalidate the session.
                 # This is apparently what the official Discord client does.
-                ws_params.update(sequence=self.ws.sequence, resume=True, session=self.ws.session_id)
+                ws_params.update(
+                    sequence=self.ws.sequence, resume=True, session=self.ws.session_id, gateway=self.ws.resume_url
+                )
 
     async def close(self) -> None:
         """|coro|
@@ -609,6 +1142,9 @@ class Client:
             return
 
         self._closed = True
+        if self._loop_lag_task is not None:
+            self._loop_lag_task.cancel()
+            self._loop_lag_task = None
 
         for voice in self.voice_clients:
             try:
@@ -618,10 +1154,22 @@ class Client:
                 pass
 
         if self.ws is not None and self.ws.open:
-            await self.ws.close(code=1000)
+            if self._session_store is not None:
+                self._save_session(self.ws)
+                # closing with 1000 would invalidate the session
+                await self.ws.close(code=4000)
+                if self._cache_snapshot is not None:
+                    await self._save_snapshot((self.ws,))
+            else:
+                await self.ws.close(code=1000)
 
         await self.http.close()
+        self._connection._stop_member_evictor()
         self._ready.clear()
+        if self._event_pool is not None:
+            self._event_pool.close()
+        if self._gateway_recorder is not None:
+            self._gateway_recorder.close()
 
     def clear(self) -> None:
         """Clears the internal state of the bot.
@@ -1003,6 +1551,7 @@ class Client:
         *,
         check: Optional[Callable[..., bool]] = None,
         timeout: Optional[float] = None,
+        key: Optional[Tuple[str, Any]] = None,
     ) -> Any:
         """|coro|
 
@@ -1071,11 +1620,37 @@ class Client:
         timeout: Optional[:class:`float`]
             The number of seconds to wait before timing out and raising
             :exc:`asyncio.TimeoutError`.
+        key: Optional[Tuple[:class:`str`, Any]]
+            A ``(name, value)`` pair that the event must match before ``check`` is called,
+            such as ``('channel_id', channel.id)``. Keyed listeners are looked up directly
+            when the event is dispatched instead of having their ``check`` called for every
+            event, which matters when many listeners wait on the same event. The supported
+            keys are:
+
+            +-------------------------------------------------+---------------------------------------------+
+            | Event                                           | Keys                                        |
+            +=================================================+=============================================+
+            | ``message``                                     | ``channel_id``, ``author_id``               |
+            +-------------------------------------------------+---------------------------------------------+
+            | ``message_edit``, ``message_delete``            | ``message_id``, ``channel_id``,             |
+            |                                                 | ``author_id``                               |
+            +-------------------------------------------------+---------------------------------------------+
+            | ``reaction_add``, ``reaction_remove``,          | ``message_id``, ``channel_id``, ``user_id`` |
+            | ``raw_reaction_add``, ``raw_reaction_remove``   |                                             |
+            +-------------------------------------------------+---------------------------------------------+
+            | ``typing``                                      | ``channel_id``, ``user_id``                 |
+            +-------------------------------------------------+---------------------------------------------+
+            | ``interaction``                                 | ``message_id``, ``channel_id``, ``user_id`` |
+            +-------------------------------------------------+---------------------------------------------+
+
+            .. versionadded:: 2.0
 
         Raises
         -------
         asyncio.TimeoutError
             If a timeout is provided and it was reached.
+        ValueError
+            The ``key`` is not supported for this event.
 
         Returns
         --------
@@ -1094,6 +1669,18 @@ class Client:
             check = _check
 
         ev = event.lower()
+        if key is not None:
+            name, value = key
+            if name not in _LISTENER_KEYS.get(ev, ()):
+                raise ValueError(f"{ev!r} events cannot be waited for by {name!r}")
+
+            entry = (future, check)
+            self._keyed_listeners.setdefault((ev, name, value), []).append(entry)
+            counts = self._keyed_events.setdefault(ev, {})
+            counts[name] = counts.get(name, 0) + 1
+            future.add_done_callback(lambda _: self._remove_keyed_listener(ev, name, value, entry))
+            return asyncio.wait_for(future, timeout)
+
         try:
             listeners = self._listeners[ev]
         except KeyError:
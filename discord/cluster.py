@@ -0,0 +1,630 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015-present Rapptz
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import itertools
+import logging
+import multiprocessing
+import os
+import signal
+import struct
+import sys
+import tempfile
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Sequence
+
+from . import utils
+from .backoff import ExponentialBackoff
+from .errors import LoginFailure, PrivilegedIntentsRequired
+from .http import HTTPClient
+from .ratelimits import RateLimitCoordinator, RateLimitStore, SocketRateLimitStore
+from .user import User
+
+if TYPE_CHECKING:
+    from .shard import AutoShardedClient
+
+    ClientFactory = Callable[..., AutoShardedClient]
+
+__all__ = (
+    "Cluster",
+    "ClusterLauncher",
+)
+
+_log = logging.getLogger(__name__)
+
+# length prefix of every IPC frame, the frame being a JSON object
+_HEADER = struct.Struct(">I")
+# the exit code of workers that failed in a way restarting cannot fix, such as an invalid token
+_EXIT_FATAL = 78
+# a worker that ran this many seconds before failing is restarted as if it never had
+_STABLE_UPTIME = 60.0
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> Dict[str, Any]:
+    (length,) = _HEADER.unpack(await reader.readexactly(_HEADER.size))
+    return utils._from_json(await reader.readexactly(length))
+
+
+def _write_frame(writer: asyncio.StreamWriter, payload: Dict[str, Any]) -> None:
+    data = utils._to_json(payload).encode("utf-8")
+    writer.write(_HEADER.pack(len(data)) + data)
+
+
+class Cluster:
+    """The IPC handle of a client running in a cluster started by :class:`ClusterLauncher`.
+
+    It is available as :attr:`Client.cluster` inside the worker processes. It lets a
+    cluster query every other cluster and coordinates IDENTIFY with them, so that the
+    processes share the IDENTIFY rate limit of the bot instead of each assuming it has
+    it to itself.
+
+    .. versionadded:: 2.0
+
+    Attributes
+    -----------
+    id: :class:`int`
+        The ID of this cluster, starting at 0.
+    shard_ids: List[:class:`int`]
+        The shard IDs run by this cluster.
+    shard_count: :class:`int`
+        The total number of shards across every cluster.
+    """
+
+    def __init__(self, cluster_id: int, shard_ids: List[int], shard_count: int) -> None:
+        self.id: int = cluster_id
+        self.shard_ids: List[int] = shard_ids
+        self.shard_count: int = shard_count
+        self._client: Optional[AutoShardedClient] = None
+        self._reader: Optional[asyncio.StreamReader] = None
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._read_task: Optional[asyncio.Task] = None
+        self._nonces = itertools.count()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._handlers: Dict[str, Callable[..., Any]] = {
+            "guild_count": self._guild_count,
+            "get_user": self._get_user,
+        }
+
+    def handler(self, name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+        """A decorator that registers a function answering :meth:`request` calls with the given name.
+
+        The function may be a coroutine. Its arguments are the ones given to :meth:`request`
+        and its return value must be JSON serializable. ::
+
+            @client.cluster.handler('voice_count')
+            def voice_count():
+                return len(client.voice_clients)
+
+        Parameters
+        -----------
+        name: :class:`str`
+            The name of the request.
+        """
+
+        def decorator(func: Callable[..., Any]) -> Callable[..., Any]:
+            self._handlers[name] = func
+            return func
+
+        return decorator
+
+    async def request(self, name: str, *args: Any, timeout: float = 5.0) -> List[Any]:
+        r"""|coro|
+
+        Calls the handler named ``name`` in every cluster, this one included.
+
+        Parameters
+        -----------
+        name: :class:`str`
+            The name of the handler, as registered with :meth:`handler`.
+        \*args
+            The arguments of the handler. They must be JSON serializable.
+        timeout: :class:`float`
+            How long to wait for each cluster, in seconds.
+
+        Returns
+        --------
+        List[Any]
+            The result of each cluster, ordered by cluster ID. It is ``None`` for clusters
+            that did not answer in time, are not running, or do not know the handler.
+
+        Raises
+        -------
+        ConnectionError
+            The connection to the launcher was lost.
+        """
+        return await self._send({"op": "request", "name": name, "args": args, "timeout": timeout})
+
+    async def guild_count(self) -> int:
+        """|coro|
+
+        Returns the number of guilds cached across every cluster.
+        """
+        return sum(count for count in await self.request("guild_count") if count is not None)
+
+    async def get_user(self, user_id: int) -> Optional[User]:
+        """|coro|
+
+        Returns the user with the given ID from the cache of any cluster,
+        or ``None`` if none of them has it.
+        """
+        for data in await self.request("get_user", user_id):
+            if data is not None:
+                return User(state=self._client._connection, data=data)  # type: ignore
+        return None
+
+    def _guild_count(self) -> int:
+        return len(self._client.guilds)  # type: ignore
+
+    def _get_user(self, user_id: int) -> Optional[Dict[str, Any]]:
+        user = self._client.get_user(user_id)  # type: ignore
+        return user and user._to_minimal_user_json()
+
+    async def _connect(self, path: str) -> None:
+        self._reader, self._writer = await asyncio.open_unix_connection(path)
+        _write_frame(self._writer, {"op": "hello", "cluster_id": self.id})
+        self._read_task = asyncio.create_task(self._read_loop())
+
+    def _bind(self, client: AutoShardedClient) -> None:
+        self._client = client
+        client._cluster = self
+        # replaces the internal hook, the launcher paces IDENTIFY for every cluster
+        client._hooks["before_identify"] = self._before_identify
+
+    async def _before_identify(self, shard_id: Optional[int], *, initial: bool = False) -> None:
+        try:
+            await self._send({"op": "identify", "shard_id": shard_id})
+        except ConnectionError:
+            # without the launcher, fall back to the pacing of a lone client
+            _log.warning("Cluster %s cannot reach the launcher, waiting 5 seconds before IDENTIFY.", self.id)
+            await asyncio.sleep(5.0)
+
+    async def _send(self, payload: Dict[str, Any]) -> Any:
+        if self._read_task is None or self._read_task.done() or self._writer is None or self._writer.is_closing():
+            # nothing would read the reply
+            raise ConnectionError("not connected to the cluster launcher")
+        payload["nonce"] = nonce = next(self._nonces)
+        self._pending[nonce] = future = asyncio.get_running_loop().create_future()
+        _write_frame(self._writer, payload)  # type: ignore
+        return await future
+
+    async def _answer(self, payload: Dict[str, Any]) -> None:
+        result = None
+        try:
+            func = self._handlers[payload["name"]]
+        except KeyError:
+            _log.warning("Cluster %s received a request for the unknown handler %r.", self.id, payload["name"])
+        else:
+            try:
+                result = func(*payload["args"])
+                if asyncio.iscoroutine(result):
+                    result = await result
+            except Exception:
+                _log.exception("Cluster %s failed to answer a request for %r.", self.id, payload["name"])
+
+        _write_frame(self._writer, {"op": "reply", "nonce": payload["nonce"], "d": result})  # type: ignore
+
+    async def _read_loop(self) -> None:
+        try:
+            while True:
+                payload = await _read_frame(self._reader)  # type: ignore
+                if payload["op"] == "reply":
+                    future = self._pending.pop(payload["nonce"], None)
+                    if future is not None and not future.done():
+                        future.set_result(payload["d"])
+                elif payload["op"] == "call":
+                    asyncio.create_task(self._answer(payload))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            _log.warning("Cluster %s lost its connection to the launcher.", self.id)
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("lost the connection to the cluster launcher"))
+            self._pending.clear()
+
+    async def _close(self) -> None:
+        if self._read_task is not None:
+            self._read_task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+
+
+async def _run_cluster(
+    factory: ClientFactory,
+    token: str,
+    cluster_id: int,
+    shard_ids: List[int],
+    shard_count: int,
+    path: str,
+    rate_limit_path: Optional[str],
+) -> None:
+    from .shard import AutoShardedClient
+
+    cluster = Cluster(cluster_id, shard_ids, shard_count)
+    await cluster._connect(path)
+    client = factory(shard_ids=shard_ids, shard_count=shard_count)
+    if not isinstance(client, AutoShardedClient):
+        raise TypeError(f"cluster factory must return AutoShardedClient not {type(client)!r}")
+
+    cluster._bind(client)
+    if rate_limit_path is not None and type(client.http.rate_limit_store) is RateLimitStore:
+        client.http.rate_limit_store = SocketRateLimitStore(rate_limit_path)
+
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, lambda: asyncio.create_task(client.close()))
+
+    try:
+        await client.start(token)
+    finally:
+        if not client.is_closed():
+            await client.close()
+        await cluster._close()
+
+
+def _cluster_main(*args: Any) -> None:
+    try:
+        asyncio.run(_run_cluster(*args))
+    except (LoginFailure, PrivilegedIntentsRequired) as exc:
+        _log.error("Cluster %s cannot run and will not be restarted: %s", args[2], exc)
+        sys.exit(_EXIT_FATAL)
+
+
+class ClusterLauncher:
+    """Runs the shards of a bot across several processes.
+
+    An :class:`AutoShardedClient` runs all of its shards on a single event loop, so a bot
+    with many shards is bound to a single core. The launcher splits the shard IDs into
+    contiguous ranges and starts a worker process per range, each running its own
+    :class:`AutoShardedClient`. The workers connect to the launcher over a Unix socket,
+    which they use to query each other through :attr:`Client.cluster` and to take turns
+    to IDENTIFY, respecting the ``max_concurrency`` of the bot across every process.
+    Unless a client is given its own ``rate_limit_store``, the workers also share their
+    HTTP rate limits through a :class:`RateLimitCoordinator` run by the launcher.
+
+    Workers exiting with an error are restarted with an exponential backoff, up to
+    ``max_restarts`` times in a row. Workers failing to log in or requesting privileged
+    intents that are not enabled are not restarted. Unix sockets are required, so the
+    launcher is not available on Windows.
+
+    ``factory`` is called in each worker with the ``shard_ids`` and ``shard_count``
+    keyword arguments and must return an :class:`AutoShardedClient` created with them.
+    Workers are started with the ``spawn`` method of :mod:`multiprocessing`, so it must
+    be picklable, e.g. a function defined at the top level of a module: ::
+
+        def create_bot(**options):
+            bot = commands.AutoShardedBot(command_prefix='!', intents=intents, **options)
+            bot.load_extension('cogs')
+            return bot
+
+        if __name__ == '__main__':
+            discord.ClusterLauncher(create_bot, token, clusters=4).run()
+
+    .. versionadded:: 2.0
+
+    Parameters
+    -----------
+    factory: Callable[..., :class:`AutoShardedClient`]
+        The function creating the client of each cluster.
+    token: :class:`str`
+        The bot token.
+    clusters: Optional[:class:`int`]
+        The number of worker processes. Defaults to the number of CPUs,
+        capped at the number of shards.
+    shard_count: Optional[:class:`int`]
+        The total number of shards. If not given, the number recommended by
+        Discord is used.
+    max_concurrency: Optional[:class:`int`]
+        The number of shards that may IDENTIFY at once. If not given, the value
+        returned by Discord is used when ``shard_count`` is not given, else 1.
+    ipc_path: Optional[:class:`str`]
+        The path of the Unix socket. Defaults to a file in the temporary directory.
+    share_rate_limits: :class:`bool`
+        Whether the workers share their HTTP rate limits. The coordinator listens
+        on ``ipc_path`` suffixed with ``.ratelimits``. Defaults to ``True``.
+    max_restarts: :class:`int`
+        The number of times in a row a worker exiting with an error is restarted before
+        the launcher gives up on it. A worker that ran for a minute before exiting is
+        no longer counted as failing in a row. Defaults to 5.
+    """
+
+    def __init__(
+        self,
+        factory: ClientFactory,
+        token: str,
+        *,
+        clusters: Optional[int] = None,
+        shard_count: Optional[int] = None,
+        max_concurrency: Optional[int] = None,
+        ipc_path: Optional[str] = None,
+        share_rate_limits: bool = True,
+        max_restarts: int = 5,
+    ) -> None:
+        if clusters is not None and clusters < 1:
+            raise ValueError("clusters must be greater than 0")
+        if max_concurrency is not None and max_concurrency < 1:
+            raise ValueError("max_concurrency must be greater than 0")
+        if max_restarts < 0:
+            raise ValueError("max_restarts must be 0 or greater")
+
+        self.factory: ClientFactory = factory
+        self.token: str = token
+        self.clusters: Optional[int] = clusters
+        self.shard_count: Optional[int] = shard_count
+        self.max_concurrency: Optional[int] = max_concurrency
+        self.max_restarts: int = max_restarts
+        self.ipc_path: str = ipc_path or os.path.join(tempfile.gettempdir(), f"discord-cluster-{os.getpid()}.sock")
+
+        self._rate_limits: Optional[RateLimitCoordinator] = None
+        if share_rate_limits:
+            self._rate_limits = RateLimitCoordinator(f"{self.ipc_path}.ratelimits")
+
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: Dict[int, multiprocessing.process.BaseProcess] = {}
+        self._cluster_shards: Dict[int, List[int]] = {}
+        # when each worker was started, and its consecutive failed runs
+        self._started_at: Dict[int, float] = {}
+        self._failures: Dict[int, int] = {}
+        self._backoffs: Dict[int, ExponentialBackoff] = {}
+        self._writers: Dict[int, asyncio.StreamWriter] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._nonces = itertools.count()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._identify_locks: Dict[int, asyncio.Lock] = {}
+        self._identify_after: Dict[int, float] = {}
+        self._closed: bool = False
+
+    @property
+    def cluster_shards(self) -> Dict[int, List[int]]:
+        """Dict[:class:`int`, List[:class:`int`]]: A mapping of cluster IDs to the shard IDs they run.
+
+        This is empty until the launcher is started.
+        """
+        return dict(self._cluster_shards)
+
+    async def _fetch_gateway(self) -> None:
+        http = HTTPClient()
+        try:
+            await http.static_login(self.token)
+            self.shard_count, _, max_concurrency = await http.get_bot_gateway()
+        finally:
+            await http.close()
+
+        if self.max_concurrency is None:
+            self.max_concurrency = max_concurrency
+
+    def _start_process(self, cluster_id: int) -> None:
+        rate_limit_path = self._rate_limits and self._rate_limits.path
+        args = (
+            self.factory,
+            self.token,
+            cluster_id,
+            self._cluster_shards[cluster_id],
+            self.shard_count,
+            self.ipc_path,
+            rate_limit_path,
+        )
+        process = self._context.Process(target=_cluster_main, args=args, name=f"discord-cluster-{cluster_id}")
+        process.start()
+        self._processes[cluster_id] = process
+        self._started_at[cluster_id] = time.monotonic()
+        _log.info("Started cluster %s (PID %s) with shard IDs %s.", cluster_id, process.pid, args[3])
+
+    async def start(self) -> None:
+        """|coro|
+
+        Starts the IPC server and every cluster, and waits until they have all stopped.
+        """
+        if self.shard_count is None:
+            await self._fetch_gateway()
+        if self.max_concurrency is None:
+            self.max_concurrency = 1
+
+        shard_count: int = self.shard_count  # type: ignore
+        clusters = min(self.clusters or os.cpu_count() or 1, shard_count)
+        per_cluster, extra = divmod(shard_count, clusters)
+        start = 0
+        for cluster_id in range(clusters):
+            end = start + per_cluster + (cluster_id < extra)
+            self._cluster_shards[cluster_id] = list(range(start, end))
+            start = end
+
+        if os.path.exists(self.ipc_path):
+            os.unlink(self.ipc_path)
+        self._server = await asyncio.start_unix_server(self._handle_connection, path=self.ipc_path)
+        if self._rate_limits is not None:
+            await self._rate_limits.start()
+
+        for cluster_id in self._cluster_shards:
+            self._start_process(cluster_id)
+
+        try:
+            await self._monitor()
+        finally:
+            await self.close()
+
+    async def _monitor(self) -> None:
+        running = set(self._processes)
+        # cluster ID -> when to restart it
+        restarts: Dict[int, float] = {}
+        while running and not self._closed:
+            await asyncio.sleep(1.0)
+            now = time.monotonic()
+            for cluster_id in tuple(running):
+                restart_at = restarts.get(cluster_id)
+                if restart_at is not None:
+                    if now >= restart_at and not self._closed:
+                        del restarts[cluster_id]
+                        self._start_process(cluster_id)
+                    continue
+
+                exitcode = self._processes[cluster_id].exitcode
+                if exitcode is None:
+                    continue
+                if exitcode == 0 or self._closed:
+                    _log.info("Cluster %s has stopped.", cluster_id)
+                    running.discard(cluster_id)
+                elif exitcode == _EXIT_FATAL:
+                    _log.error("Cluster %s cannot run, it will not be restarted.", cluster_id)
+                    running.discard(cluster_id)
+                else:
+                    delay = self._restart_delay(cluster_id, now)
+                    if delay is None:
+                        _log.error(
+                            "Cluster %s exited with code %s %s times in a row, giving up on it.",
+                            cluster_id,
+                            exitcode,
+                            self._failures[cluster_id],
+                        )
+                        running.discard(cluster_id)
+                    else:
+                        _log.warning(
+                            "Cluster %s exited with code %s, restarting it in %.2fs.", cluster_id, exitcode, delay
+                        )
+                        restarts[cluster_id] = now + delay
+
+    def _restart_delay(self, cluster_id: int, now: float) -> Optional[float]:
+        if now - self._started_at[cluster_id] >= _STABLE_UPTIME or cluster_id not in self._backoffs:
+            self._failures[cluster_id] = 0
+            self._backoffs[cluster_id] = ExponentialBackoff()
+
+        failures = self._failures[cluster_id] = self._failures[cluster_id] + 1
+        if failures > self.max_restarts:
+            return None
+        return self._backoffs[cluster_id].delay()
+
+    async def close(self) -> None:
+        """|coro|
+
+        Stops every cluster and the IPC server.
+        """
+        if self._closed:
+            return
+
+        self._closed = True
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+
+        loop = asyncio.get_running_loop()
+        for process in self._processes.values():
+            await loop.run_in_executor(None, process.join)
+
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            if os.path.exists(self.ipc_path):
+                os.unlink(self.ipc_path)
+
+        if self._rate_limits is not None:
+            await self._rate_limits.close()
+
+    def run(self) -> None:
+        """A blocking call that runs :meth:`start` until every cluster has stopped or
+        the launcher is interrupted.
+        """
+
+        async def runner() -> None:
+            loop = asyncio.get_running_loop()
+            task = asyncio.current_task()
+            try:
+                # the workers handle the signal themselves, stopping gracefully
+                loop.add_signal_handler(signal.SIGINT, task.cancel)  # type: ignore
+                loop.add_signal_handler(signal.SIGTERM, task.cancel)  # type: ignore
+            except NotImplementedError:
+                pass
+
+            try:
+                await self.start()
+            except asyncio.CancelledError:
+                _log.info("Received signal to terminate the clusters.")
+                await self.close()
+
+        asyncio.run(runner())
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        cluster_id = -1
+        try:
+            hello = await _read_frame(reader)
+            cluster_id = hello["cluster_id"]
+            self._writers[cluster_id] = writer
+            while True:
+                payload = await _read_frame(reader)
+                op = payload["op"]
+                if op == "identify":
+                    asyncio.create_task(self._grant_identify(writer, payload))
+                elif op == "request":
+                    asyncio.create_task(self._broadcast(writer, payload))
+                elif op == "reply":
+                    future = self._pending.pop(payload["nonce"], None)
+                    if future is not None and not future.done():
+                        future.set_result(payload["d"])
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            if self._writers.get(cluster_id) is writer:
+                del self._writers[cluster_id]
+            writer.close()
+
+    async def _grant_identify(self, writer: asyncio.StreamWriter, payload: Dict[str, Any]) -> None:
+        # shards IDENTIFY in max_concurrency buckets, each allowing one IDENTIFY every 5 seconds
+        bucket = (payload["shard_id"] or 0) % self.max_concurrency  # type: ignore
+        try:
+            lock = self._identify_locks[bucket]
+        except KeyError:
+            lock = self._identify_locks[bucket] = asyncio.Lock()
+
+        loop = asyncio.get_running_loop()
+        async with lock:
+            delay = self._identify_after.get(bucket, 0.0) - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._identify_after[bucket] = loop.time() + 5.0
+
+        _log.debug("Granted IDENTIFY to shard ID %s.", payload["shard_id"])
+        _write_frame(writer, {"op": "reply", "nonce": payload["nonce"], "d": None})
+
+    async def _call(self, writer: asyncio.StreamWriter, payload: Dict[str, Any]) -> Any:
+        nonce = next(self._nonces)
+        self._pending[nonce] = future = asyncio.get_running_loop().create_future()
+        _write_frame(writer, {"op": "call", "name": payload["name"], "args": payload["args"], "nonce": nonce})
+        try:
+            return await asyncio.wait_for(future, timeout=payload["timeout"])
+        except asyncio.TimeoutError:
+            return None
+        finally:
+            self._pending.pop(nonce, None)
+
+    async def _broadcast(self, writer: asyncio.StreamWriter, payload: Dict[str, Any]) -> None:
+        async def call(cluster_id: int) -> Any:
+            try:
+                target = self._writers[cluster_id]
+            except KeyError:
+                return None
+            return await self._call(target, payload)
+
+        results: Sequence[Any] = await asyncio.gather(*(call(cluster_id) for cluster_id in self._cluster_shards))
+        _write_frame(writer, {"op": "reply", "nonce": payload["nonce"], "d": list(results)})
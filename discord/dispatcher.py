@@ -0,0 +1,237 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015-present Rapptz
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+import logging
+from typing import Any, Callable, Coroutine, Deque, Dict, List, NamedTuple, Set, Tuple
+
+from .enums import EventOverflowPolicy
+
+__all__ = (
+    "EventQueueStats",
+    "EventWorkerPool",
+)
+
+_log = logging.getLogger(__name__)
+
+CoroFunc = Callable[..., Coroutine[Any, Any, Any]]
+_Item = Tuple[CoroFunc, str, Tuple[Any, ...], Dict[str, Any]]
+
+
+class EventQueueStats(NamedTuple):
+    """Represents the queue statistics of one event type in an :class:`EventWorkerPool`.
+
+    .. versionadded:: 2.0
+
+    Attributes
+    -----------
+    depth: :class:`int`
+        The number of handler calls currently waiting in the queue.
+    max_depth: :class:`int`
+        The highest depth the queue has reached.
+    processed: :class:`int`
+        The number of handler calls that have been run by the pool.
+    dropped: :class:`int`
+        The number of handler calls dropped because the queue was full.
+    overflowed: :class:`int`
+        The number of handler calls run outside of the pool because the queue was full.
+    """
+
+    depth: int
+    max_depth: int
+    processed: int
+    dropped: int
+    overflowed: int
+
+
+class _EventQueue:
+    __slots__ = ("items", "max_depth", "processed", "dropped", "overflowed")
+
+    def __init__(self) -> None:
+        self.items: Deque[_Item] = deque()
+        self.max_depth: int = 0
+        self.processed: int = 0
+        self.dropped: int = 0
+        self.overflowed: int = 0
+
+
+class EventWorkerPool:
+    """Runs event handlers on a fixed number of worker tasks instead of a task per handler call.
+
+    When passed to the ``event_pool`` parameter of :class:`Client`, every event handler
+    call is put in a queue for its event type and run by one of the workers. The workers
+    take from the queues in turn so a burst of one event type, such as
+    :func:`on_member_join` during a raid, does not starve the others.
+
+    When the queue of an event type is full the ``overflow`` policy decides what happens:
+
+    - :attr:`EventOverflowPolicy.drop_oldest` drops the oldest queued call of that event type.
+    - :attr:`EventOverflowPolicy.block` keeps the call but stops reading from the gateway
+      until the queue has room again. Reading has to resume within the client's
+      ``heartbeat_timeout`` or the connection is considered dead.
+    - :attr:`EventOverflowPolicy.unbounded` runs the call in its own task, like a client
+      without a pool would, so the number of calls running at once is no longer bounded.
+
+    .. versionadded:: 2.0
+
+    Parameters
+    -----------
+    workers: :class:`int`
+        The number of handler calls that can run concurrently. Defaults to 32.
+    max_queue_size: :class:`int`
+        The number of handler calls that can be queued per event type. Defaults to 1000.
+    overflow: :class:`EventOverflowPolicy`
+        What to do when a queue is full. Defaults to :attr:`EventOverflowPolicy.drop_oldest`.
+    """
+
+    def __init__(
+        self,
+        *,
+        workers: int = 32,
+        max_queue_size: int = 1000,
+        overflow: EventOverflowPolicy = EventOverflowPolicy.drop_oldest,
+    ) -> None:
+        if workers <= 0:
+            raise ValueError("workers must be greater than 0")
+        if max_queue_size <= 0:
+            raise ValueError("max_queue_size must be greater than 0")
+        if not isinstance(overflow, EventOverflowPolicy):
+            raise TypeError(f"overflow must be EventOverflowPolicy not {overflow.__class__!r}")
+
+        self.workers: int = workers
+        self.max_queue_size: int = max_queue_size
+        self.overflow: EventOverflowPolicy = overflow
+        self._queues: Dict[str, _EventQueue] = {}
+        # event types with queued calls, in the order the workers should serve them
+        self._pending: Deque[str] = deque()
+        self._not_empty: asyncio.Event = asyncio.Event()
+        self._writable: asyncio.Event = asyncio.Event()
+        self._writable.set()
+        self._full: Set[str] = set()
+        self._tasks: List[asyncio.Task] = []
+        self._runner: Callable[..., Coroutine[Any, Any, None]] = None  # type: ignore
+
+    def _bind(self, runner: Callable[..., Coroutine[Any, Any, None]]) -> None:
+        self._runner = runner
+
+    def _start(self) -> None:
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"discord.py: event worker {i}") for i in range(self.workers)
+        ]
+
+    def close(self) -> None:
+        """Stops the workers. Queued handler calls are discarded."""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+        for queue in self._queues.values():
+            queue.items.clear()
+        self._pending.clear()
+        self._full.clear()
+        self._writable.set()
+
+    def submit(self, coro: CoroFunc, event_name: str, *args: Any, **kwargs: Any) -> None:
+        """Queues a handler call. This is called by the client for every handler of every event."""
+        if not self._tasks:
+            self._start()
+
+        try:
+            queue = self._queues[event_name]
+        except KeyError:
+            queue = self._queues[event_name] = _EventQueue()
+
+        items = queue.items
+        if len(items) >= self.max_queue_size:
+            overflow = self.overflow
+            if overflow is EventOverflowPolicy.drop_oldest:
+                items.popleft()
+                queue.dropped += 1
+            elif overflow is EventOverflowPolicy.unbounded:
+                queue.overflowed += 1
+                asyncio.create_task(self._runner(coro, event_name, *args, **kwargs), name=f"discord.py: {event_name}")
+                return
+            else:
+                self._full.add(event_name)
+                self._writable.clear()
+
+        if not items:
+            self._pending.append(event_name)
+        items.append((coro, event_name, args, kwargs))
+        if len(items) > queue.max_depth:
+            queue.max_depth = len(items)
+        self._not_empty.set()
+
+    async def wait_writable(self) -> None:
+        """Waits until no queue is over its limit. Only relevant for the block policy."""
+        await self._writable.wait()
+
+    def _take(self) -> _Item:
+        event_name = self._pending.popleft()
+        queue = self._queues[event_name]
+        items = queue.items
+        item = items.popleft()
+        queue.processed += 1
+        if items:
+            self._pending.append(event_name)
+        elif not self._pending:
+            self._not_empty.clear()
+
+        if event_name in self._full and len(items) < self.max_queue_size:
+            self._full.discard(event_name)
+            if not self._full:
+                self._writable.set()
+        return item
+
+    async def _worker(self) -> None:
+        while True:
+            while not self._pending:
+                await self._not_empty.wait()
+
+            coro, event_name, args, kwargs = self._take()
+            try:
+                await self._runner(coro, event_name, *args, **kwargs)
+            except Exception:
+                _log.exception("Unhandled exception in the error handler of %s", event_name)
+
+    def stats(self) -> Dict[str, EventQueueStats]:
+        """Returns the queue statistics of every event type seen so far, keyed by handler name.
+
+        Returns
+        --------
+        Dict[:class:`str`, :class:`EventQueueStats`]
+            The statistics of each queue, such as ``stats()['on_message'].depth``.
+        """
+        return {
+            name: EventQueueStats(len(q.items), q.max_depth, q.processed, q.dropped, q.overflowed)
+            for name, q in self._queues.items()
+        }
+
+    @property
+    def depth(self) -> int:
+        """:class:`int`: The total number of queued handler calls across every event type."""
+        return sum(len(q.items) for q in self._queues.values())
@@ -57,6 +57,8 @@ __all__ = (
     "ApplicationCommandType",
     "NSFWLevel",
     "ProtocolURL",
+    "EventOverflowPolicy",
+    "RequestPriority",
 )
 
 
@@ -668,6 +670,18 @@ class ProtocolURL(Enum):
         return self.value.format(**kwargs)
 
 
+class EventOverflowPolicy(Enum):
+    drop_oldest = 0
+    block = 1
+    unbounded = 2
+
+
+class RequestPriority(Enum):
+    interaction = 0
+    normal = 1
+    background = 2
+
+
 T = TypeVar("T")
 
 
@@ -271,12 +271,15 @@ class BotBase(GroupMixin):
 
     # internal helpers
 
+    def _is_listening(self, event_name: str) -> bool:
+        return super()._is_listening(event_name) or bool(self.extra_events.get("on_" + event_name))  # type: ignore
+
     def dispatch(self, event_name: str, *args: Any, **kwargs: Any) -> None:
         # super() will resolve to Client
         super().dispatch(event_name, *args, **kwargs)  # type: ignore
         ev = "on_" + event_name
         for event in self.extra_events.get(ev, []):
-            self._schedule_event(event, ev, *args, **kwargs)  # type: ignore
+            self._dispatch_event(event, ev, *args, **kwargs)  # type: ignore
 
     async def setup(self):
         await self.create_slash_commands()
@@ -0,0 +1,576 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015-present Rapptz
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import deque
+import itertools
+import logging
+import os
+import random
+import time
+from typing import Any, Deque, Dict, List, Optional, Set, Tuple
+import zlib
+
+from aiohttp import WSMsgType, web
+
+from . import utils
+
+__all__ = ("FakeGateway",)
+
+_log = logging.getLogger(__name__)
+
+# 2021-01-01 as a Discord epoch millisecond offset, used to build snowflakes
+_BASE_MS = 1609459200000 - utils.DISCORD_EPOCH
+
+
+# method and route -> rate limit bucket hash, limit and period in seconds, routes sharing
+# a hash share their limits per major parameter like they do on Discord
+_REST_BUCKETS: Dict[Tuple[str, str], Tuple[str, int, float]] = {
+    ("GET", "/users/{user_id}"): ("users", 30, 1.0),
+    ("GET", "/channels/{channel_id}"): ("channel", 5, 1.0),
+    ("POST", "/channels/{channel_id}/messages"): ("messages", 5, 5.0),
+    ("GET", "/channels/{channel_id}/messages/{message_id}"): ("message", 5, 1.0),
+    ("PUT", "/channels/{channel_id}/messages/{message_id}/reactions/{emoji}/@me"): ("reactions", 1, 0.25),
+    ("DELETE", "/channels/{channel_id}/messages/{message_id}/reactions/{emoji}/@me"): ("reactions", 1, 0.25),
+    ("DELETE", "/channels/{channel_id}/messages/{message_id}/reactions/{emoji}/{member_id}"): ("reactions", 1, 0.25),
+    ("GET", "/guilds/{guild_id}/members/{member_id}"): ("member", 5, 1.0),
+}
+
+
+def _json_response(data: Any, *, status: int = 200, headers: Optional[Dict[str, str]] = None) -> web.Response:
+    # Discord sends a bare content type, which is what HTTPClient checks for
+    headers = {"Content-Type": "application/json", **(headers or {})}
+    return web.Response(body=utils._to_json(data).encode("utf-8"), status=status, headers=headers)
+
+
+class _Session:
+    __slots__ = ("id", "shard_id", "sequence", "sent", "ws", "compress", "task")
+
+    def __init__(self, shard_id: int) -> None:
+        self.id: str = os.urandom(16).hex()
+        self.shard_id: int = shard_id
+        self.sequence: int = 0
+        # the dispatches sent, so they can be replayed on RESUME
+        self.sent: Deque[Tuple[int, str]] = deque(maxlen=10000)
+        self.ws: Optional[web.WebSocketResponse] = None
+        self.compress: Optional[Any] = None
+        self.task: Optional[asyncio.Task] = None
+
+
+class FakeGateway:
+    """A stand-in for the Discord gateway and the few HTTP routes needed to log in, for load testing.
+
+    It speaks enough of the gateway protocol for :class:`Client` and :class:`AutoShardedClient`
+    to connect, IDENTIFY, RESUME and heartbeat. It serves synthetic guilds split across shards
+    the same way Discord does and emits messages at a configurable rate. Clients are pointed at
+    it with the ``gateway_url`` and ``api_url`` options, and log in with any token: ::
+
+        gateway = FakeGateway(shard_count=8, guilds=1000, message_rate=50)
+        await gateway.start()
+        client = discord.AutoShardedClient(
+            intents=discord.Intents.all(), gateway_url=gateway.url, api_url=gateway.api_url
+        )
+        await client.start('fake-token')
+
+    Like Discord, it closes connections that send more than 120 payloads in 60 seconds with
+    close code 4008, and rejects invalid shards with 4010.
+
+    It also serves a few REST routes (fetching users, channels, messages and members, sending
+    messages and reactions) with Discord's rate limit semantics: each route is in a bucket
+    given by the ``X-RateLimit-Bucket`` header, several routes may share a bucket, limits
+    apply per bucket and major parameter, and going over them is answered with a 429.
+
+    .. versionadded:: 2.0
+
+    Parameters
+    -----------
+    host: :class:`str`
+        The host to listen on. Defaults to ``'127.0.0.1'``.
+    port: :class:`int`
+        The port to listen on. Defaults to ``0``, which picks a free port.
+    shard_count: :class:`int`
+        The number of shards the fake recommends and expects. Defaults to 1.
+    max_concurrency: :class:`int`
+        The ``max_concurrency`` reported by ``/gateway/bot``. Defaults to 1.
+    guilds: :class:`int`
+        The number of guilds, spread across the shards. Defaults to 10.
+    members_per_guild: :class:`int`
+        The number of members of each guild. Defaults to 100.
+    channels_per_guild: :class:`int`
+        The number of text channels of each guild. Defaults to 5.
+    message_rate: :class:`float`
+        The number of MESSAGE_CREATE events sent per second to each shard.
+        Defaults to ``0``, which sends none.
+    heartbeat_interval: :class:`float`
+        The heartbeat interval sent in HELLO, in seconds. Defaults to 41.25.
+    rest_latency: :class:`float`
+        How long REST requests take to be answered, in seconds, to mimic the round trip
+        to Discord. Defaults to ``0``.
+    global_rate_limit: :class:`int`
+        The number of REST requests allowed in any second across every route, over which
+        requests are answered with a global 429. Defaults to 50.
+    rest_buckets: Optional[Dict[Tuple[:class:`str`, :class:`str`], Tuple[:class:`str`, :class:`int`, :class:`float`]]]
+        Overrides of the rate limits of REST routes, mapping a method and route such as
+        ``('POST', '/channels/{channel_id}/messages')`` to a bucket hash, the number of
+        requests allowed and the period they are allowed in, in seconds.
+
+    Attributes
+    -----------
+    identifies: :class:`int`
+        The number of IDENTIFY payloads received.
+    resumes: :class:`int`
+        The number of RESUME payloads received.
+    dispatched: :class:`int`
+        The number of events sent.
+    requests: :class:`int`
+        The number of REST requests received.
+    rate_limited: :class:`int`
+        The number of REST requests answered with a 429.
+    """
+
+    def __init__(
+        self,
+        *,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        shard_count: int = 1,
+        max_concurrency: int = 1,
+        guilds: int = 10,
+        members_per_guild: int = 100,
+        channels_per_guild: int = 5,
+        message_rate: float = 0.0,
+        heartbeat_interval: float = 41.25,
+        rest_latency: float = 0.0,
+        global_rate_limit: int = 50,
+        rest_buckets: Optional[Dict[Tuple[str, str], Tuple[str, int, float]]] = None,
+    ) -> None:
+        self.host: str = host
+        self.port: int = port
+        self.shard_count: int = shard_count
+        self.max_concurrency: int = max_concurrency
+        self.members_per_guild: int = members_per_guild
+        self.channels_per_guild: int = channels_per_guild
+        self.message_rate: float = message_rate
+        self.heartbeat_interval: float = heartbeat_interval
+        self.rest_latency: float = rest_latency
+        self.global_rate_limit: int = global_rate_limit
+        self.rest_buckets: Dict[Tuple[str, str], Tuple[str, int, float]] = {**_REST_BUCKETS, **(rest_buckets or {})}
+
+        self.identifies: int = 0
+        self.resumes: int = 0
+        self.dispatched: int = 0
+        self.requests: int = 0
+        self.rate_limited: int = 0
+
+        self.user: Dict[str, Any] = {
+            "id": str(self._snowflake(0)),
+            "username": "Fake Bot",
+            "discriminator": "0000",
+            "avatar": None,
+            "bot": True,
+            "flags": 0,
+            "public_flags": 0,
+        }
+        self._guild_ids: List[int] = [self._snowflake(i + 1) for i in range(guilds)]
+        self._sessions: Dict[str, _Session] = {}
+        self._connections: Set[web.WebSocketResponse] = set()
+        self._runner: Optional[web.AppRunner] = None
+        self._ids = itertools.count(1)
+
+        # (bucket hash, major parameter) -> [remaining, reset time]
+        self._rest_buckets: Dict[Tuple[str, str], List[float]] = {}
+        # the times of the last REST requests, for the global rate limit
+        self._rest_times: Deque[float] = deque(maxlen=global_rate_limit)
+
+        app = web.Application(middlewares=[self._rate_limit])
+        app.router.add_get("/", self._handle_gateway)
+        app.router.add_get("/api/v{version}/gateway", self._handle_get_gateway)
+        app.router.add_get("/api/v{version}/gateway/bot", self._handle_get_bot_gateway)
+        app.router.add_get("/api/v{version}/users/@me", self._handle_get_user)
+        for (method, path) in self.rest_buckets:
+            app.router.add_route(method, "/api/v{version}" + path, self._handle_rest)
+        self._app: web.Application = app
+
+    @staticmethod
+    def _snowflake(index: int) -> int:
+        return (_BASE_MS + index) << 22
+
+    @property
+    def url(self) -> str:
+        """:class:`str`: The URL to pass as ``gateway_url``."""
+        return f"ws://{self.host}:{self.port}/"
+
+    @property
+    def api_url(self) -> str:
+        """:class:`str`: The URL to pass as ``api_url``."""
+        return f"http://{self.host}:{self.port}/api/v8"
+
+    async def start(self) -> None:
+        """|coro|
+
+        Starts listening.
+        """
+        runner = web.AppRunner(self._app)
+        await runner.setup()
+        site = web.TCPSite(runner, self.host, self.port)
+        await site.start()
+        # resolve the port if a free one was picked
+        self.port = runner.addresses[0][1]
+        self._runner = runner
+        _log.info("Fake gateway listening on %s", self.url)
+
+    async def close(self) -> None:
+        """|coro|
+
+        Closes every connection and stops listening.
+        """
+        await self.disconnect_all(code=1001)
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def disconnect_all(self, *, code: int = 4000) -> None:
+        """|coro|
+
+        Closes every connection with the given close code, e.g. to simulate a reconnect storm.
+        Sessions are kept, so clients can RESUME them.
+        """
+        await asyncio.gather(*(ws.close(code=code) for ws in tuple(self._connections)), return_exceptions=True)
+
+    def invalidate_sessions(self) -> None:
+        """Forgets every session, so the next RESUME of each client is rejected."""
+        self._sessions.clear()
+
+    # HTTP routes
+
+    async def _handle_get_gateway(self, request: web.Request) -> web.Response:
+        return _json_response({"url": self.url.rstrip("/")})
+
+    async def _handle_get_bot_gateway(self, request: web.Request) -> web.Response:
+        return _json_response(
+            {
+                "url": self.url.rstrip("/"),
+                "shards": self.shard_count,
+                "session_start_limit": {
+                    "total": 1000,
+                    "remaining": 1000,
+                    "reset_after": 86400000,
+                    "max_concurrency": self.max_concurrency,
+                },
+            }
+        )
+
+    async def _handle_get_user(self, request: web.Request) -> web.Response:
+        return _json_response(self.user)
+
+    @web.middleware
+    async def _rate_limit(self, request: web.Request, handler: Any) -> web.StreamResponse:
+        resource = request.match_info.route.resource
+        path = resource.canonical[len("/api/v{version}") :] if resource is not None else ""
+        try:
+            bucket_hash, limit, per = self.rest_buckets[(request.method, path)]
+        except KeyError:
+            return await handler(request)
+
+        self.requests += 1
+        if self.rest_latency:
+            await asyncio.sleep(self.rest_latency)
+
+        now = time.monotonic()
+        times = self._rest_times
+        if len(times) == self.global_rate_limit and times[0] + 1.0 > now:
+            self.rate_limited += 1
+            retry_after = times[0] + 1.0 - now
+            headers = {"X-RateLimit-Global": "true", "Retry-After": str(int(retry_after) + 1), "Via": "1.1 google"}
+            data = {"message": "You are being rate limited.", "retry_after": retry_after, "global": True}
+            return _json_response(data, status=429, headers=headers)
+        times.append(now)
+
+        info = request.match_info
+        major = info.get("channel_id") or info.get("guild_id") or ""
+        state = self._rest_buckets.get((bucket_hash, major))
+        if state is None or state[1] <= now:
+            state = self._rest_buckets[(bucket_hash, major)] = [limit, now + per]
+
+        reset_after = state[1] - now
+        headers = {
+            "X-RateLimit-Bucket": bucket_hash,
+            "X-RateLimit-Limit": str(limit),
+            "X-RateLimit-Reset": f"{time.time() + reset_after:.3f}",
+            "X-RateLimit-Reset-After": f"{reset_after:.3f}",
+        }
+        if state[0] <= 0:
+            self.rate_limited += 1
+            headers.update(
+                {"X-RateLimit-Remaining": "0", "Retry-After": str(int(reset_after) + 1), "Via": "1.1 google"}
+            )
+            data = {"message": "You are being rate limited.", "retry_after": reset_after, "global": False}
+            return _json_response(data, status=429, headers=headers)
+
+        state[0] -= 1
+        headers["X-RateLimit-Remaining"] = str(int(state[0]))
+        response = await handler(request)
+        response.headers.update(headers)
+        return response
+
+    async def _handle_rest(self, request: web.Request) -> web.Response:
+        info = request.match_info
+        if "reactions" in request.path:
+            return web.Response(status=204)
+        if "message_id" in info:
+            return _json_response(self._message(int(info["channel_id"]), int(info["message_id"]), "hello"))
+        if request.method == "POST":
+            data = await request.json()
+            return _json_response(
+                self._message(int(info["channel_id"]), self._snowflake(next(self._ids)), data.get("content"))
+            )
+        if "channel_id" in info:
+            channel_id = int(info["channel_id"])
+            return _json_response(
+                {
+                    "id": str(channel_id),
+                    "type": 0,
+                    "name": "channel",
+                    "position": 0,
+                    "guild_id": str(channel_id >> 22 << 22),
+                }
+            )
+
+        user_id = info.get("member_id") or info["user_id"]
+        member = self._member(int(info.get("guild_id", 0)), int(user_id) % 10000)
+        member["user"]["id"] = user_id
+        return _json_response(member if "member_id" in info else member["user"])
+
+    # payloads
+
+    def _guilds_for(self, shard_id: int) -> List[int]:
+        return [guild_id for guild_id in self._guild_ids if (guild_id >> 22) % self.shard_count == shard_id]
+
+    def _member(self, guild_id: int, index: int) -> Dict[str, Any]:
+        return {
+            "user": {
+                "id": str(self._snowflake(100000 + index)),
+                "username": f"member {index}",
+                "discriminator": f"{index % 10000:04}",
+                "avatar": None,
+                "public_flags": 0,
+            },
+            "roles": [],
+            "joined_at": "2021-01-01T00:00:00+00:00",
+            "deaf": False,
+            "mute": False,
+        }
+
+    def _channel_id(self, guild_id: int, index: int) -> int:
+        return guild_id + index + 1
+
+    def _guild_create(self, guild_id: int) -> Dict[str, Any]:
+        members = [self._member(guild_id, i) for i in range(self.members_per_guild)]
+        members.append({"user": self.user, "roles": [], "joined_at": "2021-01-01T00:00:00+00:00"})
+        return {
+            "id": str(guild_id),
+            "name": f"guild {guild_id}",
+            "owner_id": self.user["id"],
+            "member_count": len(members),
+            "large": len(members) >= 250,
+            "roles": [{"id": str(guild_id), "name": "@everyone", "permissions": "104324673", "position": 0}],
+            "channels": [
+                {"id": str(self._channel_id(guild_id, i)), "type": 0, "name": f"channel-{i}", "position": i}
+                for i in range(self.channels_per_guild)
+            ],
+            "members": members,
+            "emojis": [],
+            "stickers": [],
+            "features": [],
+            "threads": [],
+            "voice_states": [],
+            "presences": [],
+            "stage_instances": [],
+            "unavailable": False,
+        }
+
+    def _message_create(self, guild_id: int) -> Dict[str, Any]:
+        channel_id = self._channel_id(guild_id, random.randrange(max(self.channels_per_guild, 1)))
+        return self._message(channel_id, self._snowflake(next(self._ids)) | 1, "hello")
+
+    def _message(self, channel_id: int, message_id: int, content: Optional[str]) -> Dict[str, Any]:
+        guild_id = channel_id >> 22 << 22
+        author = self._member(guild_id, random.randrange(max(self.members_per_guild, 1)))
+        user = author.pop("user")
+        return {
+            "id": str(message_id),
+            "channel_id": str(channel_id),
+            "guild_id": str(guild_id),
+            "author": user,
+            "member": author,
+            "content": content or "",
+            "timestamp": "2021-01-01T00:00:00+00:00",
+            "edited_timestamp": None,
+            "tts": False,
+            "mention_everyone": False,
+            "mentions": [],
+            "mention_roles": [],
+            "attachments": [],
+            "embeds": [],
+            "pinned": False,
+            "type": 0,
+        }
+
+    # gateway
+
+    async def _send(self, ws: web.WebSocketResponse, compress: Optional[Any], data: str) -> None:
+        if compress is None:
+            await ws.send_str(data)
+        else:
+            await ws.send_bytes(compress.compress(data.encode("utf-8")) + compress.flush(zlib.Z_SYNC_FLUSH))
+
+    async def _dispatch(self, session: _Session, event: str, data: Dict[str, Any]) -> None:
+        session.sequence += 1
+        payload = utils._to_json({"t": event, "s": session.sequence, "op": 0, "d": data})
+        session.sent.append((session.sequence, payload))
+        self.dispatched += 1
+        if session.ws is not None and not session.ws.closed:
+            await self._send(session.ws, session.compress, payload)
+
+    async def _emit_messages(self, session: _Session) -> None:
+        guild_ids = self._guilds_for(session.shard_id)
+        if not guild_ids:
+            return
+
+        interval = 1 / self.message_rate
+        while session.ws is not None and not session.ws.closed:
+            await asyncio.sleep(interval)
+            await self._dispatch(session, "MESSAGE_CREATE", self._message_create(random.choice(guild_ids)))
+
+    async def _identify(self, session: _Session, data: Dict[str, Any]) -> None:
+        await self._dispatch(
+            session,
+            "READY",
+            {
+                "v": 9,
+                "user": self.user,
+                "guilds": [
+                    {"id": str(guild_id), "unavailable": True} for guild_id in self._guilds_for(session.shard_id)
+                ],
+                "session_id": session.id,
+                "resume_gateway_url": self.url.rstrip("/"),
+                "shard": [session.shard_id, self.shard_count],
+                "application": {"id": self.user["id"], "flags": 0},
+                "private_channels": [],
+                "relationships": [],
+            },
+        )
+        for guild_id in self._guilds_for(session.shard_id):
+            await self._dispatch(session, "GUILD_CREATE", self._guild_create(guild_id))
+
+    async def _request_members(self, session: _Session, data: Dict[str, Any]) -> None:
+        guild_id = int(data["guild_id"])
+        members = self._guild_create(guild_id)["members"]
+        user_ids = data.get("user_ids")
+        if user_ids:
+            wanted = set(map(str, user_ids))
+            members = [m for m in members if m["user"]["id"] in wanted]
+        await self._dispatch(
+            session,
+            "GUILD_MEMBERS_CHUNK",
+            {
+                "guild_id": str(guild_id),
+                "members": members,
+                "chunk_index": 0,
+                "chunk_count": 1,
+                "nonce": data.get("nonce"),
+            },
+        )
+
+    async def _handle_gateway(self, request: web.Request) -> web.WebSocketResponse:
+        ws = web.WebSocketResponse(max_msg_size=0)
+        await ws.prepare(request)
+        self._connections.add(ws)
+        compress = zlib.compressobj() if request.query.get("compress") == "zlib-stream" else None
+        session: Optional[_Session] = None
+        sent: Deque[float] = deque()
+
+        try:
+            hello = {"op": 10, "d": {"heartbeat_interval": int(self.heartbeat_interval * 1000)}}
+            await self._send(ws, compress, utils._to_json(hello))
+            async for msg in ws:
+                if msg.type is not WSMsgType.TEXT:
+                    continue
+
+                # the same limit Discord applies
+                now = time.monotonic()
+                sent.append(now)
+                while sent[0] < now - 60:
+                    sent.popleft()
+                if len(sent) > 120:
+                    await ws.close(code=4008, message=b"Rate limited.")
+                    break
+
+                payload = utils._from_json(msg.data)
+                op = payload.get("op")
+                data = payload.get("d")
+                if op == 1:
+                    await self._send(ws, compress, '{"op":11,"d":null}')
+                elif op == 2:
+                    self.identifies += 1
+                    shard_id, shard_count = data.get("shard", (0, 1))
+                    if shard_count != self.shard_count or not 0 <= shard_id < shard_count:
+                        await ws.close(code=4010, message=b"Invalid shard.")
+                        break
+
+                    session = _Session(shard_id)
+                    session.ws = ws
+                    session.compress = compress
+                    self._sessions[session.id] = session
+                    await self._identify(session, data)
+                    if self.message_rate > 0:
+                        session.task = asyncio.create_task(self._emit_messages(session))
+                elif op == 6:
+                    self.resumes += 1
+                    session = self._sessions.get(data["session_id"])
+                    if session is None:
+                        await self._send(ws, compress, '{"op":9,"d":false}')
+                        continue
+
+                    session.ws = ws
+                    session.compress = compress
+                    seq = data.get("seq") or 0
+                    for sequence, missed in tuple(session.sent):
+                        if sequence > seq:
+                            await self._send(ws, compress, missed)
+                    await self._dispatch(session, "RESUMED", {"_trace": ["fake-gateway"]})
+                    if self.message_rate > 0 and (session.task is None or session.task.done()):
+                        session.task = asyncio.create_task(self._emit_messages(session))
+                elif op == 8 and session is not None:
+                    await self._request_members(session, data)
+        finally:
+            self._connections.discard(ws)
+            if session is not None and session.ws is ws:
+                session.ws = None
+                if session.task is not None:
+                    session.task.cancel()
+
+        return ws
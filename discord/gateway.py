@@ -37,28 +37,47 @@ from typing import (
     Coroutine,
     NamedTuple,
     Deque,
+    Tuple,
+    Union,
+    ClassVar,
+    FrozenSet,
+    Set,
 )
 
 import asyncio
 from collections import deque
 import concurrent.futures
 import logging
+import re
 import struct
 import sys
 import time
 import threading
 import traceback
+from urllib.parse import parse_qs, urlsplit
 import zlib
 
 import aiohttp
 
+try:
+    import zstandard
+except ModuleNotFoundError:
+    HAS_ZSTD = False
+else:
+    HAS_ZSTD = True
+
 from . import utils
+from .etf import _from_etf, _to_etf
 from .activity import BaseActivity
-from .enums import SpeakingState
+from .enums import EventOverflowPolicy, SpeakingState
 from .errors import ConnectionClosed, InvalidArgument
+from .session import SessionInfo
 
 if TYPE_CHECKING:
     from .client import Client
+    from .dispatcher import EventWorkerPool
+    from .timings import EventTimings
+    from .recorder import GatewayRecorder
     from .state import ConnectionState
     from .voice_client import VoiceClient
 
@@ -74,6 +93,8 @@ if TYPE_CHECKING:
 
 _log: logging.Logger = logging.getLogger(__name__)
 
+_DISPATCH_PREFIX = re.compile(r'\{"t":"([A-Z_]+)","s":(\d+),')
+
 
 __all__ = (
     "DiscordWebSocket",
@@ -153,6 +174,83 @@ class GatewayRatelimiter:
                 await asyncio.sleep(delta)
 
 
+# how long the event loop may be blocked before the watchdog logs where
+_BLOCKED_LOOP_WARNING = 10.0
+
+
+class _LoopWatchdog(threading.Thread):
+    # A single thread per event loop, shared by every heartbeat running on it. The heartbeats
+    # are tasks of the loop, so they cannot notice the loop being blocked while it happens.
+    # The thread pings the loop every second and logs the stack of the loop thread when the
+    # ping is not answered in time.
+
+    _watchdogs: Dict[asyncio.AbstractEventLoop, _LoopWatchdog] = {}
+    _lock: threading.Lock = threading.Lock()
+
+    def __init__(self, loop: asyncio.AbstractEventLoop) -> None:
+        super().__init__(name="discord-heartbeat-watchdog", daemon=True)
+        self.loop: asyncio.AbstractEventLoop = loop
+        self.handlers: Set[KeepAliveHandler] = set()
+        self._loop_thread_id: int = threading.get_ident()
+        self._last_tick: float = time.perf_counter()
+        self._stop_ev: threading.Event = threading.Event()
+
+    @classmethod
+    def register(cls, handler: KeepAliveHandler) -> None:
+        loop = handler.ws.loop
+        with cls._lock:
+            watchdog = cls._watchdogs.get(loop)
+            if watchdog is None:
+                watchdog = cls._watchdogs[loop] = cls(loop)
+                watchdog.start()
+            watchdog.handlers.add(handler)
+
+    @classmethod
+    def unregister(cls, handler: KeepAliveHandler) -> None:
+        with cls._lock:
+            watchdog = cls._watchdogs.get(handler.ws.loop)
+            if watchdog is None:
+                return
+            watchdog.handlers.discard(handler)
+            if not watchdog.handlers:
+                watchdog._stop_ev.set()
+                del cls._watchdogs[watchdog.loop]
+
+    def _tick(self) -> None:
+        self._last_tick = time.perf_counter()
+
+    def run(self) -> None:
+        warned = 0.0
+        while not self._stop_ev.wait(1.0):
+            try:
+                self.loop.call_soon_threadsafe(self._tick)
+            except RuntimeError:
+                # the loop was closed without stopping the heartbeats
+                return
+
+            blocked = time.perf_counter() - self._last_tick
+            if blocked < _BLOCKED_LOOP_WARNING:
+                warned = 0.0
+                continue
+
+            # warn every 10 seconds of a single block
+            total = blocked // _BLOCKED_LOOP_WARNING * _BLOCKED_LOOP_WARNING
+            if total <= warned:
+                continue
+            warned = total
+
+            with self._lock:
+                shard_ids = sorted({handler.shard_id or 0 for handler in self.handlers})
+            frame = sys._current_frames().get(self._loop_thread_id)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+            _log.warning(
+                "Shard ID %s heartbeat blocked for more than %s seconds.\nLoop traceback (most recent call last):\n%s",
+                ", ".join(map(str, shard_ids)),
+                int(total),
+                stack,
+            )
+
+
 class KeepAliveHandler:
     def __init__(self, *, ws: DiscordWebSocket, shard_id: int = None, interval: float = None) -> None:
         self.ws: DiscordWebSocket = ws
@@ -163,19 +261,25 @@ class KeepAliveHandler:
         self.msg: str = "Keeping shard ID %s websocket alive with sequence %s."
         self.block_msg: str = "Shard ID %s heartbeat blocked for more than %s seconds."
         self.behind_msg: str = "Can't keep up, shard ID %s websocket is %.1fs behind."
-        self._stop_ev: asyncio.Event = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._waiter: Optional[asyncio.Future] = None
+        self._stopped: bool = False
         self._last_send: float = time.perf_counter()
         self._last_recv: float = time.perf_counter()
         self._last_ack: float = time.perf_counter()
         self.latency: float = float("inf")
 
     async def run(self) -> None:
-        while True:
+        loop = self.ws.loop
+        while not self._stopped:
+            # stop() wakes the handler up early, it never interrupts a heartbeat being sent
+            self._waiter = loop.create_future()
+            handle = loop.call_later(self.interval, self._wake)  # type: ignore
             try:
-                await asyncio.wait_for(self._stop_ev.wait(), timeout=self.interval)
-            except asyncio.TimeoutError:
-                pass
-            else:
+                await self._waiter
+            finally:
+                handle.cancel()
+            if self._stopped:
                 return
 
             if self._last_recv + self.heartbeat_timeout < time.perf_counter():
@@ -209,6 +313,7 @@ class KeepAliveHandler:
 
             except Exception:
                 self.stop()
+                return
             else:
                 self._last_send = time.perf_counter()
 
@@ -220,10 +325,20 @@ class KeepAliveHandler:
         }
 
     def start(self) -> None:
-        self.ws.loop.create_task(self.run())
+        self._task = self.ws.loop.create_task(self.run())
+        _LoopWatchdog.register(self)
+
+    def _wake(self) -> None:
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
 
     def stop(self) -> None:
-        self._stop_ev.set()
+        if self._stopped:
+            return
+
+        self._stopped = True
+        _LoopWatchdog.unregister(self)
+        self._wake()
 
     def tick(self) -> None:
         self._last_recv = time.perf_counter()
@@ -255,6 +370,91 @@ class VoiceKeepAliveHandler(KeepAliveHandler):
         self.recent_ack_latencies.append(self.latency)
 
 
+class _GatewayTraffic:
+    # running totals for a shard, kept across its connections
+    __slots__ = ("received", "decompressed")
+
+    def __init__(self) -> None:
+        self.received: int = 0
+        self.decompressed: int = 0
+
+
+class _TransportCompression:
+    # Undoes the transport compression of a gateway connection, selected with the compress
+    # parameter of the gateway URL. A new instance is created for every connection since the
+    # compression context spans the whole connection. This base class is for no compression.
+
+    name: ClassVar[Optional[str]] = None
+    errors: ClassVar[Tuple[Type[Exception], ...]] = ()
+
+    def __init__(self, traffic: _GatewayTraffic) -> None:
+        self.traffic: _GatewayTraffic = traffic
+
+    def feed(self, data: bytes) -> Optional[bytes]:
+        """Returns the compressed frame once it is complete, else ``None``."""
+        return data
+
+    def _decompress(self, frame: bytes) -> bytes:
+        return frame
+
+    def decompress(self, frame: bytes) -> bytes:
+        data = self._decompress(frame)
+        self.traffic.received += len(frame)
+        self.traffic.decompressed += len(data)
+        return data
+
+
+class _ZlibStream(_TransportCompression):
+    name = "zlib-stream"
+    errors = (zlib.error,)
+
+    def __init__(self, traffic: _GatewayTraffic) -> None:
+        super().__init__(traffic)
+        self._zlib = zlib.decompressobj()
+        self._buffer: bytearray = bytearray()
+
+    def feed(self, data: bytes) -> Optional[bytes]:
+        # a frame may be split across several messages and ends with a Z_SYNC_FLUSH
+        self._buffer.extend(data)
+        if len(data) < 4 or data[-4:] != b"\x00\x00\xff\xff":
+            return None
+
+        frame = self._buffer
+        self._buffer = bytearray()
+        return frame
+
+    def _decompress(self, frame: bytes) -> bytes:
+        return self._zlib.decompress(frame)
+
+
+class _ZstdStream(_TransportCompression):
+    name = "zstd-stream"
+    errors = (zstandard.ZstdError,) if HAS_ZSTD else ()
+
+    def __init__(self, traffic: _GatewayTraffic) -> None:
+        super().__init__(traffic)
+        # every message is a whole frame, flushed at the end
+        self._zstd = zstandard.ZstdDecompressor().decompressobj()
+
+    def _decompress(self, frame: bytes) -> bytes:
+        return self._zstd.decompress(frame)
+
+
+_TRANSPORT_COMPRESSIONS: Dict[Optional[str], Type[_TransportCompression]] = {
+    None: _TransportCompression,
+    "zlib-stream": _ZlibStream,
+    "zstd-stream": _ZstdStream,
+}
+
+
+def _get_transport_compression(state: ConnectionState) -> Optional[str]:
+    compress = state.gateway_compression
+    if compress == "zstd-stream" and not HAS_ZSTD:
+        _log.warning("zstd-stream gateway compression requires the zstandard library, falling back to zlib-stream.")
+        compress = state.gateway_compression = "zlib-stream"
+    return compress
+
+
 class DiscordClientWebSocketResponse(aiohttp.ClientWebSocketResponse):
     async def close(self, *, code: int = 4000, message: bytes = b"") -> bool:
         return await super().close(code=code, message=message)
@@ -329,8 +529,11 @@ class DiscordWebSocket:
         # ws related stuff
         self.session_id: Optional[str] = None
         self.sequence: Optional[int] = None
-        self._zlib = zlib.decompressobj()
-        self._buffer: bytearray = bytearray()
+        self.resume_url: Optional[str] = None
+        self._transport: _TransportCompression = _TransportCompression(_GatewayTraffic())
+        self._encode: Callable[[Any], Union[str, bytes]] = utils._to_json
+        self._decode: Callable[[Union[str, bytes]], Any] = utils._from_json
+        self._etf: bool = False
         self._close_code: Optional[int] = None
         self._rate_limiter: GatewayRatelimiter = GatewayRatelimiter()
 
@@ -345,6 +548,11 @@ class DiscordWebSocket:
         self.shard_count: Optional[int] = utils.MISSING
         self.session_id: Optional[str] = utils.MISSING
         self._max_heartbeat_timeout: float = utils.MISSING
+        self._offload_threshold: Optional[int] = utils.MISSING
+        self._ignored_events: FrozenSet[str] = utils.MISSING
+        self._event_pool: Optional[EventWorkerPool] = None
+        self._timings: Optional[EventTimings] = None
+        self._recorder: Optional[GatewayRecorder] = None
 
     @property
     def open(self) -> bool:
@@ -353,6 +561,16 @@ class DiscordWebSocket:
     def is_ratelimited(self) -> bool:
         return self._rate_limiter.is_ratelimited()
 
+    def _get_session_info(self) -> Optional[SessionInfo]:
+        if self.session_id is None or self.sequence is None:
+            return None
+        return SessionInfo(
+            session_id=self.session_id,
+            sequence=self.sequence,
+            resume_url=self.resume_url,
+            shard_count=self.shard_count,
+        )
+
     def debug_log_receive(self, data, /) -> None:
         self._dispatch("socket_raw_receive", data)
 
@@ -375,7 +593,22 @@ class DiscordWebSocket:
 
         This is for internal use only.
         """
-        gateway = gateway or await client.http.get_gateway()
+        state = client._connection
+        if not gateway:
+            compress = _get_transport_compression(state)
+            gateway = await client.http.get_gateway(encoding=state.gateway_encoding, compress=compress)
+        elif "compress=zstd-stream" in gateway and _get_transport_compression(state) != "zstd-stream":
+            # a stored resume URL from when zstandard was installed
+            gateway = gateway.replace("compress=zstd-stream", "compress=zlib-stream")
+
+        # the encoding and compression are read from the URL, which may be a stored resume URL
+        query = parse_qs(urlsplit(gateway).query)
+        compress = query.get("compress", [None])[0]
+        try:
+            transport = _TRANSPORT_COMPRESSIONS[compress]
+        except KeyError:
+            raise ValueError(f"unknown gateway compression {compress!r}") from None
+
         socket = await client.http.ws_connect(gateway)
         ws = cls(socket, loop=client.loop)
 
@@ -394,7 +627,20 @@ class DiscordWebSocket:
         ws.shard_count = client._connection.shard_count
         ws.session_id = session
         ws.sequence = sequence
+        if resume:
+            # READY is not sent again, so the URL being resumed on stays the one to resume on
+            ws.resume_url = gateway
         ws._max_heartbeat_timeout = client._connection.heartbeat_timeout
+        ws._offload_threshold = client._connection.gateway_offload_threshold
+        ws._transport = transport(state._gateway_traffic.setdefault(shard_id, _GatewayTraffic()))
+        if query.get("encoding") == ["etf"]:
+            ws._etf = True
+            ws._encode = _to_etf
+            ws._decode = _from_etf
+        ws._ignored_events = client._connection.ignored_events
+        ws._event_pool = client._event_pool
+        ws._timings = client._event_timings
+        ws._recorder = client._gateway_recorder
 
         if client._enable_debug_events:
             ws.send = ws.debug_send
@@ -405,7 +651,21 @@ class DiscordWebSocket:
         _log.debug("Created websocket connected to %s", gateway)
 
         # poll event for OP Hello
-        await ws.poll_event()
+        try:
+            await ws.poll_event()
+        except ReconnectWebSocket:
+            if transport is not _ZstdStream or state.gateway_compression == "zstd-stream":
+                raise
+            # HELLO could not be decompressed, connect again with the zlib-stream fallback
+            return await cls.from_client(
+                client,
+                initial=initial,
+                gateway=gateway,
+                shard_id=shard_id,
+                session=session,
+                sequence=sequence,
+                resume=resume,
+            )
 
         if not resume:
             await ws.identify()
@@ -479,18 +739,61 @@ class DiscordWebSocket:
         await self.send_as_json(payload)
         _log.info("Shard ID %s has sent the RESUME payload.", self.shard_id)
 
+    def _decode_frame(self, data) -> Tuple[Union[str, bytes], Any]:
+        if type(data) is not str:
+            data = self._transport.decompress(data)
+            if not self._etf:
+                data = data.decode("utf-8")
+        else:
+            # uncompressed text frames
+            traffic = self._transport.traffic
+            traffic.received += len(data)
+            traffic.decompressed += len(data)
+
+        if self._ignored_events and not self._etf:
+            # Discord sends the event name and sequence first so ignored events
+            # can be dropped without decoding the rest of the payload
+            match = _DISPATCH_PREFIX.match(data)
+            if match is not None and match.group(1) in self._ignored_events:
+                return data, {"t": match.group(1), "s": int(match.group(2)), "op": self.DISPATCH, "d": None}
+
+        return data, self._decode(data)
+
     async def received_message(self, msg, /) -> None:
         if type(msg) is bytes:
-            self._buffer.extend(msg)
-
-            if len(msg) < 4 or msg[-4:] != b"\x00\x00\xff\xff":
+            msg = self._transport.feed(msg)
+            if msg is None:
                 return
-            msg = self._zlib.decompress(self._buffer)
-            msg = msg.decode("utf-8")
-            self._buffer = bytearray()
 
-        self.log_receive(msg)
-        msg = utils._from_json(msg)
+        # Large frames (e.g. GUILD_CREATE or GUILD_MEMBERS_CHUNK of big guilds) are
+        # decompressed and decoded in a worker thread so they don't stall the loop.
+        # Ordering is preserved since poll_event doesn't receive the next frame until
+        # this one is handled.
+        timings = self._timings
+        if timings is not None:
+            start = time.perf_counter()
+
+        threshold = self._offload_threshold
+        try:
+            if threshold is not None and len(msg) >= threshold:
+                raw, msg = await self.loop.run_in_executor(None, self._decode_frame, msg)
+            else:
+                raw, msg = self._decode_frame(msg)
+        except self._transport.errors as exc:
+            if self._transport.name != "zstd-stream":
+                raise
+            _log.warning(
+                "Shard ID %s could not decompress the zstd-stream gateway, falling back to zlib-stream.",
+                self.shard_id,
+                exc_info=exc,
+            )
+            self._connection.gateway_compression = "zlib-stream"
+            await self.close()
+            raise ReconnectWebSocket(self.shard_id) from None
+
+        self.log_receive(raw)
+        if self._recorder is not None:
+            self._recorder.record(self.shard_id, raw)
 
         _log.debug("For Shard ID %s: WebSocket Event: %s", self.shard_id, msg)
         event = msg.get("t")
@@ -498,6 +801,9 @@ class DiscordWebSocket:
             self._dispatch("socket_event_type", event)
 
         op = msg.get("op")
+        if timings is not None:
+            timings._record(timings.decode, event or f"OP {op}", time.perf_counter() - start)
+
         data = msg.get("d")
         seq = msg.get("s")
         if seq is not None:
@@ -506,6 +812,9 @@ class DiscordWebSocket:
         if self._keep_alive:
             self._keep_alive.tick()
 
+        if event in self._ignored_events:
+            return
+
         if op != self.DISPATCH:
             if op == self.RECONNECT:
                 # "reconnect" can only be handled by the Client
@@ -552,6 +861,11 @@ class DiscordWebSocket:
             self._trace = trace = data.get("_trace", [])
             self.sequence = msg["s"]
             self.session_id = data["session_id"]
+            resume_url = data.get("resume_gateway_url")
+            if resume_url:
+                # keep the same encoding and compression parameters
+                _, _, query = self.gateway.partition("?")
+                self.resume_url = f"{resume_url}?{query}" if query else resume_url
             # pass back shard ID to ready handler
             data["__shard_id__"] = self.shard_id
             _log.info(
@@ -577,7 +891,12 @@ class DiscordWebSocket:
         except KeyError:
             _log.debug("Unknown event %s.", event)
         else:
-            func(data)
+            if timings is None:
+                func(data)
+            else:
+                start = time.perf_counter()
+                func(data)
+                timings._record(timings.parse, event, time.perf_counter() - start)
 
         # remove the dispatched listeners
         removed = []
@@ -623,6 +942,11 @@ class DiscordWebSocket:
             The websocket connection was terminated for unhandled reasons.
         """
         try:
+            pool = self._event_pool
+            if pool is not None and pool.overflow is EventOverflowPolicy.block:
+                # apply backpressure until the event handlers catch up
+                await pool.wait_writable()
+
             msg = await self.socket.receive(timeout=self._max_heartbeat_timeout)
             if msg.type is aiohttp.WSMsgType.TEXT:
                 await self.received_message(msg.data)
@@ -652,18 +976,25 @@ class DiscordWebSocket:
                 _log.info("Websocket closed with %s, cannot reconnect.", code)
                 raise ConnectionClosed(self.socket, shard_id=self.shard_id, code=code) from None
 
+    async def _send_frame(self, data, /) -> None:
+        if type(data) is bytes:
+            await self.socket.send_bytes(data)
+        else:
+            await self.socket.send_str(data)
+
     async def debug_send(self, data, /) -> None:
         await self._rate_limiter.block()
         self._dispatch("socket_raw_send", data)
-        await self.socket.send_str(data)
+        await self._send_frame(data)
 
     async def send(self, data, /) -> None:
         await self._rate_limiter.block()
-        await self.socket.send_str(data)
+        await self._send_frame(data)
 
     async def send_as_json(self, data) -> None:
+        # encoded with the encoding of the connection, JSON or ETF
         try:
-            await self.send(utils._to_json(data))
+            await self.send(self._encode(data))
         except RuntimeError as exc:
             if not self._can_handle_close():
                 raise ConnectionClosed(self.socket, shard_id=self.shard_id) from exc
@@ -671,7 +1002,7 @@ class DiscordWebSocket:
     async def send_heartbeat(self, data: Heartbeat) -> None:
         # This bypasses the rate limit handling code since it has a higher priority
         try:
-            await self.socket.send_str(utils._to_json(data))
+            await self._send_frame(self._encode(data))
         except RuntimeError as exc:
             if not self._can_handle_close():
                 raise ConnectionClosed(self.socket, shard_id=self.shard_id) from exc
@@ -691,7 +1022,7 @@ class DiscordWebSocket:
 
         payload = {"op": self.PRESENCE, "d": {"activities": activities, "afk": False, "since": since, "status": status}}
 
-        sent = utils._to_json(payload)
+        sent = self._encode(payload)
         _log.debug('Sending "%s" to change status', sent)
         await self.send(sent)
 
@@ -24,13 +24,16 @@ DEALINGS IN THE SOFTWARE.
 
 from __future__ import annotations
 
+from collections import OrderedDict
 import copy
+import time
 import unicodedata
 from typing import (
     Any,
     ClassVar,
     Dict,
     List,
+    MutableMapping,
     NamedTuple,
     Sequence,
     Set,
@@ -274,6 +277,7 @@ class Guild(Hashable):
         "preferred_locale",
         "nsfw_level",
         "_members",
+        "_member_activity",
         "_channels",
         "_icon",
         "_banner",
@@ -304,7 +308,11 @@ class Guild(Hashable):
 
     def __init__(self, *, data: GuildPayload, state: ConnectionState):
         self._channels: Dict[int, GuildChannel] = {}
-        self._members: Dict[int, Member] = {}
+        self._members: MutableMapping[int, Member] = state._create_cache("members", self)
+        # member ID -> last activity, oldest first, only tracked if member_cache_timeout is set
+        self._member_activity: Optional[OrderedDict[int, float]] = (
+            OrderedDict() if state.member_cache_timeout is not None else None
+        )
         self._voice_states: Dict[int, VoiceState] = {}
         self._threads: Dict[int, Thread] = {}
         self._state: ConnectionState = state
@@ -321,6 +329,38 @@ class Guild(Hashable):
 
     def _add_member(self, member: Member, /) -> None:
         self._members[member.id] = member
+        if self._member_activity is not None:
+            self._touch_member(member.id)
+
+    def _touch_member(self, member_id: int, /) -> None:
+        activity = self._member_activity
+        if activity is not None:
+            activity[member_id] = time.monotonic()
+            activity.move_to_end(member_id)
+
+    def _evict_inactive_members(self, cutoff: float, /) -> int:
+        activity = self._member_activity
+        if activity is None:
+            return 0
+
+        self_id = self._state.self_id
+        now = time.monotonic()
+        evicted = 0
+        while activity:
+            member_id, last_active = next(iter(activity.items()))
+            if last_active >= cutoff:
+                break
+
+            del activity[member_id]
+            if member_id == self_id or member_id in self._voice_states:
+                # members in voice are active by definition
+                activity[member_id] = now
+                continue
+
+            if self._members.pop(member_id, None) is not None:
+                evicted += 1
+
+        return evicted
 
     def _store_thread(self, payload: ThreadPayload, /) -> Thread:
         thread = Thread(guild=self, state=self._state, data=payload)
@@ -329,6 +369,8 @@ class Guild(Hashable):
 
     def _remove_member(self, member: Snowflake, /) -> None:
         self._members.pop(member.id, None)
+        if self._member_activity is not None:
+            self._member_activity.pop(member.id, None)
 
     def _add_thread(self, thread: Thread, /) -> None:
         self._threads[thread.id] = thread
@@ -764,21 +806,21 @@ class Guild(Hashable):
 
         This works by checking if :attr:`Member.timeout_until` is not ``None``.
         """
-        return [member for member in self.members if member.timed_out]
+        return [member for member in self._members.values() if member.timed_out]
 
     @property
     def humans(self) -> List[Member]:
         """List[:class:`Member`]: A list of human members that belong to this guild.
 
         .. versionadded:: 2.0"""
-        return [member for member in self.members if not member.bot]
+        return [member for member in self._members.values() if not member.bot]
 
     @property
     def bots(self) -> List[Member]:
         """List[:class:`Member`]: A list of bots that belong to this guild.
 
         .. versionadded:: 2.0"""
-        return [member for member in self.members if member.bot]
+        return [member for member in self._members.values() if member.bot]
 
     def get_member(self, user_id: int, /) -> Optional[Member]:
         """Returns a member with the given ID.
@@ -798,7 +840,7 @@ class Guild(Hashable):
     @property
     def premium_subscribers(self) -> List[Member]:
         """List[:class:`Member`]: A list of members who have "boosted" this guild."""
-        return [member for member in self.members if member.premium_since is not None]
+        return [member for member in self._members.values() if member.premium_since is not None]
 
     @property
     def roles(self) -> List[Role]:
@@ -981,7 +1023,8 @@ class Guild(Hashable):
         """
 
         result = None
-        members = self.members
+        # a view rather than a list, so a backend can build members as they are checked
+        members = self._members.values()
         if len(name) > 5 and name[-5] == "#":
             # The 5 length is checking to see if #0000 is in the string,
             # as a#0000 has a length of 6, the minimum for a potential
@@ -1770,6 +1813,10 @@ class Guild(Hashable):
 
         Returns a member with the given ID. This uses the cache first, and if not found, it'll request using :meth:`fetch_member`.
 
+        If inactive members are evicted from the cache through the ``member_cache_timeout`` option of
+        :class:`Client` and :attr:`Intents.members` is enabled, then the member is requested through
+        :meth:`query_members` instead, which caches it again.
+
         .. note::
             This method might result in an API call.
 
@@ -1787,6 +1834,9 @@ class Guild(Hashable):
 
         if member:
             return member
+        elif self._member_activity is not None and self._state._intents.members:
+            members = await self.query_members(user_ids=[member_id], limit=1, cache=True)
+            return members[0] if members else None
         else:
             try:
                 return await self.fetch_member(member_id)
@@ -25,6 +25,8 @@ DEALINGS IN THE SOFTWARE.
 from __future__ import annotations
 
 import asyncio
+from collections import Counter
+import copy
 import json
 import logging
 import sys
@@ -39,12 +41,10 @@ from typing import (
     Sequence,
     TYPE_CHECKING,
     Tuple,
-    Type,
     TypeVar,
     Union,
 )
 from urllib.parse import quote as _uriquote
-import weakref
 
 import aiohttp
 
@@ -59,6 +59,7 @@ from .errors import (
     InvalidArgument,
 )
 from .gateway import DiscordClientWebSocketResponse
+from .ratelimits import RateLimitStore
 from . import __version__, utils
 from .utils import MISSING
 
@@ -66,6 +67,7 @@ _log = logging.getLogger(__name__)
 
 if TYPE_CHECKING:
     from .file import File
+    from .scheduler import RequestScheduler
     from .enums import (
         AuditLogAction,
         InteractionResponseType,
@@ -96,11 +98,7 @@ if TYPE_CHECKING:
     )
     from .types.snowflake import Snowflake, SnowflakeList
 
-    from types import TracebackType
-
     T = TypeVar("T")
-    BE = TypeVar("BE", bound=BaseException)
-    MU = TypeVar("MU", bound="MaybeUnlock")
     Response = Coroutine[Any, Any, T]
 
 
@@ -134,30 +132,18 @@ class Route:
         self.webhook_token: Optional[str] = parameters.get("webhook_token")
 
     @property
-    def bucket(self) -> str:
-        # the bucket is just method + path w/ major parameters
-        return f"{self.channel_id}:{self.guild_id}:{self.path}"
-
-
-class MaybeUnlock:
-    def __init__(self, lock: asyncio.Lock) -> None:
-        self.lock: asyncio.Lock = lock
-        self._unlock: bool = True
-
-    def __enter__(self: MU) -> MU:
-        return self
+    def key(self) -> str:
+        # Discord assigns a rate limit bucket to each method + path
+        return f"{self.method} {self.path}"
 
-    def defer(self) -> None:
-        self._unlock = False
+    @property
+    def major_parameters(self) -> str:
+        return f"{self.channel_id}:{self.guild_id}:{self.webhook_id}:{self.webhook_token}"
 
-    def __exit__(
-        self,
-        exc_type: Optional[Type[BE]],
-        exc: Optional[BE],
-        traceback: Optional[TracebackType],
-    ) -> None:
-        if self._unlock:
-            self.lock.release()
+    @property
+    def bucket(self) -> str:
+        # the bucket until Discord tells which one the route is in, method + path w/ major parameters
+        return f"{self.key}:{self.major_parameters}"
 
 
 # For some reason, the Discord voice websocket expects this header to be
@@ -176,18 +162,29 @@ class HTTPClient:
         proxy_auth: Optional[aiohttp.BasicAuth] = None,
         loop: Optional[asyncio.AbstractEventLoop] = None,
         unsync_clock: bool = True,
+        api_url: Optional[str] = None,
+        gateway_url: Optional[str] = None,
+        scheduler: Optional[RequestScheduler] = None,
+        rate_limit_store: Optional[RateLimitStore] = None,
+        coalesce_requests: bool = False,
     ) -> None:
         self.loop: asyncio.AbstractEventLoop = asyncio.get_event_loop() if loop is None else loop
         self.connector = connector
         self.__session: aiohttp.ClientSession = MISSING  # filled in static_login
-        self._locks: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
-        self._global_over: asyncio.Event = asyncio.Event()
-        self._global_over.set()
+        self.rate_limit_store: RateLimitStore = rate_limit_store or RateLimitStore()
         self.token: Optional[str] = None
         self.bot_token: bool = False
         self.proxy: Optional[str] = proxy
         self.proxy_auth: Optional[aiohttp.BasicAuth] = proxy_auth
         self.use_clock: bool = not unsync_clock
+        # overrides for talking to something other than Discord, such as discord.fake_gateway
+        self.api_url: Optional[str] = api_url.rstrip("/") if api_url is not None else None
+        self.gateway_url: Optional[str] = gateway_url
+        self.scheduler: Optional[RequestScheduler] = scheduler
+        self.coalesce_requests: bool = coalesce_requests
+        # route key -> number of GET requests answered by one already in flight
+        self.coalesced: Counter[str] = Counter()
+        self._inflight: Dict[Tuple[str, Tuple[Tuple[str, str], ...]], Tuple[asyncio.Task[Any], List[int]]] = {}
 
         u_agent = "DiscordBot (https://github.com/iDevision/enhanced-discord.py {0}) Python/{1[0]}.{1[1]} aiohttp/{2}"
         self.user_agent: str = u_agent.format(__version__, sys.version_info, aiohttp.__version__)
@@ -213,6 +210,12 @@ class HTTPClient:
 
         return await self.__session.ws_connect(url, **kwargs)
 
+    async def _get_bucket(self, route: Route) -> str:
+        bucket_hash = await self.rate_limit_store.get_bucket_hash(route.key)
+        if bucket_hash is None:
+            return route.bucket
+        return f"{bucket_hash}:{route.major_parameters}"
+
     async def request(
         self,
         route: Route,
@@ -221,15 +224,50 @@ class HTTPClient:
         form: Optional[Iterable[Dict[str, Any]]] = None,
         **kwargs: Any,
     ) -> Any:
-        bucket = route.bucket
+        if not self.coalesce_requests or route.method != "GET" or files or form or kwargs.keys() - {"params"}:
+            return await self._request(route, files=files, form=form, **kwargs)
+
+        # identical GET requests in flight share a single response
+        params = kwargs.get("params") or {}
+        key = (route.url, tuple(sorted((k, str(v)) for k, v in params.items())))
+        try:
+            task, callers = self._inflight[key]
+        except KeyError:
+            task = self.loop.create_task(self._request(route, **kwargs))
+            callers = [1]
+            self._inflight[key] = (task, callers)
+            task.add_done_callback(lambda t: self._end_inflight(key, t))
+        else:
+            callers[0] += 1
+            self.coalesced[route.key] += 1
+
+        # shielded so that a cancelled caller does not cancel the request of the others
+        data = await asyncio.shield(task)
+        if callers[0] > 1:
+            # callers are free to modify what they get back
+            return copy.deepcopy(data)
+        return data
+
+    def _end_inflight(self, key: Tuple[str, Tuple[Tuple[str, str], ...]], task: asyncio.Task[Any]) -> None:
+        del self._inflight[key]
+        if not task.cancelled():
+            # retrieved here in case every caller was cancelled
+            task.exception()
+
+    async def _request(
+        self,
+        route: Route,
+        *,
+        files: Optional[Sequence[File]] = None,
+        form: Optional[Iterable[Dict[str, Any]]] = None,
+        **kwargs: Any,
+    ) -> Any:
+        store = self.rate_limit_store
+        bucket = await self._get_bucket(route)
         method = route.method
         url = route.url
-
-        lock = self._locks.get(bucket)
-        if lock is None:
-            lock = asyncio.Lock()
-            if bucket is not None:
-                self._locks[bucket] = lock
+        if self.api_url is not None:
+            url = self.api_url + url[len(Route.BASE) :]
 
         # header creation
         headers: Dict[str, str] = {
@@ -259,14 +297,26 @@ class HTTPClient:
         if self.proxy_auth is not None:
             kwargs["proxy_auth"] = self.proxy_auth
 
-        if not self._global_over.is_set():
-            # wait until the global lock is complete
-            await self._global_over.wait()
+        # wait until the global rate limit is over, if it was hit
+        await store.wait_global()
 
         response: Optional[aiohttp.ClientResponse] = None
         data: Optional[Union[Dict[str, Any], str]] = None
-        await lock.acquire()
-        with MaybeUnlock(lock) as maybe_lock:
+        held = False
+        token: Any = None
+        try:
+            while True:
+                token = await store.acquire(bucket)
+                held = True
+                current = await self._get_bucket(route)
+                if bucket == current:
+                    break
+
+                # the bucket of the route was learned while waiting, move to its limits
+                held = False
+                await store.release(bucket, token)
+                bucket = current
+
             for tries in range(5):
                 if files:
                     for f in files:
@@ -279,6 +329,9 @@ class HTTPClient:
 
                     kwargs["data"] = form_data
 
+                if self.scheduler is not None:
+                    await self.scheduler.acquire(route.guild_id or route.channel_id or route.webhook_id)
+
                 try:
                     async with self.__session.request(method, url, **kwargs) as response:
                         _log.debug("%s %s with %s has returned %s", method, url, kwargs.get("data"), response.status)
@@ -286,14 +339,14 @@ class HTTPClient:
                         # even errors have text involved in them so this is safe to call
                         data = await json_or_text(response)
 
+                        bucket_hash = response.headers.get("X-Ratelimit-Bucket")
+                        if bucket_hash is not None and await store.get_bucket_hash(route.key) != bucket_hash:
+                            learned = f"{bucket_hash}:{route.major_parameters}"
+                            _log.debug("Route %s is in the rate limit bucket %s.", route.key, bucket_hash)
+                            await store.set_bucket_hash(route.key, bucket_hash, bucket=learned, previous=bucket)
+
                         # check if we have rate limit header information
-                        remaining = response.headers.get("X-Ratelimit-Remaining")
-                        if remaining == "0" and response.status != 429:
-                            # we've depleted our current bucket
-                            delta = utils._parse_ratelimit_header(response, use_clock=self.use_clock)
-                            _log.debug("A rate limit bucket has been exhausted (bucket: %s, retry: %s).", bucket, delta)
-                            maybe_lock.defer()
-                            self.loop.call_later(delta, lock.release)
+                        await self._update_ratelimit(bucket, token, response)
 
                         # the request was successful so just return the text/json
                         if 300 > response.status >= 200:
@@ -313,20 +366,12 @@ class HTTPClient:
                             _log.warning(fmt, retry_after, bucket)
 
                             # check if it's a global rate limit
-                            is_global = data.get("global", False)
-                            if is_global:
+                            if data.get("global", False):
                                 _log.warning("Global rate limit has been hit. Retrying in %.2f seconds.", retry_after)
-                                self._global_over.clear()
+                                await store.set_global(retry_after)
 
                             await asyncio.sleep(retry_after)
                             _log.debug("Done sleeping for the rate limit. Retrying...")
-
-                            # release the global lock now that the
-                            # global rate limit has passed
-                            if is_global:
-                                self._global_over.set()
-                                _log.debug("Global rate limit is now over.")
-
                             continue
 
                         # we've received a 500, 502, or 504, unconditional retry
@@ -351,6 +396,9 @@ class HTTPClient:
                         await asyncio.sleep(1 + tries * 2)
                         continue
                     raise
+                finally:
+                    if self.scheduler is not None:
+                        self.scheduler.release()
 
             if response is not None:
                 # We've run out of retries, raise.
@@ -360,6 +408,23 @@ class HTTPClient:
                 raise HTTPException(response, data)
 
             raise RuntimeError("Unreachable code in HTTP handling")
+        finally:
+            if held:
+                await store.release(bucket, token)
+
+    async def _update_ratelimit(self, bucket: str, token: Any, response: aiohttp.ClientResponse) -> None:
+        headers = response.headers
+        try:
+            limit = int(headers["X-Ratelimit-Limit"])
+            remaining = int(headers["X-Ratelimit-Remaining"])
+            reset = float(headers["X-Ratelimit-Reset"])
+        except (KeyError, ValueError):
+            return
+
+        reset_after = utils._parse_ratelimit_header(response, use_clock=self.use_clock)
+        if remaining == 0 and response.status != 429:
+            _log.debug("A rate limit bucket has been exhausted (bucket: %s, retry: %s).", bucket, reset_after)
+        await self.rate_limit_store.update(bucket, limit, remaining, reset, reset_after, token=token)
 
     async def get_from_cdn(self, url: str) -> bytes:
         async with self.__session.get(url) as resp:
@@ -377,6 +442,7 @@ class HTTPClient:
     async def close(self) -> None:
         if self.__session:
             await self.__session.close()
+        await self.rate_limit_store.close()
 
     # login management
 
@@ -1929,28 +1995,38 @@ class HTTPClient:
     def application_info(self) -> Response[appinfo.AppInfo]:
         return self.request(Route("GET", "/oauth2/applications/@me"))
 
-    async def get_gateway(self, *, encoding: str = "json", zlib: bool = True) -> str:
-        try:
-            data = await self.request(Route("GET", "/gateway"))
-        except HTTPException as exc:
-            raise GatewayNotFound() from exc
-        if zlib:
-            value = "{0}?encoding={1}&v=9&compress=zlib-stream"
+    async def get_gateway(
+        self, *, encoding: str = "json", zlib: bool = True, compress: Optional[str] = "zlib-stream"
+    ) -> str:
+        if self.gateway_url is not None:
+            url = self.gateway_url
+        else:
+            try:
+                data = await self.request(Route("GET", "/gateway"))
+            except HTTPException as exc:
+                raise GatewayNotFound() from exc
+            url = data["url"]
+
+        if zlib and compress:
+            value = "{0}?encoding={1}&v=9&compress={2}"
         else:
             value = "{0}?encoding={1}&v=9"
-        return value.format(data["url"], encoding)
+        return value.format(url, encoding, compress)
 
-    async def get_bot_gateway(self, *, encoding: str = "json", zlib: bool = True) -> Tuple[int, str]:
+    async def get_bot_gateway(
+        self, *, encoding: str = "json", zlib: bool = True, compress: Optional[str] = "zlib-stream"
+    ) -> Tuple[int, str, int]:
         try:
             data = await self.request(Route("GET", "/gateway/bot"))
         except HTTPException as exc:
             raise GatewayNotFound() from exc
 
-        if zlib:
-            value = "{0}?encoding={1}&v=9&compress=zlib-stream"
+        if zlib and compress:
+            value = "{0}?encoding={1}&v=9&compress={2}"
         else:
             value = "{0}?encoding={1}&v=9"
-        return data["shards"], value.format(data["url"], encoding)
+        max_concurrency = data.get("session_start_limit", {}).get("max_concurrency", 1)
+        return data["shards"], value.format(self.gateway_url or data["url"], encoding, compress), max_concurrency
 
     def get_user(self, user_id: Snowflake) -> Response[user.User]:
         return self.request(Route("GET", "/users/{user_id}", user_id=user_id))
@@ -377,6 +377,21 @@ class Member(discord.abc.Messageable, _UserTag):
         self._user = member._user
         return self
 
+    def _to_member_json(self) -> MemberWithUserPayload:
+        joined_at = self.joined_at
+        premium_since = self.premium_since
+        timeout_until = self.timeout_until
+        return {
+            "user": self._user._to_user_json(),  # type: ignore
+            "roles": [str(role_id) for role_id in self._roles],
+            "joined_at": joined_at.isoformat() if joined_at is not None else None,  # type: ignore
+            "premium_since": premium_since.isoformat() if premium_since is not None else None,
+            "nick": self.nick,
+            "pending": self.pending,
+            "avatar": self._avatar,
+            "communication_disabled_until": timeout_until.isoformat() if timeout_until is not None else None,
+        }
+
     async def _get_channel(self):
         ch = await self.create_dm()
         return ch
@@ -0,0 +1,583 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015-present Rapptz
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import Counter, deque
+import itertools
+import logging
+import os
+from typing import TYPE_CHECKING, Any, Callable, Deque, Dict, List, Optional, Set, Tuple, Type, TypeVar
+
+if TYPE_CHECKING:
+    from types import TracebackType
+
+    BE = TypeVar("BE", bound=BaseException)
+    RL = TypeVar("RL", bound="Ratelimit")
+
+__all__ = (
+    "RateLimitStore",
+    "SocketRateLimitStore",
+    "RateLimitCoordinator",
+)
+
+_log = logging.getLogger(__name__)
+
+# the token of requests let through in memory while the coordinator was unreachable
+_LOCAL: Any = object()
+
+
+class Ratelimit:
+    """The rate limit of a bucket, letting through as many requests at once as it has left.
+
+    Until the bucket has answered with its limits, requests go one at a time.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, on_idle: Optional[Callable[[Ratelimit], None]] = None) -> None:
+        self.loop: asyncio.AbstractEventLoop = loop
+        self.limit: int = 1
+        self.remaining: int = 1
+        self.outgoing: int = 0
+        # the X-Ratelimit-Reset of the window the remaining count is from
+        self.reset: float = 0.0
+        # the keys the rate limit is stored under
+        self.keys: Set[str] = set()
+        self._on_idle: Optional[Callable[[Ratelimit], None]] = on_idle
+        self._reset_handle: Optional[asyncio.TimerHandle] = None
+        self._waiters: Deque[asyncio.Future] = deque()
+
+    def __enter__(self: RL) -> RL:
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BE]],
+        exc: Optional[BE],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.release()
+
+    def is_idle(self) -> bool:
+        return not self.outgoing and not self._waiters and self._reset_handle is None
+
+    async def acquire(self) -> None:
+        if self.outgoing < self.remaining and not self._waiters:
+            self.outgoing += 1
+            return
+
+        future = self.loop.create_future()
+        self._waiters.append(future)
+        try:
+            # the request is counted as outgoing when woken up
+            await future
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                self.release()
+            elif future in self._waiters:
+                # otherwise it was already skipped by _wake
+                self._waiters.remove(future)
+            raise
+
+    def release(self) -> None:
+        self.outgoing -= 1
+        self._wake()
+
+    def _wake(self) -> None:
+        while self._waiters and self.outgoing < self.remaining:
+            future = self._waiters.popleft()
+            if not future.done():
+                self.outgoing += 1
+                future.set_result(None)
+
+        if self._on_idle is not None and self.is_idle():
+            self._on_idle(self)
+
+    def _reset(self) -> None:
+        self._reset_handle = None
+        self.remaining = self.limit
+        self._wake()
+
+    def update(self, limit: int, remaining: int, reset: float, reset_after: float) -> None:
+        if reset < self.reset:
+            # a late response from a previous window
+            return
+
+        self.limit = limit
+        if reset > self.reset:
+            self.reset = reset
+            self.remaining = remaining
+        else:
+            # responses of a window arrive in any order, the lowest count is the latest
+            self.remaining = min(self.remaining, remaining)
+
+        if self.remaining == 0 and self._reset_handle is None:
+            self._reset_handle = self.loop.call_later(reset_after, self._reset)
+
+
+class RateLimitStore:
+    """The base class for where an HTTP client keeps its rate limit state.
+
+    This is the route to rate limit bucket mapping learned from Discord, the requests left
+    and in flight in each bucket, and whether the global rate limit was hit. When passed to
+    the ``rate_limit_store`` parameter of :class:`Client`, the client's HTTP requests wait
+    on the store before being sent and report the limits Discord answers with back to it.
+
+    The default implementation keeps the state in memory, which is only coherent within a
+    single process. Processes sharing a bot token, such as clusters, workers and scripts,
+    can share their state through a :class:`SocketRateLimitStore` instead.
+
+    .. versionadded:: 2.0
+    """
+
+    def __init__(self) -> None:
+        # Route.key -> X-RateLimit-Bucket hash, routes sharing a hash share their rate limits
+        self._bucket_hashes: Dict[str, str] = {}
+        self._ratelimits: Dict[str, Ratelimit] = {}
+        self._global_over: asyncio.Event = asyncio.Event()
+        self._global_over.set()
+        self._global_handle: Optional[asyncio.TimerHandle] = None
+
+    def _get_ratelimit(self, bucket: str) -> Ratelimit:
+        try:
+            return self._ratelimits[bucket]
+        except KeyError:
+            ratelimit = self._ratelimits[bucket] = Ratelimit(asyncio.get_running_loop(), self._discard)
+            ratelimit.keys.add(bucket)
+            return ratelimit
+
+    def _discard(self, ratelimit: Ratelimit) -> None:
+        # an idle bucket knows nothing worth keeping, it starts over at one request at a time
+        for key in ratelimit.keys:
+            if self._ratelimits.get(key) is ratelimit:
+                del self._ratelimits[key]
+        ratelimit.keys.clear()
+
+    async def get_bucket_hash(self, key: str) -> Optional[str]:
+        """|coro|
+
+        Returns the bucket hash learned for a route, or ``None`` if it is not known yet.
+
+        Parameters
+        -----------
+        key: :class:`str`
+            The method and path of the route, such as ``'POST /channels/{channel_id}/messages'``.
+        """
+        return self._bucket_hashes.get(key)
+
+    async def set_bucket_hash(self, key: str, bucket_hash: str, *, bucket: str, previous: str) -> None:
+        """|coro|
+
+        Stores the bucket hash of a route.
+
+        Parameters
+        -----------
+        key: :class:`str`
+            The method and path of the route.
+        bucket_hash: :class:`str`
+            The ``X-RateLimit-Bucket`` Discord answered with.
+        bucket: :class:`str`
+            The bucket the route's requests are now limited under.
+        previous: :class:`str`
+            The bucket the route's requests were limited under until now. Its state
+            should carry over to ``bucket`` if that one is not known yet.
+        """
+        self._bucket_hashes[key] = bucket_hash
+        ratelimit = self._ratelimits.get(previous)
+        if ratelimit is not None and bucket not in self._ratelimits:
+            self._ratelimits[bucket] = ratelimit
+            ratelimit.keys.add(bucket)
+
+    async def acquire(self, bucket: str) -> Any:
+        """|coro|
+
+        Waits until a request can be sent in a bucket and counts it as in flight.
+
+        Parameters
+        -----------
+        bucket: :class:`str`
+            The bucket of the request.
+
+        Returns
+        --------
+        Any
+            A token for the request, passed back to :meth:`release` and :meth:`update`
+            so they apply to wherever the request was counted.
+        """
+        await self._get_ratelimit(bucket).acquire()
+
+    async def release(self, bucket: str, token: Any = None) -> None:
+        """|coro|
+
+        Marks a request acquired with :meth:`acquire` as no longer in flight.
+
+        Parameters
+        -----------
+        bucket: :class:`str`
+            The bucket of the request.
+        token: Any
+            The token :meth:`acquire` returned for the request.
+        """
+        ratelimit = self._ratelimits.get(bucket)
+        if ratelimit is not None:
+            ratelimit.release()
+
+    async def update(
+        self, bucket: str, limit: int, remaining: int, reset: float, reset_after: float, *, token: Any = None
+    ) -> None:
+        """|coro|
+
+        Updates a bucket with the rate limit headers of a response.
+
+        Parameters
+        -----------
+        bucket: :class:`str`
+            The bucket of the request.
+        limit: :class:`int`
+            The ``X-RateLimit-Limit`` header.
+        remaining: :class:`int`
+            The ``X-RateLimit-Remaining`` header.
+        reset: :class:`float`
+            The ``X-RateLimit-Reset`` header, identifying the rate limit window.
+        reset_after: :class:`float`
+            The number of seconds until the bucket resets.
+        token: Any
+            The token :meth:`acquire` returned for the request.
+        """
+        ratelimit = self._ratelimits.get(bucket)
+        if ratelimit is not None:
+            ratelimit.update(limit, remaining, reset, reset_after)
+
+    async def wait_global(self) -> None:
+        """|coro|
+
+        Waits until the global rate limit is over, if it was hit.
+        """
+        await self._global_over.wait()
+
+    async def set_global(self, retry_after: float) -> None:
+        """|coro|
+
+        Records that the global rate limit was hit.
+
+        Parameters
+        -----------
+        retry_after: :class:`float`
+            The number of seconds until requests can be sent again.
+        """
+        loop = asyncio.get_running_loop()
+        handle = self._global_handle
+        if handle is not None:
+            if handle.when() >= loop.time() + retry_after:
+                return
+            handle.cancel()
+
+        self._global_over.clear()
+        self._global_handle = loop.call_later(retry_after, self._end_global)
+
+    def _end_global(self) -> None:
+        self._global_handle = None
+        self._global_over.set()
+        _log.debug("Global rate limit is now over.")
+
+    async def close(self) -> None:
+        """|coro|
+
+        Releases the resources of the store. This is called when the HTTP client is closed.
+        """
+        pass
+
+
+class SocketRateLimitStore(RateLimitStore):
+    """A :class:`RateLimitStore` that shares the rate limit state of several processes
+    through a :class:`RateLimitCoordinator` listening on a Unix socket.
+
+    The connection is made on the first request. If the coordinator cannot be reached,
+    the store falls back to keeping the state of the process in memory until it can.
+
+    .. versionadded:: 2.0
+
+    Parameters
+    -----------
+    path: :class:`str`
+        The path of the coordinator's Unix socket.
+    """
+
+    def __init__(self, path: str) -> None:
+        super().__init__()
+        self.path: str = path
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._read_task: Optional[asyncio.Task] = None
+        self._connecting: Optional[asyncio.Future] = None
+        self._retry_at: float = 0.0
+        self._nonces = itertools.count()
+        # nonce -> future of the reply, and the bucket of acquire requests
+        self._pending: Dict[int, Tuple[asyncio.Future, Optional[str]]] = {}
+
+    async def _connect(self) -> bool:
+        if self._writer is not None:
+            return True
+        if asyncio.get_running_loop().time() < self._retry_at:
+            return False
+
+        if self._connecting is None:
+            self._connecting = asyncio.ensure_future(self._open())
+        try:
+            return await asyncio.shield(self._connecting)
+        finally:
+            if self._connecting is not None and self._connecting.done():
+                self._connecting = None
+
+    async def _open(self) -> bool:
+        from .cluster import _read_frame
+
+        try:
+            reader, self._writer = await asyncio.open_unix_connection(self.path)
+        except OSError as exc:
+            _log.warning(
+                "Could not connect to the rate limit coordinator at %s (%s), limiting in memory.", self.path, exc
+            )
+            self._retry_at = asyncio.get_running_loop().time() + 5.0
+            return False
+
+        async def read_loop() -> None:
+            try:
+                while True:
+                    payload = await _read_frame(reader)
+                    future, bucket = self._pending.pop(payload["nonce"], (None, None))
+                    if future is None:
+                        continue
+                    if future.cancelled():
+                        if bucket is not None:
+                            # the request stopped waiting before being let through
+                            self._send({"op": "release", "bucket": bucket})
+                    else:
+                        future.set_result(payload.get("d"))
+            except (asyncio.IncompleteReadError, ConnectionError):
+                _log.warning("Lost the connection to the rate limit coordinator, limiting in memory.")
+            finally:
+                self._writer = None
+                for future, _ in self._pending.values():
+                    if not future.done():
+                        future.set_exception(ConnectionError("lost the connection to the rate limit coordinator"))
+                self._pending.clear()
+
+        self._read_task = asyncio.create_task(read_loop())
+        return True
+
+    def _send(self, payload: Dict[str, Any]) -> None:
+        from .cluster import _write_frame
+
+        if self._writer is not None:
+            _write_frame(self._writer, payload)
+
+    async def _call(self, payload: Dict[str, Any], bucket: Optional[str] = None) -> Any:
+        if self._writer is None:
+            raise ConnectionError("not connected to the rate limit coordinator")
+        payload["nonce"] = nonce = next(self._nonces)
+        future = asyncio.get_running_loop().create_future()
+        self._pending[nonce] = (future, bucket)
+        self._send(payload)
+        return await future
+
+    async def get_bucket_hash(self, key: str) -> Optional[str]:
+        bucket_hash = self._bucket_hashes.get(key)
+        if bucket_hash is None and await self._connect():
+            try:
+                bucket_hash = await self._call({"op": "get_bucket_hash", "key": key})
+            except ConnectionError:
+                return None
+            if bucket_hash is not None:
+                self._bucket_hashes[key] = bucket_hash
+        return bucket_hash
+
+    async def set_bucket_hash(self, key: str, bucket_hash: str, *, bucket: str, previous: str) -> None:
+        if await self._connect():
+            self._bucket_hashes[key] = bucket_hash
+            self._send(
+                {"op": "set_bucket_hash", "key": key, "hash": bucket_hash, "bucket": bucket, "previous": previous}
+            )
+        else:
+            await super().set_bucket_hash(key, bucket_hash, bucket=bucket, previous=previous)
+
+    async def acquire(self, bucket: str) -> Any:
+        writer = self._writer if await self._connect() else None
+        if writer is not None:
+            try:
+                await self._call({"op": "acquire", "bucket": bucket}, bucket)
+                # the request is held by the coordinator for this connection
+                return writer
+            except ConnectionError:
+                pass
+        await super().acquire(bucket)
+        return _LOCAL
+
+    async def release(self, bucket: str, token: Any = None) -> None:
+        if token is _LOCAL:
+            await super().release(bucket)
+        elif token is not None and token is self._writer:
+            self._send({"op": "release", "bucket": bucket})
+        # otherwise the coordinator released it when the connection it was held on was lost
+
+    async def update(
+        self, bucket: str, limit: int, remaining: int, reset: float, reset_after: float, *, token: Any = None
+    ) -> None:
+        if token is not _LOCAL:
+            self._send(
+                {
+                    "op": "update",
+                    "bucket": bucket,
+                    "limit": limit,
+                    "remaining": remaining,
+                    "reset": reset,
+                    "reset_after": reset_after,
+                }
+            )
+        else:
+            await super().update(bucket, limit, remaining, reset, reset_after)
+
+    async def wait_global(self) -> None:
+        if await self._connect():
+            try:
+                await self._call({"op": "wait_global"})
+                return
+            except ConnectionError:
+                pass
+        await super().wait_global()
+
+    async def set_global(self, retry_after: float) -> None:
+        if self._writer is not None:
+            self._send({"op": "set_global", "retry_after": retry_after})
+        else:
+            await super().set_global(retry_after)
+
+    async def close(self) -> None:
+        if self._read_task is not None:
+            self._read_task.cancel()
+            self._read_task = None
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+
+class RateLimitCoordinator:
+    """Holds the rate limit state of every process connected through a :class:`SocketRateLimitStore`.
+
+    It can run in any process on the host, such as a dedicated one or the one launching
+    the others. :class:`ClusterLauncher` runs one for its clusters. Requests in flight are
+    released when the process that sent them disconnects.
+
+    .. versionadded:: 2.0
+
+    Parameters
+    -----------
+    path: :class:`str`
+        The path of the Unix socket to listen on.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self.store: RateLimitStore = RateLimitStore()
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        """|coro|
+
+        Starts listening.
+        """
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._handle_connection, path=self.path)
+
+    async def close(self) -> None:
+        """|coro|
+
+        Stops listening and disconnects every process.
+        """
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        from .cluster import _read_frame, _write_frame
+
+        store = self.store
+        # the requests in flight of this process, released if it goes away
+        held: Counter[str] = Counter()
+        waiting: List[asyncio.Task] = []
+
+        async def acquire(payload: Dict[str, Any]) -> None:
+            bucket = payload["bucket"]
+            await store.acquire(bucket)
+            held[bucket] += 1
+            _write_frame(writer, {"nonce": payload["nonce"]})
+
+        async def wait_global(payload: Dict[str, Any]) -> None:
+            await store.wait_global()
+            _write_frame(writer, {"nonce": payload["nonce"]})
+
+        try:
+            while True:
+                payload = await _read_frame(reader)
+                op = payload["op"]
+                if op == "acquire":
+                    waiting.append(asyncio.create_task(acquire(payload)))
+                elif op == "release":
+                    bucket = payload["bucket"]
+                    if held[bucket] > 0:
+                        held[bucket] -= 1
+                        await store.release(bucket)
+                elif op == "update":
+                    await store.update(
+                        payload["bucket"],
+                        payload["limit"],
+                        payload["remaining"],
+                        payload["reset"],
+                        payload["reset_after"],
+                    )
+                elif op == "get_bucket_hash":
+                    _write_frame(writer, {"nonce": payload["nonce"], "d": await store.get_bucket_hash(payload["key"])})
+                elif op == "set_bucket_hash":
+                    await store.set_bucket_hash(
+                        payload["key"], payload["hash"], bucket=payload["bucket"], previous=payload["previous"]
+                    )
+                elif op == "wait_global":
+                    waiting.append(asyncio.create_task(wait_global(payload)))
+                elif op == "set_global":
+                    await store.set_global(payload["retry_after"])
+
+                if len(waiting) > 64:
+                    waiting = [task for task in waiting if not task.done()]
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            for task in waiting:
+                task.cancel()
+            for bucket, count in held.items():
+                for _ in range(count):
+                    await store.release(bucket)
+            writer.close()
@@ -0,0 +1,313 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015-present Rapptz
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+
+from __future__ import annotations
+
+import asyncio
+import gzip
+import logging
+import queue
+import struct
+import threading
+import time
+import tracemalloc
+from typing import Any, Iterator, List, NamedTuple, Optional, Tuple, Union
+
+from . import utils
+from .etf import _from_etf
+from .flags import Intents
+from .http import HTTPClient
+
+__all__ = (
+    "GatewayRecorder",
+    "ReplayResult",
+    "replay_recording",
+)
+
+_log = logging.getLogger(__name__)
+
+_MAGIC = b"DPYR\x01"
+# seconds since the recording started, shard ID (-1 for none), whether the payload is ETF and payload length
+_RECORD = struct.Struct("<di?I")
+
+
+class GatewayRecorder:
+    """Records the gateway payloads received by a client to a file.
+
+    When passed to the ``gateway_recorder`` parameter of :class:`Client`, every payload
+    received from the gateway is written after decompression, along with the time it was
+    received and the ID of the shard that received it. The file is gzip compressed.
+
+    Payloads are buffered and handed to a writer thread, so compressing and writing
+    the file does not block the event loop.
+
+    Recordings can be fed back into the library without a connection with
+    :func:`replay_recording`, or from the command line with ``python -m discord replay``.
+
+    .. warning::
+
+        Recordings contain everything the bot received, including message content
+        and the session IDs needed to resume the recorded sessions.
+
+    .. versionadded:: 2.0
+
+    Parameters
+    -----------
+    path: :class:`str`
+        The file to write the recording to. An existing file is overwritten.
+    """
+
+    # the buffer is handed to the writer once it holds this many bytes or is this many seconds old
+    _FLUSH_SIZE = 256 * 1024
+    _FLUSH_INTERVAL = 1.0
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self._start: float = 0.0
+        self._buffer: List[bytes] = []
+        self._buffered: int = 0
+        self._flushed_at: float = 0.0
+        self._chunks: queue.SimpleQueue[Optional[bytes]] = queue.SimpleQueue()
+        self._writer: Optional[threading.Thread] = None
+        self.count: int = 0
+
+    def _start_writer(self) -> None:
+        self._start = self._flushed_at = time.perf_counter()
+        self._writer = threading.Thread(target=self._write, name=f"discord.py: recorder {self.path}", daemon=True)
+        self._writer.start()
+
+    def _write(self) -> None:
+        # runs in the writer thread
+        try:
+            with gzip.open(self.path, "wb", compresslevel=6) as fp:
+                fp.write(_MAGIC)
+                while True:
+                    chunk = self._chunks.get()
+                    if chunk is None:
+                        return
+                    fp.write(chunk)
+        except OSError:
+            _log.exception("Failed to write the gateway recording to %s.", self.path)
+
+    def _flush(self) -> None:
+        if self._buffer:
+            self._chunks.put(b"".join(self._buffer))
+            self._buffer.clear()
+            self._buffered = 0
+        self._flushed_at = time.perf_counter()
+
+    def record(self, shard_id: Optional[int], payload: Union[str, bytes]) -> None:
+        """Writes a payload to the recording.
+
+        This is called by the library for every payload received.
+
+        Parameters
+        -----------
+        shard_id: Optional[:class:`int`]
+            The ID of the shard that received the payload.
+        payload: Union[:class:`str`, :class:`bytes`]
+            The decompressed payload, :class:`bytes` if the gateway encoding is ETF.
+        """
+        if self._writer is None:
+            self._start_writer()
+
+        etf = type(payload) is bytes
+        data = payload if etf else payload.encode("utf-8")  # type: ignore
+        now = time.perf_counter()
+        buffer = self._buffer
+        buffer.append(_RECORD.pack(now - self._start, -1 if shard_id is None else shard_id, etf, len(data)))
+        buffer.append(data)
+        self._buffered += _RECORD.size + len(data)
+        self.count += 1
+        if self._buffered >= self._FLUSH_SIZE or now - self._flushed_at >= self._FLUSH_INTERVAL:
+            self._flush()
+
+    def close(self) -> None:
+        """Flushes and closes the recording. This is called when the client is closed.
+
+        This waits for the writer thread to finish writing the file.
+        """
+        if self._writer is not None:
+            self._flush()
+            self._chunks.put(None)
+            self._writer.join()
+            self._writer = None
+
+
+def _read_recording(path: str) -> Iterator[Tuple[float, Optional[int], Union[str, bytes]]]:
+    with gzip.open(path, "rb") as fp:
+        if fp.read(len(_MAGIC)) != _MAGIC:
+            raise ValueError(f"{path!r} is not a gateway recording")
+
+        size = _RECORD.size
+        while True:
+            header = fp.read(size)
+            if len(header) < size:
+                return
+            timestamp, shard_id, etf, length = _RECORD.unpack(header)
+            data = fp.read(length)
+            yield timestamp, None if shard_id == -1 else shard_id, data if etf else data.decode("utf-8")
+
+
+class ReplayResult(NamedTuple):
+    """Represents the outcome of :func:`replay_recording`.
+
+    .. versionadded:: 2.0
+
+    Attributes
+    -----------
+    events: :class:`int`
+        The number of events fed to the parsers.
+    duration: :class:`float`
+        How long the replay took, in seconds.
+    events_per_second: :class:`float`
+        The number of events parsed per second.
+    peak_memory: Optional[:class:`int`]
+        The peak memory allocated during the replay in bytes, if ``trace_memory`` was set.
+    """
+
+    events: int
+    duration: float
+    events_per_second: float
+    peak_memory: Optional[int]
+
+
+class _ReplayHTTPClient(HTTPClient):
+    async def request(self, route, **kwargs: Any) -> Any:
+        raise RuntimeError(f"Cannot make HTTP requests while replaying a recording ({route.method} {route.path})")
+
+
+class _ReplayWebSocket:
+    # stands in for DiscordWebSocket for the few parsers that use it
+    async def request_chunks(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    async def voice_state(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+    async def change_presence(self, *args: Any, **kwargs: Any) -> None:
+        pass
+
+
+async def replay_recording(
+    path: str,
+    *,
+    speed: Optional[float] = None,
+    trace_memory: bool = False,
+    intents: Optional[Intents] = None,
+    **options: Any,
+) -> ReplayResult:
+    """|coro|
+
+    Feeds a recording made by :class:`GatewayRecorder` into the library's event
+    parsers, without a connection to Discord. This is mainly useful to benchmark parsing.
+
+    Events are parsed as if they were received from the gateway, filling the cache,
+    but nothing is dispatched and HTTP requests raise :exc:`RuntimeError`.
+
+    .. versionadded:: 2.0
+
+    Parameters
+    -----------
+    path: :class:`str`
+        The recording to replay.
+    speed: Optional[:class:`float`]
+        The speed to replay the recording at relative to how it was recorded,
+        e.g. ``1.0`` for the recorded speed. Defaults to ``None``, which replays it
+        as fast as possible.
+    trace_memory: :class:`bool`
+        Whether to measure the peak memory allocated during the replay. This
+        slows the replay down considerably. Defaults to ``False``.
+    intents: Optional[:class:`Intents`]
+        The intents to create the state with. Defaults to :meth:`Intents.all`.
+    \\*\\*options
+        The options to create the state with, as would be passed to :class:`Client`.
+
+    Returns
+    --------
+    :class:`ReplayResult`
+        The number of events replayed and how fast they were parsed.
+    """
+    from .state import ConnectionState
+
+    loop = asyncio.get_running_loop()
+    options.setdefault("chunk_guilds_at_startup", False)
+    options.setdefault("guild_ready_timeout", 0.0)
+    state = ConnectionState(
+        dispatch=lambda *args, **kwargs: None,
+        handlers={},
+        hooks={},
+        http=_ReplayHTTPClient(loop=loop),
+        loop=loop,
+        intents=intents or Intents.all(),
+        **options,
+    )
+    ws = _ReplayWebSocket()
+    state._get_websocket = lambda *args, **kwargs: ws  # type: ignore
+    state._get_client = lambda: None  # type: ignore
+
+    parsers = state.parsers
+    if trace_memory:
+        tracemalloc.start()
+
+    events = 0
+    start = time.perf_counter()
+    try:
+        for timestamp, shard_id, payload in _read_recording(path):
+            if speed is not None:
+                delay = timestamp / speed - (time.perf_counter() - start)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+
+            msg = _from_etf(payload) if type(payload) is bytes else utils._from_json(payload)  # type: ignore
+            if msg.get("op") != 0:
+                continue
+
+            event = msg["t"]
+            data = msg["d"]
+            if event in ("READY", "RESUMED"):
+                data["__shard_id__"] = shard_id
+
+            try:
+                func = parsers[event]
+            except KeyError:
+                continue
+
+            func(data)
+            events += 1
+            if not events % 1000:
+                # let tasks started by the parsers run
+                await asyncio.sleep(0)
+
+        duration = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else None
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+
+    if state._ready_task is not None:
+        state._ready_task.cancel()
+
+    return ReplayResult(events, duration, events / duration if duration else 0.0, peak)
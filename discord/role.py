@@ -341,12 +341,11 @@ class Role(Hashable):
     @property
     def members(self) -> List[Member]:
         """List[:class:`Member`]: Returns all the members with this role."""
-        all_members = self.guild.members
         if self.is_default():
-            return all_members
+            return self.guild.members
 
         role_id = self.id
-        return [member for member in all_members if member._roles.has(role_id)]
+        return [member for member in self.guild._members.values() if member._roles.has(role_id)]
 
     async def _move(self, position: int, reason: Optional[str]) -> None:
         if position <= 0:
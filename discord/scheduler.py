@@ -0,0 +1,270 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015-present Rapptz
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+import logging
+import time
+from typing import Any, Deque, Dict, Iterator, NamedTuple, Optional, Tuple
+
+from .enums import RequestPriority
+
+__all__ = (
+    "RequestQueueStats",
+    "RequestScheduler",
+)
+
+_log = logging.getLogger(__name__)
+
+_priority: ContextVar[RequestPriority] = ContextVar("request_priority", default=RequestPriority.normal)
+
+
+class RequestQueueStats(NamedTuple):
+    """Represents the queue statistics of one priority class of a :class:`RequestScheduler`.
+
+    .. versionadded:: 2.0
+
+    Attributes
+    -----------
+    depth: :class:`int`
+        The number of requests currently waiting for their turn.
+    sent: :class:`int`
+        The number of requests let through.
+    mean_wait: :class:`float`
+        The mean time requests waited in the queue, in seconds.
+    max_wait: :class:`float`
+        The longest time a request waited in the queue, in seconds.
+    """
+
+    depth: int
+    sent: int
+    mean_wait: float
+    max_wait: float
+
+
+class _PriorityQueue:
+    __slots__ = ("priority", "waiters", "depth", "sent", "total_wait", "max_wait", "backlogged")
+
+    def __init__(self, priority: RequestPriority) -> None:
+        self.priority: RequestPriority = priority
+        # fairness key -> waiting requests, served in turn
+        self.waiters: OrderedDict[Any, Deque[Tuple[asyncio.Future, float]]] = OrderedDict()
+        self.depth: int = 0
+        self.sent: int = 0
+        self.total_wait: float = 0.0
+        self.max_wait: float = 0.0
+        # whether requests are waiting longer than a period, logged once until they no longer are
+        self.backlogged: bool = False
+
+    def record(self, wait: float) -> None:
+        self.sent += 1
+        self.total_wait += wait
+        if wait > self.max_wait:
+            self.max_wait = wait
+
+
+class RequestScheduler:
+    """Paces the REST requests of a client to stay under Discord's global rate limit.
+
+    When passed to the ``request_scheduler`` parameter of :class:`Client`, every HTTP request
+    waits for its turn so that no more than ``limit`` requests are sent in any ``per`` seconds,
+    instead of only backing off once Discord answers with a global 429. A request counts
+    against the limit from when it is sent until ``per`` seconds after its response, so the
+    latency to Discord cannot make requests arrive faster than allowed.
+
+    Requests waiting for their turn are let through by priority, then in turn across guilds
+    (or channels, for requests outside of a guild) so one busy guild does not delay the others.
+    The priority of requests is set with :meth:`priority`: ::
+
+        with client.request_scheduler.priority(discord.RequestPriority.background):
+            for member in guild.members:
+                await member.add_roles(role)
+
+    A warning is logged when requests of a priority start waiting longer than ``per`` for
+    their turn, or a debug message for :attr:`RequestPriority.background` requests.
+
+    .. versionadded:: 2.0
+
+    Parameters
+    -----------
+    limit: :class:`int`
+        The number of requests allowed per period. Defaults to 50.
+    per: :class:`float`
+        The length of the period, in seconds. Defaults to 1.
+    """
+
+    def __init__(self, *, limit: int = 50, per: float = 1.0) -> None:
+        if limit <= 0:
+            raise ValueError("limit must be greater than 0")
+        if per <= 0:
+            raise ValueError("per must be greater than 0")
+
+        self.limit: int = limit
+        self.per: float = per
+        # requests count against the limit while in flight and for a period after they
+        # complete, since Discord received them at some point in between
+        self._outgoing: int = 0
+        self._completed: Deque[float] = deque()
+        self._queues: Dict[RequestPriority, _PriorityQueue] = {
+            priority: _PriorityQueue(priority) for priority in RequestPriority
+        }
+        self._handle: Optional[asyncio.TimerHandle] = None
+
+    @staticmethod
+    @contextmanager
+    def priority(priority: RequestPriority) -> Iterator[None]:
+        """A context manager setting the priority of the requests made inside of it,
+        including by the tasks it creates.
+
+        Parameters
+        -----------
+        priority: :class:`RequestPriority`
+            The priority of the requests.
+        """
+        if not isinstance(priority, RequestPriority):
+            raise TypeError(f"priority must be RequestPriority not {priority.__class__!r}")
+
+        token = _priority.set(priority)
+        try:
+            yield
+        finally:
+            _priority.reset(token)
+
+    def _free(self, now: float) -> bool:
+        completed = self._completed
+        while completed and completed[0] + self.per <= now:
+            completed.popleft()
+        return self._outgoing + len(completed) < self.limit
+
+    def _pending(self) -> bool:
+        return any(queue.depth for queue in self._queues.values())
+
+    async def acquire(self, key: Any = None) -> None:
+        """Waits until a request can be sent. This is called by the client before every request."""
+        queue = self._queues[_priority.get()]
+        now = time.monotonic()
+        if self._free(now) and not self._pending():
+            self._outgoing += 1
+            queue.record(0.0)
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            waiters = queue.waiters[key]
+        except KeyError:
+            waiters = queue.waiters[key] = deque()
+        waiters.append((future, now))
+        queue.depth += 1
+        self._schedule()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if not future.cancelled():
+                # it was let through just before being cancelled
+                self.release()
+            raise
+
+    def release(self) -> None:
+        """Marks a request let through by :meth:`acquire` as completed. This is called by the client."""
+        self._outgoing -= 1
+        self._completed.append(time.monotonic())
+        if self._pending():
+            self._schedule()
+
+    def _schedule(self) -> None:
+        if self._handle is not None:
+            return
+
+        now = time.monotonic()
+        if self._free(now):
+            delay = 0.0
+        elif self._completed:
+            delay = self._completed[0] + self.per - now
+        else:
+            # every slot is in flight, the next release schedules again
+            return
+        self._handle = asyncio.get_running_loop().call_later(delay, self._wake)
+
+    def _next(self) -> Optional[Tuple[_PriorityQueue, asyncio.Future, float]]:
+        for priority in RequestPriority:
+            queue = self._queues[priority]
+            while queue.waiters:
+                key, waiters = next(iter(queue.waiters.items()))
+                future, queued_at = waiters.popleft()
+                queue.depth -= 1
+                if waiters:
+                    queue.waiters.move_to_end(key)
+                else:
+                    del queue.waiters[key]
+                if not future.done():
+                    return queue, future, queued_at
+        return None
+
+    def _wake(self) -> None:
+        self._handle = None
+        now = time.monotonic()
+        while self._free(now):
+            item = self._next()
+            if item is None:
+                return
+
+            queue, future, queued_at = item
+            self._outgoing += 1
+            wait = now - queued_at
+            queue.record(wait)
+            future.set_result(None)
+            if wait <= self.per:
+                queue.backlogged = False
+            elif not queue.backlogged:
+                queue.backlogged = True
+                # background requests are meant to give way to the others
+                level = logging.DEBUG if queue.priority is RequestPriority.background else logging.WARNING
+                _log.log(
+                    level,
+                    "%s priority requests are waiting %.2fs for their turn, more than %ss (%s queued).",
+                    queue.priority.name.capitalize(),
+                    wait,
+                    self.per,
+                    queue.depth,
+                )
+
+        if self._pending():
+            self._schedule()
+
+    def stats(self) -> Dict[RequestPriority, RequestQueueStats]:
+        """Returns the queue statistics of every priority class.
+
+        Returns
+        --------
+        Dict[:class:`RequestPriority`, :class:`RequestQueueStats`]
+            The statistics of each priority, such as ``stats()[RequestPriority.background].max_wait``.
+        """
+        return {
+            priority: RequestQueueStats(q.depth, q.sent, q.total_wait / q.sent if q.sent else 0.0, q.max_wait)
+            for priority, q in self._queues.items()
+        }
@@ -0,0 +1,162 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015-present Rapptz
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+from typing import Dict, NamedTuple, Optional
+
+__all__ = (
+    "SessionInfo",
+    "SessionStore",
+    "FileSessionStore",
+)
+
+_log = logging.getLogger(__name__)
+
+
+class SessionInfo(NamedTuple):
+    """Represents the information needed to RESUME a gateway session.
+
+    .. versionadded:: 2.0
+
+    Attributes
+    -----------
+    session_id: :class:`str`
+        The gateway session ID.
+    sequence: :class:`int`
+        The last sequence number received.
+    resume_url: Optional[:class:`str`]
+        The gateway URL to resume the session on, if known.
+    shard_count: Optional[:class:`int`]
+        The shard count the session was created with.
+    """
+
+    session_id: str
+    sequence: int
+    resume_url: Optional[str]
+    shard_count: Optional[int]
+
+
+class SessionStore:
+    """The base class for persisting gateway sessions across restarts.
+
+    When passed to the ``session_store`` parameter of :class:`Client`, the gateway
+    session of every shard is saved when the client is closed and the client attempts
+    to RESUME it on the next start, falling back to IDENTIFY if Discord rejects it.
+
+    The default implementation stores nothing.
+
+    .. versionadded:: 2.0
+    """
+
+    def load(self, shard_id: Optional[int]) -> Optional[SessionInfo]:
+        """Returns the stored session for a shard, or ``None`` if there is none.
+
+        Parameters
+        -----------
+        shard_id: Optional[:class:`int`]
+            The shard ID, ``None`` if the client is not sharded.
+        """
+        return None
+
+    def save(self, shard_id: Optional[int], session: SessionInfo) -> None:
+        """Stores the session of a shard.
+
+        Parameters
+        -----------
+        shard_id: Optional[:class:`int`]
+            The shard ID, ``None`` if the client is not sharded.
+        session: :class:`SessionInfo`
+            The session to store.
+        """
+        pass
+
+    def clear(self, shard_id: Optional[int]) -> None:
+        """Removes the stored session of a shard.
+
+        Parameters
+        -----------
+        shard_id: Optional[:class:`int`]
+            The shard ID, ``None`` if the client is not sharded.
+        """
+        pass
+
+
+class FileSessionStore(SessionStore):
+    """A :class:`SessionStore` that persists the sessions of every shard to a JSON file.
+
+    .. versionadded:: 2.0
+
+    Parameters
+    -----------
+    path: :class:`str`
+        The path of the file to store the sessions in.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path: str = path
+        self._sessions: Optional[Dict[str, SessionInfo]] = None
+
+    def _read(self) -> Dict[str, SessionInfo]:
+        if self._sessions is not None:
+            return self._sessions
+
+        self._sessions = sessions = {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as fp:
+                data = json.load(fp)
+        except FileNotFoundError:
+            return sessions
+        except (OSError, ValueError):
+            _log.warning("Could not read the gateway sessions stored in %s, ignoring.", self.path, exc_info=True)
+            return sessions
+
+        for key, value in data.items():
+            try:
+                sessions[key] = SessionInfo(**value)
+            except TypeError:
+                continue
+        return sessions
+
+    def _write(self) -> None:
+        data = {key: session._asdict() for key, session in self._read().items()}
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as fp:
+            json.dump(data, fp)
+        os.replace(tmp, self.path)
+
+    def load(self, shard_id: Optional[int]) -> Optional[SessionInfo]:
+        return self._read().get(str(shard_id))
+
+    def save(self, shard_id: Optional[int], session: SessionInfo) -> None:
+        self._read()[str(shard_id)] = session
+        self._write()
+
+    def clear(self, shard_id: Optional[int]) -> None:
+        if self._read().pop(str(shard_id), None) is not None:
+            self._write()
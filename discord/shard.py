@@ -26,6 +26,7 @@ from __future__ import annotations
 
 import asyncio
 import logging
+import time
 
 import aiohttp
 
@@ -33,6 +34,7 @@ from .state import AutoShardedConnectionState
 from .client import Client
 from .backoff import ExponentialBackoff
 from .gateway import *
+from .gateway import _get_transport_compression
 from .errors import (
     ClientException,
     HTTPException,
@@ -49,6 +51,7 @@ if TYPE_CHECKING:
     from .gateway import DiscordWebSocket
     from .activity import BaseActivity
     from .enums import Status
+    from .session import SessionInfo
 
     EI = TypeVar("EI", bound="EventItem")
 
@@ -125,7 +128,12 @@ class Shard:
 
     async def close(self) -> None:
         self._cancel_task()
-        await self.ws.close(code=1000)
+        if self._client._session_store is not None:
+            self._client._save_session(self.ws)
+            # closing with 1000 would invalidate the session
+            await self.ws.close(code=4000)
+        else:
+            await self.ws.close(code=1000)
 
     async def disconnect(self) -> None:
         await self.close()
@@ -186,6 +194,7 @@ class Shard:
             coro = DiscordWebSocket.from_client(
                 self._client,
                 resume=exc.resume,
+                gateway=self.ws.resume_url if exc.resume else None,
                 shard_id=self.id,
                 session=self.ws.session_id,
                 sequence=self.ws.sequence,
@@ -279,6 +288,31 @@ class ShardInfo:
         """:class:`float`: Measures latency between a HEARTBEAT and a HEARTBEAT_ACK in seconds for this shard."""
         return self._parent.ws.latency
 
+    @property
+    def compression(self) -> Optional[str]:
+        """Optional[:class:`str`]: The transport compression of the shard connection,
+        ``'zlib-stream'``, ``'zstd-stream'`` or ``None``.
+
+        .. versionadded:: 2.0
+        """
+        return self._parent.ws._transport.name
+
+    @property
+    def bytes_received(self) -> int:
+        """:class:`int`: The number of bytes received by this shard, before decompression.
+
+        .. versionadded:: 2.0
+        """
+        return self._parent.ws._transport.traffic.received
+
+    @property
+    def bytes_decompressed(self) -> int:
+        """:class:`int`: The number of bytes received by this shard, after decompression.
+
+        .. versionadded:: 2.0
+        """
+        return self._parent.ws._transport.traffic.decompressed
+
     def is_ws_ratelimited(self) -> bool:
         """:class:`bool`: Whether the websocket is currently rate limited.
 
@@ -311,10 +345,19 @@ class AutoShardedClient(Client):
     if this is used. By default, when omitted, the client will launch shards from
     0 to ``shard_count - 1``.
 
+    Shards are IDENTIFY'd in parallel in ``shard_id % max_concurrency`` buckets, as
+    allowed by Discord for large bots. The ``max_concurrency`` of the bot is fetched from
+    the Bot Gateway endpoint unless passed to the client. Each bucket dispatches
+    :func:`on_shard_bucket_launch` once all of its shards have been launched.
+
     Attributes
     ------------
     shard_ids: Optional[List[:class:`int`]]
         An optional list of shard_ids to launch the shards with.
+    max_concurrency: Optional[:class:`int`]
+        The number of shards that can IDENTIFY at once.
+
+        .. versionadded:: 2.0
     """
 
     if TYPE_CHECKING:
@@ -323,8 +366,12 @@ class AutoShardedClient(Client):
     def __init__(self, *args: Any, loop: Optional[asyncio.AbstractEventLoop] = None, **kwargs: Any) -> None:
         kwargs.pop("shard_id", None)
         self.shard_ids: Optional[List[int]] = kwargs.pop("shard_ids", None)
+        self.max_concurrency: Optional[int] = kwargs.pop("max_concurrency", None)
         super().__init__(*args, loop=loop, **kwargs)
 
+        if self.max_concurrency is not None and self.max_concurrency < 1:
+            raise ValueError("max_concurrency must be greater than 0")
+
         if self.shard_ids is not None:
             if self.shard_count is None:
                 raise ClientException("When passing manual shard_ids, you must provide a shard_count.")
@@ -388,9 +435,21 @@ class AutoShardedClient(Client):
         """Mapping[int, :class:`ShardInfo`]: Returns a mapping of shard IDs to their respective info object."""
         return {shard_id: ShardInfo(parent, self.shard_count) for shard_id, parent in self.__shards.items()}
 
-    async def launch_shard(self, gateway: str, shard_id: int, *, initial: bool = False) -> None:
+    async def launch_shard(
+        self, gateway: str, shard_id: int, *, initial: bool = False, session: Optional[SessionInfo] = None
+    ) -> None:
         try:
-            coro = DiscordWebSocket.from_client(self, initial=initial, gateway=gateway, shard_id=shard_id)
+            if session is not None:
+                coro = DiscordWebSocket.from_client(
+                    self,
+                    gateway=session.resume_url or gateway,
+                    shard_id=shard_id,
+                    session=session.session_id,
+                    sequence=session.sequence,
+                    resume=True,
+                )
+            else:
+                coro = DiscordWebSocket.from_client(self, initial=initial, gateway=gateway, shard_id=shard_id)
             ws = await asyncio.wait_for(coro, timeout=180.0)
         except Exception:
             _log.exception("Failed to connect for shard_id: %s. Retrying...", shard_id)
@@ -402,24 +461,53 @@ class AutoShardedClient(Client):
         ret.launch()
 
     async def launch_shards(self) -> None:
-        if self.shard_count is None:
-            self.shard_count, gateway = await self.http.get_bot_gateway()
+        encoding = self._connection.gateway_encoding
+        compress = _get_transport_compression(self._connection)
+        if self.shard_count is None or self.max_concurrency is None:
+            shard_count, gateway, max_concurrency = await self.http.get_bot_gateway(
+                encoding=encoding, compress=compress
+            )
+            if self.shard_count is None:
+                self.shard_count = shard_count
+            if self.max_concurrency is None:
+                self.max_concurrency = max_concurrency
         else:
-            gateway = await self.http.get_gateway()
+            gateway = await self.http.get_gateway(encoding=encoding, compress=compress)
 
         self._connection.shard_count = self.shard_count
 
         shard_ids = self.shard_ids or range(self.shard_count)
         self._connection.shard_ids = shard_ids
 
+        # resuming is not subject to the IDENTIFY rate limit so do those first
+        sessions = {shard_id: self._load_session(shard_id) for shard_id in shard_ids}
+        to_identify = [shard_id for shard_id in shard_ids if sessions[shard_id] is None]
+        await self._load_snapshot({shard_id: session for shard_id, session in sessions.items() if session is not None})
+        self._connection._all_shards_restored = not to_identify
+        for shard_id, session in sessions.items():
+            if session is not None:
+                await self.launch_shard(gateway, shard_id, session=session)
+
+        # each bucket may IDENTIFY once every 5 seconds, independently of the others
+        buckets: Dict[int, List[int]] = {}
+        for shard_id in to_identify:
+            buckets.setdefault(shard_id % self.max_concurrency, []).append(shard_id)  # type: ignore
+
+        await asyncio.gather(*(self._launch_bucket(gateway, bucket, ids) for bucket, ids in buckets.items()))
+        self._connection.shards_launched.set()
+
+    async def _launch_bucket(self, gateway: str, bucket: int, shard_ids: List[int]) -> None:
+        start = time.perf_counter()
         for shard_id in shard_ids:
-            initial = shard_id == shard_ids[0]
-            await self.launch_shard(gateway, shard_id, initial=initial)
+            await self.launch_shard(gateway, shard_id, initial=shard_id == shard_ids[0])
 
-        self._connection.shards_launched.set()
+        elapsed = time.perf_counter() - start
+        _log.info("Launched IDENTIFY bucket %s (shard IDs %s) in %.2fs.", bucket, shard_ids, elapsed)
+        self.dispatch("shard_bucket_launch", bucket, shard_ids, elapsed)
 
     async def connect(self, *, reconnect: bool = True) -> None:
         self._reconnect = reconnect
+        self._start_loop_lag_monitor()
         await self.launch_shards()
 
         while not self.is_closed():
@@ -451,6 +539,9 @@ class AutoShardedClient(Client):
             return
 
         self._closed = True
+        if self._loop_lag_task is not None:
+            self._loop_lag_task.cancel()
+            self._loop_lag_task = None
 
         for vc in self.voice_clients:
             try:
@@ -461,8 +552,15 @@ class AutoShardedClient(Client):
         to_close = [asyncio.ensure_future(shard.close(), loop=self.loop) for shard in self.__shards.values()]
         if to_close:
             await asyncio.wait(to_close)
+            if self._cache_snapshot is not None:
+                await self._save_snapshot(shard.ws for shard in self.__shards.values())
 
         await self.http.close()
+        self._connection._stop_member_evictor()
+        if self._event_pool is not None:
+            self._event_pool.close()
+        if self._gateway_recorder is not None:
+            self._gateway_recorder.close()
         self.__queue.put_nowait(EventItem(EventType.clean_close, None, None))
 
     async def change_presence(
@@ -0,0 +1,282 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015-present Rapptz
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+
+from __future__ import annotations
+
+import os
+import zlib
+from typing import TYPE_CHECKING, Any, Dict, Optional
+
+from . import utils
+from .channel import StageChannel, TextChannel, VoiceChannel
+
+try:
+    import msgpack  # type: ignore
+except ModuleNotFoundError:
+    HAS_MSGPACK = False
+else:
+    HAS_MSGPACK = True
+
+if TYPE_CHECKING:
+    from .abc import GuildChannel
+    from .guild import Guild
+    from .member import VoiceState
+    from .role import Role
+    from .threads import Thread
+
+__all__ = ()
+
+# A snapshot is laid out as the magic, a format version, the codec used for the body
+# and then the zlib compressed body.
+_MAGIC = b"DPYC"
+_VERSION = 1
+_CODEC_JSON = 0
+_CODEC_MSGPACK = 1
+
+
+def _isoformat(dt) -> Optional[str]:
+    return dt.isoformat() if dt is not None else None
+
+
+def _dump_role(role: Role) -> Dict[str, Any]:
+    payload: Dict[str, Any] = {
+        "id": role.id,
+        "name": role.name,
+        "permissions": str(role._permissions),
+        "position": role.position,
+        "color": role._colour,
+        "hoist": role.hoist,
+        "unicode_emoji": role.emoji,
+        "icon": role._icon,
+        "managed": role.managed,
+        "mentionable": role.mentionable,
+    }
+    tags = role.tags
+    if tags is not None:
+        payload["tags"] = {"bot_id": tags.bot_id, "integration_id": tags.integration_id}
+        if tags.is_premium_subscriber():
+            payload["tags"]["premium_subscriber"] = None
+    return payload
+
+
+def _dump_channel(channel: GuildChannel) -> Dict[str, Any]:
+    payload: Dict[str, Any] = {
+        "id": channel.id,
+        "type": channel.type.value,
+        "name": channel.name,
+        "position": channel.position,
+        "parent_id": channel.category_id,
+        "permission_overwrites": [o._asdict() for o in channel._overwrites],  # type: ignore
+    }
+    nsfw = getattr(channel, "nsfw", None)
+    if nsfw is not None:
+        payload["nsfw"] = nsfw
+
+    if isinstance(channel, TextChannel):
+        payload["topic"] = channel.topic
+        payload["rate_limit_per_user"] = channel.slowmode_delay
+        payload["default_auto_archive_duration"] = channel.default_auto_archive_duration
+        payload["last_message_id"] = channel.last_message_id
+    elif isinstance(channel, (VoiceChannel, StageChannel)):
+        payload["rtc_region"] = channel.rtc_region.value if channel.rtc_region is not None else None
+        payload["video_quality_mode"] = channel.video_quality_mode.value
+        payload["bitrate"] = channel.bitrate
+        payload["user_limit"] = channel.user_limit
+        if isinstance(channel, StageChannel):
+            payload["topic"] = channel.topic
+    return payload
+
+
+def _dump_thread(thread: Thread) -> Dict[str, Any]:
+    payload: Dict[str, Any] = {
+        "id": thread.id,
+        "parent_id": thread.parent_id,
+        "owner_id": thread.owner_id,
+        "name": thread.name,
+        "type": thread._type.value,
+        "last_message_id": thread.last_message_id,
+        "rate_limit_per_user": thread.slowmode_delay,
+        "message_count": thread.message_count,
+        "member_count": thread.member_count,
+        "thread_metadata": {
+            "archived": thread.archived,
+            "archiver_id": thread.archiver_id,
+            "auto_archive_duration": thread.auto_archive_duration,
+            "archive_timestamp": _isoformat(thread.archive_timestamp),
+            "locked": thread.locked,
+            "invitable": thread.invitable,
+        },
+    }
+    me = thread.me
+    if me is not None:
+        payload["member"] = {
+            "id": me.thread_id,
+            "user_id": me.id,
+            "join_timestamp": _isoformat(me.joined_at),
+            "flags": me.flags,
+        }
+    return payload
+
+
+def _dump_voice_state(user_id: int, voice: VoiceState) -> Dict[str, Any]:
+    return {
+        "user_id": user_id,
+        "channel_id": voice.channel.id,  # type: ignore
+        "session_id": voice.session_id,
+        "self_mute": voice.self_mute,
+        "self_deaf": voice.self_deaf,
+        "self_stream": voice.self_stream,
+        "self_video": voice.self_video,
+        "mute": voice.mute,
+        "deaf": voice.deaf,
+        "suppress": voice.suppress,
+        "request_to_speak_timestamp": _isoformat(voice.requested_to_speak_at),
+    }
+
+
+def dump_guild(guild: Guild) -> Dict[str, Any]:
+    """Converts a cached guild back into a GUILD_CREATE payload that :class:`Guild` can be built from."""
+    if guild.unavailable:
+        return {"id": guild.id, "unavailable": True}
+
+    payload: Dict[str, Any] = {
+        "id": guild.id,
+        "name": guild.name,
+        "region": guild.region.value,
+        "verification_level": guild.verification_level.value,
+        "default_message_notifications": guild.default_notifications.value,
+        "explicit_content_filter": guild.explicit_content_filter.value,
+        "afk_timeout": guild.afk_timeout,
+        "afk_channel_id": guild.afk_channel.id if guild.afk_channel is not None else None,
+        "icon": guild._icon,
+        "banner": guild._banner,
+        "splash": guild._splash,
+        "discovery_splash": guild._discovery_splash,
+        "owner_id": guild.owner_id,
+        "mfa_level": guild.mfa_level,
+        "features": guild.features,
+        "system_channel_id": guild._system_channel_id,
+        "system_channel_flags": guild._system_channel_flags,
+        "rules_channel_id": guild._rules_channel_id,
+        "public_updates_channel_id": guild._public_updates_channel_id,
+        "description": guild.description,
+        "max_presences": guild.max_presences,
+        "max_members": guild.max_members,
+        "max_video_channel_users": guild.max_video_channel_users,
+        "premium_tier": guild.premium_tier,
+        "premium_subscription_count": guild.premium_subscription_count,
+        "preferred_locale": guild.preferred_locale,
+        "nsfw_level": guild.nsfw_level.value,
+        "roles": [_dump_role(role) for role in guild._roles.values()],
+        "emojis": [
+            {
+                "id": emoji.id,
+                "name": emoji.name,
+                "require_colons": emoji.require_colons,
+                "managed": emoji.managed,
+                "animated": emoji.animated,
+                "available": emoji.available,
+                "roles": [str(role_id) for role_id in emoji._roles],
+                "user": emoji.user._to_user_json() if emoji.user is not None else None,
+            }
+            for emoji in guild.emojis
+        ],
+        "stickers": [
+            {
+                "id": sticker.id,
+                "name": sticker.name,
+                "description": sticker.description,
+                "format_type": sticker.format.value,
+                "available": sticker.available,
+                "guild_id": sticker.guild_id,
+                "tags": sticker.emoji,
+                "user": sticker.user._to_user_json() if sticker.user is not None else None,
+            }
+            for sticker in guild.stickers
+        ],
+        "stage_instances": [
+            {
+                "id": instance.id,
+                "channel_id": instance.channel_id,
+                "topic": instance.topic,
+                "privacy_level": instance.privacy_level.value,
+                "discoverable_disabled": instance.discoverable_disabled,
+            }
+            for instance in guild._stage_instances.values()
+        ],
+        "channels": [_dump_channel(channel) for channel in guild._channels.values()],
+        "threads": [_dump_thread(thread) for thread in guild._threads.values()],
+        "members": [member._to_member_json() for member in guild._members.values()],
+        "voice_states": [
+            _dump_voice_state(user_id, voice)
+            for user_id, voice in guild._voice_states.items()
+            if voice.channel is not None
+        ],
+    }
+
+    member_count = getattr(guild, "_member_count", None)
+    if member_count is not None:
+        payload["member_count"] = member_count
+    if guild._large is not None:
+        payload["large"] = guild._large
+    return payload
+
+
+def write_snapshot(path: str, snapshot: Dict[str, Any]) -> None:
+    """Encodes and atomically writes a snapshot to ``path``."""
+    if HAS_MSGPACK:
+        codec, body = _CODEC_MSGPACK, msgpack.packb(snapshot)
+    else:
+        codec, body = _CODEC_JSON, utils._to_json(snapshot).encode("utf-8")
+
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as fp:
+        fp.write(_MAGIC)
+        fp.write(bytes((_VERSION, codec)))
+        fp.write(zlib.compress(body, 1))
+    os.replace(tmp, path)
+
+
+def read_snapshot(path: str) -> Optional[Dict[str, Any]]:
+    """Reads a snapshot written by :func:`write_snapshot`.
+
+    Returns ``None`` if there is no snapshot or it was written by an incompatible version.
+    """
+    try:
+        with open(path, "rb") as fp:
+            data = fp.read()
+    except FileNotFoundError:
+        return None
+
+    if data[:4] != _MAGIC or len(data) < 6 or data[4] != _VERSION:
+        return None
+
+    codec = data[5]
+    body = zlib.decompress(data[6:])
+    if codec == _CODEC_MSGPACK:
+        if not HAS_MSGPACK:
+            return None
+        return msgpack.unpackb(body, strict_map_key=False)
+    return utils._from_json(body)
@@ -25,18 +25,35 @@ DEALINGS IN THE SOFTWARE.
 from __future__ import annotations
 
 import asyncio
-from collections import deque, OrderedDict
+from collections import OrderedDict
 import copy
 import datetime
 import itertools
 import logging
-from typing import Dict, Optional, TYPE_CHECKING, Union, Callable, Any, List, TypeVar, Coroutine, Sequence, Tuple, Deque
+import time
+from typing import (
+    Dict,
+    Optional,
+    TYPE_CHECKING,
+    Union,
+    Callable,
+    Any,
+    List,
+    TypeVar,
+    Coroutine,
+    Sequence,
+    Tuple,
+    MutableMapping,
+    Set,
+    FrozenSet,
+)
 import inspect
 
 import os
 
 from .guild import Guild
 from .activity import BaseActivity
+from .cache import MessageCache, GuildMessageCache, MessageCacheStats, CacheBackend
 from .user import User, ClientUser
 from .emoji import Emoji
 from .mentions import AllowedMentions
@@ -58,6 +75,7 @@ from .ui.view import ViewStore, View
 from .stage_instance import StageInstance
 from .threads import Thread, ThreadMember
 from .sticker import GuildSticker
+from .snapshot import dump_guild
 
 if TYPE_CHECKING:
     from .abc import PrivateChannel
@@ -66,7 +84,7 @@ if TYPE_CHECKING:
     from .http import HTTPClient
     from .voice_client import VoiceProtocol
     from .client import Client
-    from .gateway import DiscordWebSocket
+    from .gateway import DiscordWebSocket, _GatewayTraffic
 
     from .types.activity import Activity as ActivityPayload
     from .types.channel import DMChannel as DMChannelPayload
@@ -143,6 +161,7 @@ class ConnectionState:
     if TYPE_CHECKING:
         _get_websocket: Callable[..., DiscordWebSocket]
         _get_client: Callable[..., Client]
+        _is_listening: Callable[[str], bool]
         _parsers: Dict[str, Callable[[Dict[str, Any]], None]]
 
     def __init__(
@@ -162,6 +181,20 @@ class ConnectionState:
         if self.max_messages is not None and self.max_messages <= 0:
             self.max_messages = 1000
 
+        self.max_messages_per_guild: Optional[int] = options.get("max_messages_per_guild")
+        if self.max_messages_per_guild is not None and self.max_messages_per_guild <= 0:
+            raise ValueError("max_messages_per_guild must be greater than 0")
+
+        self.max_messages_per_channel: Optional[int] = options.get("max_messages_per_channel")
+        if self.max_messages_per_channel is not None and self.max_messages_per_channel <= 0:
+            raise ValueError("max_messages_per_channel must be greater than 0")
+
+        cache_backend = options.get("cache_backend")
+        if cache_backend is not None and not callable(cache_backend):
+            raise TypeError(f"cache_backend parameter must be callable not {type(cache_backend)!r}")
+
+        self._cache_backend: Optional[Callable[[str], MutableMapping[int, Any]]] = cache_backend
+
         self.dispatch: Callable = dispatch
         self.handlers: Dict[str, Callable] = handlers
         self.hooks: Dict[str, Callable] = hooks
@@ -169,6 +202,35 @@ class ConnectionState:
         self._ready_task: Optional[asyncio.Task] = None
         self.application_id: Optional[int] = utils._get_as_snowflake(options, "application_id")
         self.heartbeat_timeout: float = options.get("heartbeat_timeout", 60.0)
+        self.gateway_offload_threshold: Optional[int] = options.get("gateway_offload_threshold", 32768)
+        if self.gateway_offload_threshold is not None and self.gateway_offload_threshold < 0:
+            raise ValueError("gateway_offload_threshold cannot be negative")
+        self.gateway_encoding: str = options.get("gateway_encoding", "json")
+        if self.gateway_encoding not in ("json", "etf"):
+            raise ValueError(f"gateway_encoding must be 'json' or 'etf' not {self.gateway_encoding!r}")
+        self.gateway_compression: Optional[str] = options.get("gateway_compression", "zlib-stream")
+        if self.gateway_compression not in (None, "zlib-stream", "zstd-stream"):
+            raise ValueError(
+                f"gateway_compression must be None, 'zlib-stream' or 'zstd-stream' not {self.gateway_compression!r}"
+            )
+        # shard ID -> bytes received and decompressed, kept across reconnects
+        self._gateway_traffic: Dict[Optional[int], _GatewayTraffic] = {}
+
+        # when set, the client replaces _is_listening so that parsers can skip
+        # building objects for events that nothing listens to
+        self.lazy_parse: bool = options.get("lazy_parse", False)
+        self._is_listening = lambda event: True
+
+        self.ignored_events: FrozenSet[str] = frozenset(event.upper() for event in options.get("ignored_events", ()))
+        if not self.ignored_events.isdisjoint(("READY", "RESUMED")):
+            raise ValueError("READY and RESUMED events cannot be ignored")
+        self.member_cache_timeout: Optional[float] = options.get("member_cache_timeout")
+        if self.member_cache_timeout is not None and self.member_cache_timeout <= 0:
+            raise ValueError("member_cache_timeout must be greater than 0")
+
+        self._member_evictor: Optional[asyncio.Task] = None
+        # shards resuming a session stored by a previous process, see Client.session_store
+        self._restored_shards: Set[Optional[int]] = set()
         self.guild_ready_timeout: float = options.get("guild_ready_timeout", 2.0)
         if self.guild_ready_timeout < 0:
             raise ValueError("guild_ready_timeout cannot be negative")
@@ -234,6 +296,8 @@ class ConnectionState:
 
     def clear(self, *, views: bool = True) -> None:
         self.user: Optional[ClientUser] = None
+        # started again on READY
+        self._stop_member_evictor()
         # Originally, this code used WeakValueDictionary to maintain references to the
         # global user mapping.
 
@@ -246,9 +310,9 @@ class ConnectionState:
         # references now using a regular dictionary with eviction being done
         # using __del__. Testing this for memory leaks led to no discernable leaks,
         # though more testing will have to be done.
-        self._users: Dict[int, User] = {}
-        self._emojis: Dict[int, Emoji] = {}
-        self._stickers: Dict[int, GuildSticker] = {}
+        self._users: MutableMapping[int, User] = self._create_cache("users")
+        self._emojis: MutableMapping[int, Emoji] = self._create_cache("emojis")
+        self._stickers: MutableMapping[int, GuildSticker] = self._create_cache("stickers")
         self._guilds: Dict[int, Guild] = {}
         if views:
             self._view_store: ViewStore = ViewStore(self)
@@ -260,9 +324,35 @@ class ConnectionState:
         # extra dict to look up private channels by user id
         self._private_channels_by_user: Dict[int, DMChannel] = {}
         if self.max_messages is not None:
-            self._messages: Optional[Deque[Message]] = deque(maxlen=self.max_messages)
+            if self.max_messages_per_guild is not None or self.max_messages_per_channel is not None:
+                self._messages: Optional[MessageCache] = GuildMessageCache(
+                    self.max_messages,
+                    max_per_guild=self.max_messages_per_guild,
+                    max_per_channel=self.max_messages_per_channel,
+                )
+            else:
+                self._messages: Optional[MessageCache] = MessageCache(self.max_messages)
         else:
-            self._messages: Optional[Deque[Message]] = None
+            self._messages: Optional[MessageCache] = None
+
+    def _create_cache(self, name: str, guild: Optional[Guild] = None) -> MutableMapping[int, Any]:
+        if self._cache_backend is None:
+            return {}
+
+        cache = self._cache_backend(name)
+        if isinstance(cache, CacheBackend):
+            if name == "users":
+                cache.bind(name, User._to_user_json, self._load_cached_user)
+            elif name == "members" and guild is not None:
+                cache.bind(name, Member._to_member_json, lambda data: Member(data=data, guild=guild, state=self))  # type: ignore
+            else:
+                cache.bind(name, None, None)
+        return cache
+
+    def _load_cached_user(self, data: UserPayload) -> User:
+        user = User(state=self, data=data)
+        user._stored = True
+        return user
 
     def process_chunk_requests(
         self, guild_id: int, nonce: Optional[str], members: List[Member], complete: bool
@@ -335,6 +425,10 @@ class ConnectionState:
             return user
 
     def deref_user(self, user_id: int) -> None:
+        if isinstance(self._users, CacheBackend):
+            # the user was spilled out of memory or evicted by the backend, which
+            # holds its entries strongly until then, so the key is not ours to drop
+            return
         self._users.pop(user_id, None)
 
     def create_user(self, data: UserPayload) -> User:
@@ -449,8 +543,49 @@ class ConnectionState:
             if recipient is not None:
                 self._private_channels_by_user.pop(recipient.id, None)
 
-    def _get_message(self, msg_id: Optional[int]) -> Optional[Message]:
-        return utils.find(lambda m: m.id == msg_id, reversed(self._messages)) if self._messages else None
+    def _get_message(self, msg_id: Optional[int], guild_id: Optional[int] = None) -> Optional[Message]:
+        return self._messages.get(msg_id, guild_id) if self._messages is not None else None
+
+    @property
+    def message_cache_stats(self) -> Dict[Optional[int], MessageCacheStats]:
+        if isinstance(self._messages, GuildMessageCache):
+            return self._messages.stats()
+        return {}
+
+    def _mark_member_active(self, guild: Optional[Guild], member: Any) -> None:
+        # only called if member_cache_timeout is set
+        if guild is None or not isinstance(member, Member):
+            return
+
+        if member.id in guild._members:
+            guild._touch_member(member.id)
+        elif self.member_cache_flags.joined:
+            # bring back members that were evicted for inactivity
+            guild._add_member(member)
+
+    def _start_member_evictor(self) -> None:
+        if self.member_cache_timeout is not None and self._member_evictor is None:
+            self._member_evictor = asyncio.create_task(self._evict_inactive_members())
+
+    def _stop_member_evictor(self) -> None:
+        if self._member_evictor is not None:
+            self._member_evictor.cancel()
+            self._member_evictor = None
+
+    async def _evict_inactive_members(self) -> None:
+        # this is only started if member_cache_timeout is set
+        timeout: float = self.member_cache_timeout  # type: ignore
+        try:
+            while True:
+                await asyncio.sleep(min(timeout, 60.0))
+                cutoff = time.monotonic() - timeout
+                evicted = sum(guild._evict_inactive_members(cutoff) for guild in self.guilds)
+                if evicted:
+                    _log.debug("Evicted %d inactive members from the member cache.", evicted)
+        finally:
+            # a cancelled evictor may finish after the next one was started
+            if self._member_evictor is asyncio.current_task():
+                self._member_evictor = None
 
     def _add_guild_from_data(self, data: GuildPayload) -> Guild:
         guild = Guild(data=data, state=self)
@@ -548,7 +683,40 @@ class ConnectionState:
         finally:
             self._ready_task = None
 
+    def _build_snapshot(self, sessions: Dict[str, List[Any]]) -> Dict[str, Any]:
+        return {
+            "shard_count": self.shard_count,
+            "sessions": sessions,
+            "guilds": [dump_guild(guild) for guild in self._guilds.values()],
+        }
+
+    def _apply_snapshot(self, snapshot: Dict[str, Any], shard_ids: Set[Optional[int]]) -> int:
+        shard_count = self.shard_count
+        if snapshot.get("shard_count") != shard_count:
+            return 0
+
+        count = 0
+        for data in snapshot["guilds"]:
+            shard_id = None if shard_count is None else (int(data["id"]) >> 22) % shard_count
+            if shard_id in shard_ids or None in shard_ids:
+                self._add_guild_from_data(data)
+                count += 1
+        return count
+
+    def _restored_session_ready(self, shard_id: Optional[int]) -> bool:
+        restored = self._restored_shards
+        if shard_id not in restored:
+            return False
+
+        restored.discard(shard_id)
+        # a restored session does not get a READY so we have to fire it ourselves
+        if not restored and self._ready_task is None and not self._get_client().is_ready():
+            self.call_handlers("ready")
+            self.dispatch("ready")
+        return True
+
     def parse_ready(self, data) -> None:
+        self._restored_shards.discard(data.get("__shard_id__"))
         if self._ready_task is not None:
             self._ready_task.cancel()
 
@@ -570,16 +738,25 @@ class ConnectionState:
         for guild_data in data["guilds"]:
             self._add_guild_from_data(guild_data)
 
+        self._start_member_evictor()
         self.dispatch("connect")
         self._ready_task = asyncio.create_task(self._delay_ready())
 
     def parse_resumed(self, data) -> None:
         self.dispatch("resumed")
+        self._restored_session_ready(data["__shard_id__"])
 
     def parse_message_create(self, data) -> None:
-        channel, _ = self._get_guild_channel(data)
+        channel, guild = self._get_guild_channel(data)
+        if self._messages is None and self.member_cache_timeout is None and not self._is_listening("message"):
+            if channel and channel.__class__ in (TextChannel, Thread):
+                channel.last_message_id = int(data["id"])  # type: ignore
+            return
+
         # channel would be the correct type here
         message = Message(channel=channel, data=data, state=self)  # type: ignore
+        if self.member_cache_timeout is not None:
+            self._mark_member_active(guild, message.author)
         self.dispatch("message", message)
         if self._messages is not None:
             self._messages.append(message)
@@ -588,10 +765,11 @@ class ConnectionState:
             channel.last_message_id = message.id  # type: ignore
 
     def parse_message_delete(self, data) -> None:
-        raw = RawMessageDeleteEvent(data)
-        found = self._get_message(raw.message_id)
-        raw.cached_message = found
-        self.dispatch("raw_message_delete", raw)
+        found = self._get_message(int(data["id"]), utils._get_as_snowflake(data, "guild_id"))
+        if self._is_listening("raw_message_delete"):
+            raw = RawMessageDeleteEvent(data)
+            raw.cached_message = found
+            self.dispatch("raw_message_delete", raw)
         if self._messages is not None and found is not None:
             self.dispatch("message_delete", found)
             self._messages.remove(found)
@@ -599,39 +777,51 @@ class ConnectionState:
     def parse_message_delete_bulk(self, data) -> None:
         raw = RawBulkMessageDeleteEvent(data)
         if self._messages:
-            found_messages = [message for message in self._messages if message.id in raw.message_ids]
+            found_messages = self._messages.pop_many(raw.message_ids)
         else:
             found_messages = []
         raw.cached_messages = found_messages
         self.dispatch("raw_bulk_message_delete", raw)
         if found_messages:
             self.dispatch("bulk_message_delete", found_messages)
-            for msg in found_messages:
-                # self._messages won't be None here
-                self._messages.remove(msg)  # type: ignore
 
     def parse_message_update(self, data) -> None:
-        raw = RawMessageUpdateEvent(data)
-        message = self._get_message(raw.message_id)
-        if message is not None:
-            older_message = copy.copy(message)
+        message_id = int(data["id"])
+        message = self._get_message(message_id, utils._get_as_snowflake(data, "guild_id"))
+        wants_raw = self._is_listening("raw_message_edit")
+        wants_edit = message is not None and self._is_listening("message_edit")
+        older_message = copy.copy(message) if message is not None and (wants_raw or wants_edit) else None
+        if wants_raw:
+            raw = RawMessageUpdateEvent(data)
             raw.cached_message = older_message
             self.dispatch("raw_message_edit", raw)
+
+        if message is not None:
             message._update(data)
-            # Coerce the `after` parameter to take the new updated Member
-            # ref: #5999
-            older_message.author = message.author
-            self.dispatch("message_edit", older_message, message)
-        else:
-            self.dispatch("raw_message_edit", raw)
+            if wants_edit:
+                # Coerce the `after` parameter to take the new updated Member
+                # ref: #5999
+                older_message.author = message.author  # type: ignore
+                self.dispatch("message_edit", older_message, message)
 
-        if "components" in data and self._view_store.is_message_tracked(raw.message_id):
-            self._view_store.update_from_message(raw.message_id, data["components"])
+        if "components" in data and self._view_store.is_message_tracked(message_id):
+            self._view_store.update_from_message(message_id, data["components"])
 
     def parse_message_reaction_add(self, data) -> None:
         emoji = data["emoji"]
         emoji_id = utils._get_as_snowflake(emoji, "id")
         emoji = PartialEmoji.with_state(self, id=emoji_id, animated=emoji.get("animated", False), name=emoji["name"])
+        if (
+            self.member_cache_timeout is None
+            and not self._is_listening("raw_reaction_add")
+            and not self._is_listening("reaction_add")
+        ):
+            # only keep the cached message up to date
+            message = self._get_message(int(data["message_id"]), utils._get_as_snowflake(data, "guild_id"))
+            if message is not None:
+                message._add_reaction(data, self._upgrade_partial_emoji(emoji), int(data["user_id"]))
+            return
+
         raw = RawReactionActionEvent(data, emoji, "REACTION_ADD")
 
         member_data = data.get("member")
@@ -643,10 +833,12 @@ class ConnectionState:
                 raw.member = None
         else:
             raw.member = None
+        if self.member_cache_timeout is not None and raw.member is not None:
+            self._mark_member_active(raw.member.guild, raw.member)
         self.dispatch("raw_reaction_add", raw)
 
         # rich interface here
-        message = self._get_message(raw.message_id)
+        message = self._get_message(raw.message_id, raw.guild_id)
         if message is not None:
             emoji = self._upgrade_partial_emoji(emoji)
             reaction = message._add_reaction(data, emoji, raw.user_id)
@@ -659,7 +851,7 @@ class ConnectionState:
         raw = RawReactionClearEvent(data)
         self.dispatch("raw_reaction_clear", raw)
 
-        message = self._get_message(raw.message_id)
+        message = self._get_message(raw.message_id, raw.guild_id)
         if message is not None:
             old_reactions = message.reactions.copy()
             message.reactions.clear()
@@ -669,10 +861,20 @@ class ConnectionState:
         emoji = data["emoji"]
         emoji_id = utils._get_as_snowflake(emoji, "id")
         emoji = PartialEmoji.with_state(self, id=emoji_id, name=emoji["name"])
+        if not self._is_listening("raw_reaction_remove") and not self._is_listening("reaction_remove"):
+            # only keep the cached message up to date
+            message = self._get_message(int(data["message_id"]), utils._get_as_snowflake(data, "guild_id"))
+            if message is not None:
+                try:
+                    message._remove_reaction(data, self._upgrade_partial_emoji(emoji), int(data["user_id"]))
+                except (AttributeError, ValueError):
+                    pass
+            return
+
         raw = RawReactionActionEvent(data, emoji, "REACTION_REMOVE")
         self.dispatch("raw_reaction_remove", raw)
 
-        message = self._get_message(raw.message_id)
+        message = self._get_message(raw.message_id, raw.guild_id)
         if message is not None:
             emoji = self._upgrade_partial_emoji(emoji)
             try:
@@ -691,7 +893,7 @@ class ConnectionState:
         raw = RawReactionClearEmojiEvent(data, emoji)
         self.dispatch("raw_reaction_clear_emoji", raw)
 
-        message = self._get_message(raw.message_id)
+        message = self._get_message(raw.message_id, raw.guild_id)
         if message is not None:
             try:
                 reaction = message._clear_emoji(emoji)
@@ -703,6 +905,8 @@ class ConnectionState:
 
     def parse_interaction_create(self, data) -> None:
         interaction = Interaction(data=data, state=self)
+        if self.member_cache_timeout is not None:
+            self._mark_member_active(interaction.guild, interaction.user)
         if data["type"] == 3:  # interaction component
             custom_id = interaction.data["custom_id"]  # type: ignore
             component_type = interaction.data["component_type"]  # type: ignore
@@ -725,12 +929,14 @@ class ConnectionState:
             _log.debug("PRESENCE_UPDATE referencing an unknown member ID: %s. Discarding", member_id)
             return
 
-        old_member = Member._copy(member)
+        wants_presence = self._is_listening("presence_update")
+        old_member = Member._copy(member) if wants_presence else None
         user_update = member._presence_update(data=data, user=user)
         if user_update:
             self.dispatch("user_update", user_update[0], user_update[1])
 
-        self.dispatch("presence_update", old_member, member)
+        if wants_presence:
+            self.dispatch("presence_update", old_member, member)
 
     def parse_user_update(self, data) -> None:
         # self.user is *always* cached when this is called
@@ -741,10 +947,16 @@ class ConnectionState:
             ref._update(data)
 
     def parse_invite_create(self, data) -> None:
+        if not self._is_listening("invite_create"):
+            return
+
         invite = Invite.from_gateway(state=self, data=data)
         self.dispatch("invite_create", invite)
 
     def parse_invite_delete(self, data) -> None:
+        if not self._is_listening("invite_delete"):
+            return
+
         invite = Invite.from_gateway(state=self, data=data)
         self.dispatch("invite_delete", invite)
 
@@ -773,9 +985,11 @@ class ConnectionState:
         if guild is not None:
             channel = guild.get_channel(channel_id)
             if channel is not None:
-                old_channel = copy.copy(channel)
+                wants_update = self._is_listening("guild_channel_update")
+                old_channel = copy.copy(channel) if wants_update else None
                 channel._update(guild, data)
-                self.dispatch("guild_channel_update", old_channel, channel)
+                if wants_update:
+                    self.dispatch("guild_channel_update", old_channel, channel)
             else:
                 _log.debug("CHANNEL_UPDATE referencing an unknown channel ID: %s. Discarding.", channel_id)
         else:
@@ -842,9 +1056,11 @@ class ConnectionState:
         thread_id = int(data["id"])
         thread = guild.get_thread(thread_id)
         if thread is not None:
-            old = copy.copy(thread)
+            wants_update = self._is_listening("thread_update")
+            old = copy.copy(thread) if wants_update else None
             thread._update(data)
-            self.dispatch("thread_update", old, thread)
+            if wants_update:
+                self.dispatch("thread_update", old, thread)
         else:
             thread = Thread(guild=guild, state=guild._state, data=data)
             guild._add_thread(thread)
@@ -990,13 +1206,15 @@ class ConnectionState:
 
         member = guild.get_member(user_id)
         if member is not None:
-            old_member = Member._copy(member)
+            wants_update = self._is_listening("member_update")
+            old_member = Member._copy(member) if wants_update else None
             member._update(data)
             user_update = member._update_inner_user(user)
             if user_update:
                 self.dispatch("user_update", user_update[0], user_update[1])
 
-            self.dispatch("member_update", old_member, member)
+            if wants_update:
+                self.dispatch("member_update", old_member, member)
         else:
             if self.member_cache_flags.joined:
                 member = Member(data=data, guild=guild, state=self)
@@ -1125,9 +1343,7 @@ class ConnectionState:
 
         # do a cleanup of the messages cache
         if self._messages is not None:
-            self._messages: Optional[Deque[Message]] = deque(
-                (msg for msg in self._messages if msg.guild != guild), maxlen=self.max_messages
-            )
+            self._messages.remove_guild(guild.id)
 
         self._remove_guild(guild)
         self.dispatch("guild_remove", guild)
@@ -1309,6 +1525,9 @@ class ConnectionState:
 
             member, before, after = guild._update_voice_state(data, channel_id)  # type: ignore
             if member is not None:
+                if self.member_cache_timeout is not None:
+                    self._mark_member_active(guild, member)
+
                 if flags.voice:
                     if channel_id is None and flags._voice_only and member.id != self_id:
                         # Only remove from cache if we only have the voice flag enabled
@@ -1333,6 +1552,9 @@ class ConnectionState:
             asyncio.create_task(logging_coroutine(coro, info="Voice Protocol voice server update handler"))
 
     def parse_typing_start(self, data) -> None:
+        if not self._is_listening("raw_typing") and not self._is_listening("typing"):
+            return
+
         raw = RawTypingEvent(data)
 
         member_data = data.get("member")
@@ -1414,6 +1636,8 @@ class AutoShardedConnectionState(ConnectionState):
         super().__init__(*args, **kwargs)
         self.shard_ids: Union[List[int], range] = []
         self.shards_launched: asyncio.Event = asyncio.Event()
+        # whether every shard resumed a stored session, otherwise _delay_ready dispatches ready
+        self._all_shards_restored: bool = False
 
     def _update_message_references(self) -> None:
         # self._messages won't be None when this is called
@@ -1509,6 +1733,7 @@ class AutoShardedConnectionState(ConnectionState):
         self.dispatch("ready")
 
     def parse_ready(self, data) -> None:
+        self._restored_shards.discard(data["__shard_id__"])
         if not hasattr(self, "_ready_state"):
             self._ready_state = asyncio.Queue()
 
@@ -1531,6 +1756,7 @@ class AutoShardedConnectionState(ConnectionState):
         if self._messages:
             self._update_message_references()
 
+        self._start_member_evictor()
         self.dispatch("connect")
         self.dispatch("shard_connect", data["__shard_id__"])
 
@@ -1538,5 +1764,12 @@ class AutoShardedConnectionState(ConnectionState):
             self._ready_task = asyncio.create_task(self._delay_ready())
 
     def parse_resumed(self, data) -> None:
+        shard_id = data["__shard_id__"]
         self.dispatch("resumed")
-        self.dispatch("shard_resumed", data["__shard_id__"])
+        self.dispatch("shard_resumed", shard_id)
+        if shard_id in self._restored_shards:
+            self.dispatch("shard_ready", shard_id)
+            if self._all_shards_restored:
+                self._restored_session_ready(shard_id)
+            else:
+                self._restored_shards.discard(shard_id)
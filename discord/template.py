@@ -66,6 +66,10 @@ class _PartialTemplateState:
     def member_cache_flags(self):
         return self.__state.member_cache_flags
 
+    @property
+    def member_cache_timeout(self):
+        return None
+
     def store_emoji(self, guild, packet):
         return None
 
@@ -78,6 +82,9 @@ class _PartialTemplateState:
     def _get_guild(self, id):
         return self.__state._get_guild(id)
 
+    def _create_cache(self, name, guild=None):
+        return {}
+
     async def query_members(self, **kwargs: Any):
         return []
 
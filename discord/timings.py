@@ -0,0 +1,164 @@
+"""
+The MIT License (MIT)
+
+Copyright (c) 2015-present Rapptz
+
+Permission is hereby granted, free of charge, to any person obtaining a
+copy of this software and associated documentation files (the "Software"),
+to deal in the Software without restriction, including without limitation
+the rights to use, copy, modify, merge, publish, distribute, sublicense,
+and/or sell copies of the Software, and to permit persons to whom the
+Software is furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS
+OR IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER
+DEALINGS IN THE SOFTWARE.
+"""
+
+
+from __future__ import annotations
+
+from typing import Dict, List, Tuple
+
+__all__ = (
+    "TimingHistogram",
+    "EventTimings",
+)
+
+# bucket i holds durations of [2 ** (i - 1), 2 ** i) microseconds, the last one is unbounded
+_BUCKETS = 32
+
+
+class TimingHistogram:
+    """A histogram of durations with power of two buckets.
+
+    Recording a duration is a handful of integer operations, so it can be used
+    on every event without a noticeable cost.
+
+    .. versionadded:: 2.0
+
+    Attributes
+    -----------
+    count: :class:`int`
+        The number of durations recorded.
+    total: :class:`float`
+        The sum of the durations recorded, in seconds.
+    max: :class:`float`
+        The longest duration recorded, in seconds.
+    """
+
+    __slots__ = ("count", "total", "max", "_buckets")
+
+    def __init__(self) -> None:
+        self.count: int = 0
+        self.total: float = 0.0
+        self.max: float = 0.0
+        self._buckets: List[int] = [0] * _BUCKETS
+
+    def __repr__(self) -> str:
+        return f"<TimingHistogram count={self.count} mean={self.mean:.6f} max={self.max:.6f}>"
+
+    def record(self, duration: float) -> None:
+        """Records a duration.
+
+        Parameters
+        -----------
+        duration: :class:`float`
+            The duration in seconds.
+        """
+        self.count += 1
+        self.total += duration
+        if duration > self.max:
+            self.max = duration
+        index = int(duration * 1_000_000).bit_length()
+        self._buckets[index if index < _BUCKETS else _BUCKETS - 1] += 1
+
+    @property
+    def mean(self) -> float:
+        """:class:`float`: The mean duration recorded, in seconds."""
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percentile: float) -> float:
+        """Returns an upper bound of the given percentile of the durations recorded.
+
+        As durations are bucketed by powers of two this is within a factor of two
+        of the exact value, but never above :attr:`max`.
+
+        Parameters
+        -----------
+        percentile: :class:`float`
+            The percentile to return, between 0 and 100.
+
+        Returns
+        --------
+        :class:`float`
+            The duration in seconds.
+        """
+        if not self.count:
+            return 0.0
+
+        target = self.count * percentile / 100
+        seen = 0
+        for index, count in enumerate(self._buckets):
+            seen += count
+            if seen >= target:
+                return min((1 << index) / 1_000_000, self.max)
+        return self.max
+
+    def buckets(self) -> List[Tuple[float, int]]:
+        """Returns the non-empty buckets as ``(upper bound in seconds, count)`` pairs."""
+        return [((1 << index) / 1_000_000, count) for index, count in enumerate(self._buckets) if count]
+
+
+class EventTimings:
+    """Holds the timings of the gateway events received and the event handlers run.
+
+    This is available through :attr:`Client.event_timings` when ``event_timings`` is
+    passed to the :class:`Client`.
+
+    .. versionadded:: 2.0
+
+    Attributes
+    -----------
+    decode: Dict[:class:`str`, :class:`TimingHistogram`]
+        The time taken to decompress and decode payloads, keyed by event type,
+        e.g. ``'GUILD_CREATE'``. Payloads that are not events are keyed by their
+        opcode, e.g. ``'OP 11'``.
+    parse: Dict[:class:`str`, :class:`TimingHistogram`]
+        The time taken to update the cache and build the objects of events,
+        keyed by event type.
+    handlers: Dict[:class:`str`, :class:`TimingHistogram`]
+        The time taken for event handlers to complete, keyed by the event handler name
+        followed by the handler's qualified name, e.g. ``'on_message:MyCog.on_message'``.
+    """
+
+    __slots__ = ("decode", "parse", "handlers")
+
+    def __init__(self) -> None:
+        self.decode: Dict[str, TimingHistogram] = {}
+        self.parse: Dict[str, TimingHistogram] = {}
+        self.handlers: Dict[str, TimingHistogram] = {}
+
+    def __repr__(self) -> str:
+        return f"<EventTimings decode={len(self.decode)} parse={len(self.parse)} handlers={len(self.handlers)}>"
+
+    @staticmethod
+    def _record(histograms: Dict[str, TimingHistogram], key: str, duration: float) -> None:
+        try:
+            histogram = histograms[key]
+        except KeyError:
+            histogram = histograms[key] = TimingHistogram()
+        histogram.record(duration)
+
+    def reset(self) -> None:
+        """Clears every recorded timing."""
+        self.decode.clear()
+        self.parse.clear()
+        self.handlers.clear()
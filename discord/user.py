@@ -144,6 +144,14 @@ class BaseUser(_UserTag):
             "bot": self.bot,
         }
 
+    def _to_user_json(self) -> Dict[str, Any]:
+        payload = self._to_minimal_user_json()
+        payload["banner"] = self._banner
+        payload["accent_color"] = self._accent_colour
+        payload["public_flags"] = self._public_flags
+        payload["system"] = self.system
+        return payload
+
     @property
     def public_flags(self) -> PublicUserFlags:
         """:class:`PublicUserFlags`: The publicly available flags the user has."""
@@ -0,0 +1,111 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+from discord.cache import ColumnarMemberBackend, GuildMessageCache, SQLiteCacheBackend
+from discord.fake_gateway import FakeGateway
+from discord.state import ConnectionState
+
+
+def make_message(message_id, guild_id, channel_id):
+    guild = SimpleNamespace(id=guild_id) if guild_id is not None else None
+    return SimpleNamespace(id=message_id, guild=guild, channel=SimpleNamespace(id=channel_id))
+
+
+def test_global_eviction_keeps_the_appended_message_on_a_tie():
+    cache = GuildMessageCache(3)
+    for i in range(6):
+        # every guild holds a single message, they all tie for the largest
+        cache.append(make_message(i, 100 + i, 200 + i))
+        assert cache.get(i) is not None
+
+    assert [m.id for m in cache] == [3, 4, 5]
+
+
+def test_global_eviction_picks_the_largest_guild():
+    cache = GuildMessageCache(4)
+    cache.append(make_message(1, 10, 1))
+    cache.append(make_message(2, 10, 1))
+    cache.append(make_message(3, 10, 1))
+    cache.append(make_message(4, 20, 2))
+    cache.append(make_message(5, 20, 2))
+
+    assert [m.id for m in cache] == [2, 3, 4, 5]
+    assert cache.stats()[10].evicted == 1
+
+
+def make_state(cache_backend):
+    loop = asyncio.new_event_loop()
+    state = ConnectionState(
+        dispatch=lambda *args, **kwargs: None,
+        handlers={},
+        hooks={},
+        http=None,
+        loop=loop,
+        intents=discord.Intents.all(),
+        cache_backend=cache_backend,
+    )
+    loop.close()
+    return state
+
+
+def test_sqlite_backend_keeps_spilled_users(tmp_path):
+    path = str(tmp_path / "cache.db")
+    state = make_state(lambda name: SQLiteCacheBackend(path, hot_size=2))
+    for i in range(1, 6):
+        state.store_user({"id": str(i), "username": f"user {i}", "discriminator": "0001", "avatar": None})
+
+    users = state._users
+    assert list(users._hot) == [4, 5]
+    assert sorted(users._cold) == [1, 2, 3]
+    for i in range(1, 6):
+        user = state.get_user(i)
+        assert user is not None
+        assert user.name == f"user {i}"
+
+
+def test_clear_stops_the_member_evictor():
+    async def main():
+        state = ConnectionState(
+            dispatch=lambda *args, **kwargs: None,
+            handlers={},
+            hooks={},
+            http=None,
+            loop=asyncio.get_running_loop(),
+            intents=discord.Intents.all(),
+            member_cache_timeout=60.0,
+        )
+        state._start_member_evictor()
+        evictor = state._member_evictor
+        state.clear()
+        state._start_member_evictor()
+        await asyncio.sleep(0)
+        assert evictor.cancelled()
+        # the cancelled evictor does not forget the one started after it
+        assert state._member_evictor is not None and state._member_evictor is not evictor
+        state.clear()
+
+    asyncio.run(main())
+
+
+def test_columnar_members_are_built_lazily():
+    async def main():
+        state = make_state(lambda name: ColumnarMemberBackend(hot_size=2) if name == "members" else {})
+        gateway = FakeGateway(guilds=1, members_per_guild=10)
+        guild = state._add_guild_from_data(gateway._guild_create(gateway._guild_ids[0]))
+        members = guild._members
+        assert len(members._hot) == 2 and len(members._ids) == len(members) - 2
+
+        values = members.values()
+        assert not isinstance(values, list)
+        ids = set()
+        for member in values:
+            # promoting rows while iterating moves them, each member is still seen once
+            if members._ids:
+                guild.get_member(members._ids[-1])
+            ids.add(member.id)
+        assert ids == set(members)
+        assert len(guild.members) == len(members)
+        assert guild.get_member_named(guild.members[-1].name) is not None
+
+    asyncio.run(main())
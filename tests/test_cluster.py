@@ -0,0 +1,18 @@
+import discord
+from discord.cluster import _STABLE_UPTIME
+
+
+def factory(**options):
+    raise RuntimeError
+
+
+def test_restarts_back_off_and_give_up():
+    launcher = discord.ClusterLauncher(factory, "token", clusters=1, shard_count=1, max_restarts=3)
+    launcher._started_at[0] = 0.0
+    delays = [launcher._restart_delay(0, 1.0) for _ in range(3)]
+    assert all(delay is not None and delay > 0 for delay in delays)
+    assert launcher._restart_delay(0, 1.0) is None
+
+    # a worker that ran for a while before failing starts counting again
+    assert launcher._restart_delay(0, _STABLE_UPTIME) is not None
+    assert launcher._failures[0] == 1
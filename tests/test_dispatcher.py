@@ -0,0 +1,37 @@
+import asyncio
+
+from discord import EventOverflowPolicy, EventWorkerPool
+
+
+def run_pool(overflow):
+    async def main():
+        calls = []
+
+        async def runner(coro, event_name, *args, **kwargs):
+            await coro(*args, **kwargs)
+
+        async def handler(i):
+            calls.append(i)
+
+        pool = EventWorkerPool(workers=1, max_queue_size=2, overflow=overflow)
+        pool._bind(runner)
+        for i in range(5):
+            pool.submit(handler, "on_test", i)
+        for _ in range(10):
+            await asyncio.sleep(0)
+        pool.close()
+        return sorted(calls), pool.stats()["on_test"]
+
+    return asyncio.run(main())
+
+
+def test_drop_oldest():
+    calls, stats = run_pool(EventOverflowPolicy.drop_oldest)
+    assert calls == [3, 4]
+    assert stats.dropped == 3 and stats.processed == 2
+
+
+def test_unbounded_runs_overflowing_calls_outside_the_pool():
+    calls, stats = run_pool(EventOverflowPolicy.unbounded)
+    assert calls == [0, 1, 2, 3, 4]
+    assert stats.overflowed == 3 and stats.processed == 2
@@ -0,0 +1,39 @@
+import asyncio
+from types import SimpleNamespace
+
+from discord.gateway import KeepAliveHandler
+
+
+def test_stop_does_not_interrupt_a_heartbeat():
+    async def main():
+        sending = asyncio.Event()
+        sent = []
+
+        async def send_heartbeat(data):
+            sending.set()
+            await asyncio.sleep(0.05)
+            sent.append(data)
+
+        ws = SimpleNamespace(
+            loop=asyncio.get_running_loop(),
+            _max_heartbeat_timeout=60.0,
+            HEARTBEAT=1,
+            sequence=42,
+            send_heartbeat=send_heartbeat,
+        )
+        handler = KeepAliveHandler(ws=ws, shard_id=0, interval=0.01)
+        handler.start()
+        await sending.wait()
+        handler.stop()
+        await asyncio.wait_for(handler._task, timeout=1)
+        assert sent == [{"op": 1, "d": 42}]
+
+        # stopping while waiting for the next beat returns right away
+        handler = KeepAliveHandler(ws=ws, shard_id=0, interval=60.0)
+        handler.start()
+        await asyncio.sleep(0)
+        handler.stop()
+        await asyncio.wait_for(handler._task, timeout=1)
+        assert len(sent) == 1
+
+    asyncio.run(main())
@@ -0,0 +1,35 @@
+import asyncio
+
+from discord.fake_gateway import FakeGateway
+from discord.http import HTTPClient
+
+EMOJI = "%F0%9F%91%8D"
+REACTION_ROUTES = (
+    ("PUT", "/channels/{channel_id}/messages/{message_id}/reactions/{emoji}/@me"),
+    ("DELETE", "/channels/{channel_id}/messages/{message_id}/reactions/{emoji}/{member_id}"),
+)
+
+
+def test_routes_sharing_a_bucket_hash_share_a_limit():
+    async def main():
+        # the reaction routes share one bucket, made faster than Discord's to keep the test short
+        gateway = FakeGateway(rest_buckets={route: ("reactions", 1, 0.02) for route in REACTION_ROUTES})
+        await gateway.start()
+        http = HTTPClient(api_url=gateway.api_url)
+        await http.static_login("fake")
+        channel_id = gateway._channel_id(gateway._guild_ids[0], 0)
+        try:
+            await asyncio.gather(
+                *(
+                    http.add_reaction(channel_id, 1, EMOJI) if i % 2 else http.remove_reaction(channel_id, 1, EMOJI, 42)
+                    for i in range(40)
+                )
+            )
+        finally:
+            await http.close()
+            await gateway.close()
+
+        # only the first request of each route is sent before the bucket hash is known
+        assert gateway.rate_limited <= 2
+
+    asyncio.run(main())
@@ -0,0 +1,79 @@
+import asyncio
+
+from discord.ratelimits import Ratelimit
+
+
+def test_update_keeps_the_latest_window():
+    async def main():
+        ratelimit = Ratelimit(asyncio.get_running_loop())
+        ratelimit.update(5, 3, 100.0, 1.0)
+        assert (ratelimit.limit, ratelimit.remaining) == (5, 3)
+
+        # responses of a window arrive in any order, the lowest count wins
+        ratelimit.update(5, 4, 100.0, 1.0)
+        assert ratelimit.remaining == 3
+        ratelimit.update(5, 2, 100.0, 1.0)
+        assert ratelimit.remaining == 2
+
+        # a late response from the previous window is ignored
+        ratelimit.update(5, 4, 99.0, 1.0)
+        assert ratelimit.remaining == 2
+
+        ratelimit.update(5, 4, 101.0, 1.0)
+        assert ratelimit.remaining == 4
+        assert ratelimit._reset_handle is None
+
+    asyncio.run(main())
+
+
+def test_exhausted_bucket_resets_after_reset_after():
+    async def main():
+        idle = []
+        ratelimit = Ratelimit(asyncio.get_running_loop(), idle.append)
+        ratelimit.update(2, 2, 100.0, 1.0)
+        await ratelimit.acquire()
+        await ratelimit.acquire()
+        waiter = asyncio.create_task(ratelimit.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+
+        ratelimit.update(2, 0, 100.0, 0.05)
+        ratelimit.release()
+        ratelimit.release()
+        await asyncio.sleep(0.01)
+        # the slots are free but the window has no requests left
+        assert not waiter.done() and ratelimit.outgoing == 0
+
+        await asyncio.wait_for(waiter, timeout=1)
+        assert ratelimit.remaining == 2 and ratelimit.outgoing == 1
+        ratelimit.release()
+        assert ratelimit.is_idle() and idle == [ratelimit]
+
+    asyncio.run(main())
+
+
+def test_cancelled_acquire_leaves_no_slot_behind():
+    async def main():
+        idle = []
+        ratelimit = Ratelimit(asyncio.get_running_loop(), idle.append)
+        await ratelimit.acquire()
+
+        # cancelled while queued
+        queued = asyncio.create_task(ratelimit.acquire())
+        await asyncio.sleep(0)
+        queued.cancel()
+        await asyncio.gather(queued, return_exceptions=True)
+        assert not ratelimit._waiters and ratelimit.outgoing == 1
+
+        # cancelled after being let through, before it could run
+        woken = asyncio.create_task(ratelimit.acquire())
+        await asyncio.sleep(0)
+        ratelimit.release()
+        assert ratelimit.outgoing == 1
+        woken.cancel()
+        await asyncio.gather(woken, return_exceptions=True)
+        assert woken.cancelled()
+        assert ratelimit.outgoing == 0 and ratelimit.is_idle()
+        assert idle == [ratelimit]
+
+    asyncio.run(main())
@@ -0,0 +1,15 @@
+from discord.recorder import GatewayRecorder, _read_recording
+
+
+def test_recording_round_trip(tmp_path):
+    path = str(tmp_path / "gateway.dpyr")
+    recorder = GatewayRecorder(path)
+    payloads = [(None, '{"op":11,"d":null}'), (0, b"\x83t\x00\x00\x00\x00"), (3, '{"op":0,"t":"READY"}')]
+    # enough frames to go through several flushes of the buffer
+    payloads += [(1, "x" * 1000)] * 1000
+    for shard_id, payload in payloads:
+        recorder.record(shard_id, payload)
+    recorder.close()
+
+    assert recorder.count == len(payloads)
+    assert [(shard_id, payload) for _, shard_id, payload in _read_recording(path)] == payloads
@@ -0,0 +1,22 @@
+import asyncio
+import logging
+
+from discord.scheduler import RequestScheduler
+
+
+def test_backlogged_priority_is_logged_once(caplog):
+    async def request(scheduler):
+        await scheduler.acquire()
+        scheduler.release()
+
+    async def main():
+        scheduler = RequestScheduler(limit=1, per=0.01)
+        await asyncio.gather(*(request(scheduler) for _ in range(5)))
+
+    with caplog.at_level(logging.DEBUG, logger="discord.scheduler"):
+        asyncio.run(main())
+
+    records = [record for record in caplog.records if record.name == "discord.scheduler"]
+    assert len(records) == 1
+    assert records[0].levelno == logging.WARNING
+    assert records[0].getMessage().startswith("Normal priority requests are waiting")
@@ -0,0 +1,69 @@
+import asyncio
+from types import SimpleNamespace
+
+import discord
+from discord.state import ConnectionState
+from discord.template import Template
+
+
+TEMPLATE = {
+    "code": "abc",
+    "name": "template",
+    "description": None,
+    "usage_count": 0,
+    "creator_id": "1",
+    "creator": {"id": "1", "username": "creator", "discriminator": "0001", "avatar": None},
+    "created_at": "2021-01-01T00:00:00+00:00",
+    "updated_at": "2021-01-01T00:00:00+00:00",
+    "source_guild_id": "5",
+    "is_dirty": None,
+    "serialized_source_guild": {
+        "name": "guild",
+        "description": None,
+        "region": "us-west",
+        "verification_level": 0,
+        "default_message_notifications": 0,
+        "explicit_content_filter": 0,
+        "preferred_locale": "en-US",
+        "afk_timeout": 300,
+        "roles": [{"id": 0, "name": "@everyone", "color": 0, "hoist": False, "mentionable": False, "permissions": "0"}],
+        "channels": [
+            {
+                "id": 1,
+                "type": 0,
+                "name": "general",
+                "position": 0,
+                "topic": None,
+                "nsfw": False,
+                "rate_limit_per_user": 0,
+                "parent_id": None,
+                "permission_overwrites": [],
+            }
+        ],
+        "afk_channel_id": None,
+        "system_channel_id": 1,
+        "system_channel_flags": 0,
+        "icon_hash": None,
+    },
+}
+
+
+def test_template_source_guild():
+    loop = asyncio.new_event_loop()
+    state = ConnectionState(
+        dispatch=lambda *args, **kwargs: None,
+        handlers={},
+        hooks={},
+        http=None,
+        loop=loop,
+        intents=discord.Intents.all(),
+        member_cache_timeout=60.0,
+    )
+    loop.close()
+    state.user = SimpleNamespace(id=99)
+
+    template = Template(state=state, data=TEMPLATE)
+    guild = template.source_guild
+    assert guild.name == "guild"
+    assert [channel.name for channel in guild.channels] == ["general"]
+    assert guild.members == []